@@ -1,11 +1,24 @@
 import py3dbl
-import time
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
 import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 START = 100
 STEP = 100
-ITER = 3
+ITER = 5
+WARMUP = 1
+SEED = 0
+TIME_TOLERANCE = .10
+BINS_TOLERANCE = 0
 
 BIN_PARAMS = {
     "width":2,
@@ -21,95 +34,564 @@ ITEM_PARAMS = {
     "weight":(.1,1)
 }
 
-def packing_benchmarker(algorithms : list[str], constraints : list[py3dbl.Constraints.Constraint], end : int, start : int = START, step : int = 100, bin_params : dict = BIN_PARAMS, item_params : dict = ITEM_PARAMS, iterations : int = ITER, output_file : str = "benchmarking_result.txt"):
+def percentile(samples : list[float], q : float) -> float:
+    """
+    Percentile with linear interpolation between the closest ranks
+
+    :param samples: Non empty list of values
+    :type samples: list[float]
+    :param q: Percentile to compute, between 0 and 100
+    :type q: float
+    """
+    ordered = sorted(samples)
+    rank = (len(ordered)-1)*q/100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high]-ordered[low])*(rank-low)
+
+def summarize(samples : list[float]) -> dict[str:float]:
+    """
+    Robust summary of a list of measures: median, p95 and spread (min, max, interquartile range, standard deviation)
+
+    :param samples: Non empty list of values
+    :type samples: list[float]
+    """
+    return {
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "min": min(samples),
+        "max": max(samples),
+        "iqr": percentile(samples, 75) - percentile(samples, 25),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "n": len(samples)
+    }
+
+def system_information() -> dict[str:str]:
+    uname = platform.uname()
+    return {
+        "system": uname.system,
+        "node": uname.node,
+        "release": uname.release,
+        "version": uname.version,
+        "machine": uname.machine,
+        "processor": uname.processor,
+        "python": platform.python_version()
+    }
+
+def generate_instance(size : int, seed : int, item_params : dict = ITEM_PARAMS) -> list[py3dbl.Item]:
+    """
+    Generate the same batch of items for the same seed
+
+    :param size: Number of items
+    :type size: int
+    :param seed: Seed of the instance
+    :type seed: int
+    :param item_params: Ranges of the item attributes (see py3dbl.item_generator)
+    :type item_params: dict
+    """
+    return py3dbl.item_array_generator(
+        width=item_params['width'],
+        height=item_params['height'],
+        depth=item_params['depth'],
+        weight=item_params['weight'],
+        batch_size=size,
+        seed=seed
+    ).to_items()
+
+def instance_seed(seed : int, size : int, iteration : int) -> int:
+    """
+    Seed of the instance used by a (size, iteration) cell, iteration -1 is the warm-up instance
+    """
+    return seed*1_000_003 + size*1_009 + iteration + 1
+
+def packer_from_algorithm(algorithm : str, model : py3dbl.BinModel, bin_params : dict = BIN_PARAMS):
+    """
+    Build a packer with a common interface (reset_items, add_batch, pack, used_bins) for the algorithm
+
+    :param algorithm: Name of an algorithm registred in py3dbl.algorithms or py3dbp
+    :type algorithm: str
+    :param model: The bin model to use
+    :type model: py3dbl.BinModel
+    """
+    if algorithm == 'py3dbp':
+        # in case of py3dbp I need to adjust the packer interface
+        import py3dbp
+        def _add_batch(packer,batch):
+            for i in batch:
+                packer.items.append(py3dbp.Item(None,i.width,i.height,i.depth,i.weight))
+                packer.bins.append(py3dbp.Bin(None,bin_params['width'],bin_params['height'],bin_params['depth'],bin_params['max_weight']))
+        def _reset_items(self):
+            self.items = list()
+            self.bins = list()
+        packer = py3dbp.Packer()
+        packer.reset_items = (lambda :_reset_items(packer))
+        packer.add_batch = (lambda batch: _add_batch(packer, batch))
+        packer.pack = (lambda : py3dbp.Packer.pack(packer,distribute_items=True))
+        def _count_bin(packer):
+            idx = 0
+            for bin in packer.bins:
+                if len(bin.items) == 0:
+                    break
+                idx += 1
+            return idx
+        packer.used_bins = (lambda : _count_bin(packer))
+    else:
+        packer = py3dbl.Packer(algorithm=py3dbl.algorithms[algorithm],default_bin=model)
+        packer.used_bins = (lambda : len(packer.current_configuration))
+    packer.name = algorithm
+    return packer
+
+def time_packing(packer, items : list[py3dbl.Item]) -> tuple[int,int]:
+    """
+    Pack a private copy of the items (algorithms sort, rotate and move them)
+
+    :return: Elapsed time in nanoseconds and number of bins used
+    :rtype: tuple[int, int]
+    """
+    packer.reset_items()
+    packer.add_batch(copy.deepcopy(items))
+    begin = time.perf_counter_ns()
+    packer.pack()
+    elapsed = time.perf_counter_ns() - begin
+    return elapsed, packer.used_bins()
+
+def packing_benchmarker(algorithms : list[str], constraints : list[py3dbl.Constraints.Constraint], end : int, start : int = START, step : int = STEP, bin_params : dict = BIN_PARAMS, item_params : dict = ITEM_PARAMS, iterations : int = ITER, warmup : int = WARMUP, seed : int = SEED, output_file : None|str = "benchmarking_result.json"):
     """
     Put the listed algorithms in the same conditions (constraints set, item batch, model, ecc.) and test it for the number of times set by iterations
-    
+
+    Every iteration uses a different seeded instance, shared by all the algorithms, so runs are repeatable.
+    Before measuring, each algorithm is run warmup times on a separate instance.
+
     :param algorithms: List names of algorithms to use, the name should be a registred in py3dbl.algorithms or py3dbp
+    :type algorithms: list[str]
+    :param constraints: Constraints of the bin model
+    :type constraints: list[Constraint]
+    :param end: Biggest number of items (included)
+    :type end: int
+    :param start: Smallest number of items
+    :type start: int
+    :param step: Increment of the number of items
+    :type step: int
+    :param iterations: Measured runs for each size and algorithm
+    :type iterations: int
+    :param warmup: Unmeasured runs for each size and algorithm
+    :type warmup: int
+    :param seed: Base seed of the generated instances
+    :type seed: int
+    :param output_file: JSON file to write the results to (None to skip)
+    :type output_file: None | str
+    :return: The results, as written to output_file
+    :rtype: dict
     """
-    
     model = py3dbl.BinModel(None,[bin_params['width'],bin_params['height'],bin_params['depth']],bin_params['max_weight'],constraints)
-    def packer_from_algorithm(algorithm : str):
-        if algorithm == 'py3dbp':
-            # in case of py3dbp I need to adjust the packer interface
-            import py3dbp
-            def _add_batch(packer,batch):
-                for i in batch:
-                    packer.items.append(py3dbp.Item(None,i.width,i.height,i.depth,i.weight))
-                    packer.bins.append(py3dbp.Bin(None,bin_params['width'],bin_params['height'],bin_params['depth'],bin_params['max_weight']))
-            def _reset_items(self):
-                self.items = list()
-                self.bins = list()
-            packer = py3dbp.Packer()
-            packer.reset_items = (lambda :_reset_items(packer))
-            packer.add_batch = (lambda batch: _add_batch(packer, batch))
-            packer.pack = (lambda : py3dbp.Packer.pack(packer,distribute_items=True))
-            def _count_bin(packer):
-                idx = 0
-                for bin in packer.bins:
-                    if len(bin.items) == 0:
-                        break
-                    idx += 1
-                return idx
-            packer.used_bins = (lambda : _count_bin(packer))
-        else:
-            packer = py3dbl.Packer(algorithm=py3dbl.algorithms[algorithm],default_bin=model)
-            packer.used_bins = (lambda : len(packer.current_configuration))
-        packer.name = algorithm
-        return packer
-    
-    packers = [packer_from_algorithm(algorithm) for algorithm in algorithms]
-
-    results = dict()
-    with open(output_file,mode="a",newline='') as file:
-        file.write(("="*10)+datetime.now().strftime("%Y-%m-%d %H:%M:%S")+("="*10)+"\n")
-        file.write("System Information:\n")
-        uname = platform.uname()
-        file.writelines([
-            f" System: {uname.system}\n",
-            f" Node Name: {uname.node}\n",
-            f" Release: {uname.release}\n",
-            f" Version: {uname.version}\n",
-            f" Machine: {uname.machine}\n",
-            f" Processor: {uname.processor}\n"
-        ])
-        file.write("Banchmarking Parameters:\n")
-        file.writelines([
-            " items dimensions:\n",
-            *["  "+str(param)+": "+str(value)+"\n" for param,value in item_params.items()],
-            " bin parameters:\n",
-            *["  "+str(param)+": "+str(value)+"\n" for param,value in bin_params.items()],
-            " constraints:\n",
-            *["  "+str(constraint)+"\n" for constraint in constraints]
-        ])
-        for size in range(start,end+1,step):
-            results[size] = dict()
+    packers = [packer_from_algorithm(algorithm,model,bin_params) for algorithm in algorithms]
+
+    results = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "system": system_information(),
+        "parameters": {
+            "algorithms": list(algorithms),
+            "sizes": list(range(start,end+1,step)),
+            "iterations": iterations,
+            "warmup": warmup,
+            "seed": seed,
+            "item_params": item_params,
+            "bin_params": bin_params,
+            "constraints": [str(constraint) for constraint in constraints]
+        },
+        "results": dict()
+    }
+    for size in range(start,end+1,step):
+        warmup_items = generate_instance(size,instance_seed(seed,size,-1),item_params)
+        instances = [generate_instance(size,instance_seed(seed,size,iteration),item_params) for iteration in range(iterations)]
+        results["results"][str(size)] = dict()
+        for packer in packers:
+            for _ in range(warmup):
+                time_packing(packer,warmup_items)
+            times, bins = [], []
+            for items in instances:
+                elapsed, used_bins = time_packing(packer,items)
+                times.append(elapsed)
+                bins.append(used_bins)
+            results["results"][str(size)][packer.name] = {
+                "time": summarize([t/1e9 for t in times]),
+                "bins": summarize(bins),
+                "samples_ns": times
+            }
+
+    if output_file is not None:
+        with open(output_file,mode="w") as file:
+            json.dump(results,file,indent=1)
+    return results
+
+class ResultStore:
+    """
+    Append-only JSON lines file of measured cells, a sweep using an existing store skips the cells already in it
+    """
+    def __init__(self, path : str):
+        """
+        :param path: The JSON lines file, created if missing
+        :type path: str
+        """
+        self.path = path
+        self.records = dict()
+        terminated = True
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    terminated = line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+                    except ValueError:
+                        pass # line cut by an interrupted run
+        self._file = open(path, mode="a")
+        if not terminated:
+            self._file.write("\n")
+
+    def __contains__(self, key : str) -> bool:
+        return key in self.records
+
+    def add(self, record : dict) -> None:
+        """
+        Store a record (with a "key" field) and flush it to disk
+        """
+        self.records[record["key"]] = record
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+def _fingerprint(parameters : dict) -> str:
+    return hashlib.sha1(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:12]
+
+# (algorithm, size) couples already warmed up by the current worker process
+_warmed_up = set()
+
+def run_cell(algorithm : str, size : int, iteration : int, seed : int, constraint_names : list[str], bin_params : dict = BIN_PARAMS, item_params : dict = ITEM_PARAMS, warmup : int = WARMUP) -> dict:
+    """
+    Measure a single (algorithm, size, iteration) cell, everything is rebuilt from the arguments so it can run in any process
+
+    The warm-up runs are done once per worker process for each algorithm and size.
+
+    :param algorithm: Name of the algorithm (see packer_from_algorithm)
+    :type algorithm: str
+    :param constraint_names: Names of registered constraints of the bin model
+    :type constraint_names: list[str]
+    :return: The record of the cell with time in nanoseconds and number of bins used
+    :rtype: dict
+    """
+    constraints = [py3dbl.constraints[name] for name in constraint_names]
+    model = py3dbl.BinModel(None,[bin_params['width'],bin_params['height'],bin_params['depth']],bin_params['max_weight'],constraints)
+    packer = packer_from_algorithm(algorithm,model,bin_params)
+    if (algorithm,size) not in _warmed_up:
+        warmup_items = generate_instance(size,instance_seed(seed,size,-1),item_params)
+        for _ in range(warmup):
+            time_packing(packer,warmup_items)
+        _warmed_up.add((algorithm,size))
+    elapsed, bins = time_packing(packer,generate_instance(size,instance_seed(seed,size,iteration),item_params))
+    return {"algorithm": algorithm, "size": size, "iteration": iteration, "time_ns": elapsed, "bins": bins}
+
+def aggregate(records : list[dict], parameters : dict) -> dict:
+    """
+    Summarize cell records in the format of packing_benchmarker results
+    """
+    results = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "system": system_information(),
+        "parameters": parameters,
+        "results": dict()
+    }
+    cells = dict()
+    for record in sorted(records, key=lambda record: (record["size"],record["iteration"])):
+        cell = cells.setdefault(str(record["size"]),dict()).setdefault(record["algorithm"],{"times":[],"bins":[]})
+        cell["times"].append(record["time_ns"])
+        cell["bins"].append(record["bins"])
+    for size, algorithms in cells.items():
+        results["results"][size] = {
+            algorithm: {"time": summarize([t/1e9 for t in cell["times"]]), "bins": summarize(cell["bins"]), "samples_ns": cell["times"]}
+            for algorithm, cell in algorithms.items()
+        }
+    return results
+
+def parallel_benchmarker(algorithms : list[str], constraint_names : list[str], sizes : list[int], store : str, iterations : int = ITER, warmup : int = WARMUP, seed : int = SEED, bin_params : dict = BIN_PARAMS, item_params : dict = ITEM_PARAMS, max_workers : None|int = None, output_file : None|str = "benchmarking_result.json", log = print) -> dict:
+    """
+    Run the (size, algorithm, iteration) grid on a process pool, storing every cell as soon as it is measured
+
+    Each cell generates its own seeded instance in its worker (no item list is shared between runs),
+    so the results do not depend on scheduling. Cells already in the store with the same parameters are not run again,
+    so an interrupted sweep resumes where it stopped. Concurrent cells compete for memory bandwidth
+    and caches: compare results obtained with the same number of workers.
+
+    :param algorithms: Names of the algorithms (see packer_from_algorithm)
+    :type algorithms: list[str]
+    :param constraint_names: Names of registered constraints of the bin model
+    :type constraint_names: list[str]
+    :param sizes: Numbers of items
+    :type sizes: list[int]
+    :param store: JSON lines file of measured cells (see ResultStore)
+    :type store: str
+    :param max_workers: Number of worker processes (None for the number of CPUs)
+    :type max_workers: None | int
+    :param output_file: JSON file to write the aggregated results to (None to skip)
+    :type output_file: None | str
+    :param log: Called with a progress line after each cell (None for silence)
+    :return: The aggregated results (see aggregate)
+    :rtype: dict
+    """
+    parameters = {
+        "algorithms": list(algorithms),
+        "sizes": list(sizes),
+        "iterations": iterations,
+        "warmup": warmup,
+        "seed": seed,
+        "item_params": item_params,
+        "bin_params": bin_params,
+        "constraints": list(constraint_names)
+    }
+    fingerprint = _fingerprint({key: parameters[key] for key in ("seed","warmup","item_params","bin_params","constraints")})
+    key = lambda algorithm, size, iteration: f"{fingerprint}/{algorithm}/{size}/{iteration}"
+    result_store = ResultStore(store)
+    # biggest cells first, so that the last ones to run are short
+    pending = [
+        (algorithm,size,iteration)
+        for size in sorted(sizes, reverse=True) for algorithm in algorithms for iteration in range(iterations)
+        if key(algorithm,size,iteration) not in result_store
+    ]
+    if log is not None:
+        log(f"{len(pending)} cells to run, {len(sizes)*len(algorithms)*iterations-len(pending)} already stored")
+    try:
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = {
+                executor.submit(run_cell,algorithm,size,iteration,seed,constraint_names,bin_params,item_params,warmup): (algorithm,size,iteration)
+                for algorithm, size, iteration in pending
+            }
+            for future in as_completed(futures):
+                algorithm, size, iteration = futures[future]
+                try:
+                    record = future.result()
+                except Exception as error: # the cell is not stored, so it is retried by the next run
+                    if log is not None:
+                        log(f"{algorithm} {size} #{iteration} failed: {error!r}")
+                    continue
+                record["key"] = key(algorithm,size,iteration)
+                result_store.add(record)
+                if log is not None:
+                    log(f"{algorithm} {size} #{iteration}: {record['time_ns']/1e9:.3f}s, {record['bins']} bins")
+    finally:
+        result_store.close()
+
+    records = [
+        result_store.records[key(algorithm,size,iteration)]
+        for size in sizes for algorithm in algorithms for iteration in range(iterations)
+        if key(algorithm,size,iteration) in result_store
+    ]
+    results = aggregate(records, parameters)
+    if output_file is not None:
+        with open(output_file,mode="w") as file:
+            json.dump(results,file,indent=1)
+    return results
+
+def standard_benchmarker(paths : list[str], algorithms : list[str], constraint_names : list[str], format : None|str = None, bounds_file : None|str = None, output_file : None|str = "standard_benchmarking_result.json", store : None|str = None, checkpoint_interval : float = 60.0, log = print) -> dict:
+    """
+    Pack the instances of standard benchmark sets (see py3dbl.instances) and report the gaps from the published values
+
+    With a store, every (instance, algorithm) cell is stored as soon as it is packed and a run using an existing store
+    skips the cells already in it; the packing of a cell is checkpointed to a file next to the store (see py3dbl.Checkpoint),
+    so an interrupted long run (e.g. genetic_packer) resumes from its last checkpoint, the file is removed once the cell is stored.
+    The time of a resumed cell includes the time spent up to the checkpoint (the time after it is lost with the interruption).
+
+    :param paths: Instance files or directories
+    :type paths: list[str]
+    :param algorithms: Names of registered algorithms
+    :type algorithms: list[str]
+    :param constraint_names: Names of the constraints of the bin models
+    :type constraint_names: list[str]
+    :param format: Format of the files, None to guess it from the file names
+    :type format: None | str
+    :param bounds_file: CSV of the published values (see py3dbl.load_bounds)
+    :type bounds_file: None | str
+    :param output_file: JSON file to write the results to (None to skip)
+    :type output_file: None | str
+    :param store: JSON lines file of packed cells (see ResultStore), None to run every cell
+    :type store: None | str
+    :param checkpoint_interval: Minimum seconds between two checkpoints of a cell
+    :type checkpoint_interval: float
+    :param log: Called with a line for each packed instance (None for silence)
+    :return: The results, as written to output_file
+    :rtype: dict
+    """
+    bounds = py3dbl.load_bounds(bounds_file) if bounds_file is not None else {}
+    constraints = [py3dbl.constraints[name] for name in constraint_names]
+    results = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "system": system_information(),
+        "parameters": {"paths": list(paths), "algorithms": list(algorithms), "constraints": list(constraint_names), "bounds": bounds_file},
+        "results": dict(),
+        "summary": dict()
+    }
+    gaps = {algorithm: [] for algorithm in algorithms}
+    result_store = ResultStore(store) if store is not None else None
+    fingerprint = _fingerprint({"constraints": list(constraint_names), "bounds": bounds_file})
+    try:
+        for instance in py3dbl.iter_library(paths, format, bounds, constraints):
+            cells = results["results"][instance.name] = {"objective": instance.objective, "items": len(instance.items),
+                                                        "reference": None if instance.reference() is None else float(instance.reference())}
             for algorithm in algorithms:
-                results[size][algorithm] = {"time":0,"bins":0}
-            for _ in range(iterations):
-                items = py3dbl.item_generator(
-                    width=item_params['width'],
-                    height=item_params['height'],
-                    depth=item_params['depth'],
-                    weight=item_params['weight'],
-                    batch_size=size,
-                    use_gaussian_distrib=False
-                )
-                for packer in packers:
-                    packer.reset_items()
-                    packer.add_batch(items)
-                    start = time.time()
-                    packer.pack()
-                    end = time.time()
-                    results[size][packer.name]["time"] += end-start
-                    results[size][packer.name]["bins"] += packer.used_bins()
-                    
-
-            file.write(str(size)+" items:\n")
-            for algorithm,result in results[size].items():
-                result["time"] /= iterations
-                result["bins"] /= iterations
-                file.write(" " + algorithm + ":\n")
-                file.write("  time: " + str(round(result["time"],2)) + ", bins: " + str(round(result["bins"],2)) + "\n")
-
-        return results
\ No newline at end of file
+                key = f"{fingerprint}/{instance.name}/{algorithm}"
+                if result_store is not None and key in result_store:
+                    record = result_store.records[key]
+                    cells[algorithm] = {name: record[name] for name in ("time", "value", "gap")}
+                    if record["gap"] is not None:
+                        gaps[algorithm].append(record["gap"])
+                    continue
+                packer = instance.packer(algorithm=py3dbl.algorithms[algorithm])
+                checkpoint = None
+                if result_store is not None:
+                    checkpoint = py3dbl.Checkpoint(f"{store}.{_fingerprint({'key': key})}.checkpoint", checkpoint_interval)
+                begin = time.perf_counter()
+                packer.pack(checkpoint=checkpoint)
+                elapsed = time.perf_counter() - begin
+                if checkpoint is not None:
+                    # a resumed cell adds the time spent up to its last checkpoint
+                    elapsed += checkpoint.resumed_elapsed
+                value = instance.evaluate(packer.current_configuration)
+                gap = instance.gap(value)
+                cells[algorithm] = {"time": elapsed, "value": float(value), "gap": None if gap is None else float(gap)}
+                if result_store is not None:
+                    result_store.add({"key": key, **cells[algorithm]})
+                    os.remove(checkpoint.path)
+                if gap is not None:
+                    gaps[algorithm].append(float(gap))
+                if log is not None:
+                    log(f"{instance.name:<20} {algorithm:<20} {instance.objective} {float(value):.2f} (reference {cells['reference']}) "
+                        + (f"gap {float(gap):.2%}" if gap is not None else "no reference") + f" in {elapsed:.2f}s")
+    finally:
+        if result_store is not None:
+            result_store.close()
+    for algorithm, samples in gaps.items():
+        results["summary"][algorithm] = {"instances": len(samples), "mean_gap": statistics.fmean(samples) if samples else None,
+                                         "max_gap": max(samples) if samples else None}
+    if output_file is not None:
+        with open(output_file,mode="w") as file:
+            json.dump(results,file,indent=1)
+    return results
+
+def compare(results : dict, baseline : dict, time_tolerance : float = TIME_TOLERANCE, bins_tolerance : float = BINS_TOLERANCE) -> list[dict]:
+    """
+    Compare two benchmark results on the (size, algorithm) cells they have in common
+
+    A cell is a time regression if its median time exceeds the baseline median by more than time_tolerance (relative)
+    and the baseline p95, it is a bins regression if its median bins exceed the baseline median by more than bins_tolerance.
+
+    :param results: Current results (see packing_benchmarker)
+    :type results: dict
+    :param baseline: Stored results to compare with
+    :type baseline: dict
+    :param time_tolerance: Allowed relative slow down
+    :type time_tolerance: float
+    :param bins_tolerance: Allowed increase of the median number of bins
+    :type bins_tolerance: float
+    :return: One entry for each compared cell, with the ratio of times, the difference of bins and the regressions found
+    :rtype: list[dict]
+    """
+    report = []
+    for size, cells in results["results"].items():
+        for algorithm, cell in cells.items():
+            reference = baseline["results"].get(size,{}).get(algorithm)
+            if reference is None:
+                continue
+            ratio = cell["time"]["median"]/reference["time"]["median"] if reference["time"]["median"] else math.inf
+            bins_delta = cell["bins"]["median"] - reference["bins"]["median"]
+            regressions = []
+            if ratio > 1+time_tolerance and cell["time"]["median"] > reference["time"]["p95"]:
+                regressions.append("time")
+            if bins_delta > bins_tolerance:
+                regressions.append("bins")
+            report.append({"size": int(size), "algorithm": algorithm, "time_ratio": ratio, "bins_delta": bins_delta, "regressions": regressions})
+    return report
+
+def print_report(report : list[dict], file = sys.stdout) -> None:
+    for entry in report:
+        flag = "REGRESSION (" + ", ".join(entry["regressions"]) + ")" if entry["regressions"] else "ok"
+        print(f"{entry['size']:>6} {entry['algorithm']:<20} time x{entry['time_ratio']:.3f} bins {entry['bins_delta']:+.2f} {flag}", file=file)
+
+def main(argv : None|list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="py3dbl packing benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmark")
+    run.add_argument("--algorithms", nargs="+", default=["base_packer"])
+    run.add_argument("--constraints", nargs="+", default=["weight_within_limit","fits_inside_bin","no_overlap"])
+    run.add_argument("--start", type=int, default=START)
+    run.add_argument("--end", type=int, default=300)
+    run.add_argument("--step", type=int, default=STEP)
+    run.add_argument("--iterations", type=int, default=ITER)
+    run.add_argument("--warmup", type=int, default=WARMUP)
+    run.add_argument("--seed", type=int, default=SEED)
+    run.add_argument("--output", default="benchmarking_result.json")
+    run.add_argument("--baseline", help="results to compare with after the run")
+    sweep = commands.add_parser("sweep", help="run the benchmark grid on a process pool, resuming from a result store")
+    sweep.add_argument("--algorithms", nargs="+", default=["base_packer"])
+    sweep.add_argument("--constraints", nargs="+", default=["weight_within_limit","fits_inside_bin","no_overlap"])
+    sweep.add_argument("--sizes", nargs="+", type=int, default=list(range(START,301,STEP)))
+    sweep.add_argument("--iterations", type=int, default=ITER)
+    sweep.add_argument("--warmup", type=int, default=WARMUP)
+    sweep.add_argument("--seed", type=int, default=SEED)
+    sweep.add_argument("--workers", type=int, help="number of worker processes")
+    sweep.add_argument("--store", default="benchmarking_cells.jsonl")
+    sweep.add_argument("--output", default="benchmarking_result.json")
+    sweep.add_argument("--baseline", help="results to compare with after the run")
+    standard = commands.add_parser("standard", help="pack standard benchmark instances and report the gaps from the published values")
+    standard.add_argument("paths", nargs="+", help="instance files or directories")
+    standard.add_argument("--algorithms", nargs="+", default=["base_packer"])
+    standard.add_argument("--constraints", nargs="+", default=["weight_within_limit","fits_inside_bin","no_overlap"])
+    standard.add_argument("--format", choices=["thpack","bpp"], help="format of the instance files, guessed from the names if omitted")
+    standard.add_argument("--bounds", help="CSV of the published values (name,best,lower_bound)")
+    standard.add_argument("--output", default="standard_benchmarking_result.json")
+    standard.add_argument("--store", help="JSON lines file of packed cells, an interrupted run resumes from it and from the checkpoints of its cells")
+    standard.add_argument("--checkpoint-interval", type=float, default=60.0, help="minimum seconds between two checkpoints of a cell")
+    cmp = commands.add_parser("compare", help="compare stored results with a baseline")
+    cmp.add_argument("results")
+    cmp.add_argument("baseline")
+    for command in (run, sweep, cmp):
+        command.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+        command.add_argument("--bins-tolerance", type=float, default=BINS_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "standard":
+        results = standard_benchmarker(args.paths, args.algorithms, args.constraints, args.format, args.bounds, args.output,
+                                       args.store, args.checkpoint_interval)
+        for algorithm, summary in results["summary"].items():
+            if summary["instances"]:
+                print(f"{algorithm:<20} mean gap {summary['mean_gap']:.2%} max gap {summary['max_gap']:.2%} on {summary['instances']} instances")
+        return 0
+    if args.command in ("run", "sweep"):
+        if args.command == "run":
+            results = packing_benchmarker(
+                args.algorithms, [py3dbl.constraints[name] for name in args.constraints], args.end, args.start, args.step,
+                iterations=args.iterations, warmup=args.warmup, seed=args.seed, output_file=args.output
+            )
+        else:
+            results = parallel_benchmarker(
+                args.algorithms, args.constraints, args.sizes, args.store, iterations=args.iterations, warmup=args.warmup,
+                seed=args.seed, max_workers=args.workers, output_file=args.output
+            )
+        for size, cells in results["results"].items():
+            for algorithm, cell in cells.items():
+                print(f"{size:>6} {algorithm:<20} time median {cell['time']['median']:.3f}s p95 {cell['time']['p95']:.3f}s iqr {cell['time']['iqr']:.3f}s, bins median {cell['bins']['median']}")
+        if args.baseline is None:
+            return 0
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        with open(args.results) as file:
+            results = json.load(file)
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    report = compare(results, baseline, args.time_tolerance, args.bins_tolerance)
+    print_report(report)
+    return 1 if any(entry["regressions"] for entry in report) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
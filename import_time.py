@@ -0,0 +1,53 @@
+"""
+Check the cost of "import py3dbl" against a budget
+
+Every run uses a fresh interpreter with -X importtime, the median cumulative import time
+of the package is compared with BUDGET_MS. Heavy modules that must only be loaded on first use
+(e.g. the rendering stack) are checked too. Exit status is 1 if the budget is exceeded.
+"""
+
+import subprocess
+import statistics
+import sys
+
+BUDGET_MS = 60
+RUNS = 10
+# modules that "import py3dbl" must not load
+LAZY_MODULES = ["plotly", "asyncio", "multiprocessing", "concurrent.futures.process"]
+
+def measure_import(runs : int = RUNS) -> list[float]:
+    """
+    Measure the cumulative import time of py3dbl
+
+    :param runs: Number of fresh interpreters to use
+    :type runs: int
+    :return: The import time of each run in milliseconds
+    :rtype: list[float]
+    """
+    times = []
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import py3dbl"], capture_output=True, text=True, check=True)
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "py3dbl":
+                times.append(int(fields[1])/1000)
+    return times
+
+def eagerly_loaded(modules : list[str] = LAZY_MODULES) -> list[str]:
+    """
+    :return: The modules of the list loaded by "import py3dbl"
+    :rtype: list[str]
+    """
+    code = f"import sys, py3dbl; print(' '.join(m for m in {modules!r} if m in sys.modules))"
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return process.stdout.split()
+
+if __name__ == "__main__":
+    times = measure_import()
+    median = statistics.median(times)
+    loaded = eagerly_loaded()
+    print(f"import py3dbl: median {median:.1f} ms, min {min(times):.1f} ms, max {max(times):.1f} ms (budget {BUDGET_MS} ms)")
+    if loaded:
+        print("eagerly loaded: " + ", ".join(loaded))
+    sys.exit(1 if median > BUDGET_MS or loaded else 0)
@@ -0,0 +1,149 @@
+import py3dbl
+import argparse
+import itertools
+import json
+import random
+import sys
+import timeit
+from py3dbl.Space import rect_intersect, intersect
+from benchmarking import summarize, system_information, generate_instance, BIN_PARAMS, ITEM_PARAMS, SEED
+from datetime import datetime
+from decimal import Decimal
+
+FILL_LEVELS = (0.25, 0.5, 0.75)
+REPEAT = 7
+MIN_TIME = 0.05
+PROBES = 64
+ITEMS = 400
+# smaller items than the end-to-end benchmark, so that the bins hold realistic numbers of parcels
+ITEM_PARAMS = {**ITEM_PARAMS, "width":(.1,.5), "depth":(.1,.5), "height":(.1,.5)}
+
+def per_call_ns(func, repeat : int = REPEAT, min_time : float = MIN_TIME) -> dict[str:float]:
+    """
+    Time a function without arguments, the number of calls per sample is calibrated to last at least min_time
+
+    :param func: The function to time
+    :param repeat: Number of samples
+    :type repeat: int
+    :param min_time: Minimum duration of a sample in seconds
+    :type min_time: float
+    :return: Summary (see benchmarking.summarize) of the nanoseconds per call
+    :rtype: dict[str:float]
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return summarize([sample*1e9/number for sample in timer.repeat(repeat, number)])
+
+def filled_bins(fill_levels : tuple[float] = FILL_LEVELS, seed : int = SEED, bin_params : dict = BIN_PARAMS, item_params : dict = ITEM_PARAMS) -> dict[float:py3dbl.Bin]:
+    """
+    Bins loaded up to the requested fractions of their volume: a bin is packed once with all_lay
+    and then emptied down to each fill level
+
+    :param fill_levels: Target fractions of the volume to keep loaded
+    :type fill_levels: tuple[float]
+    :return: The loaded bin of each fill level
+    :rtype: dict[float:py3dbl.Bin]
+    """
+    model = py3dbl.BinModel("micro",[bin_params['width'],bin_params['height'],bin_params['depth']],bin_params['max_weight'],
+                            [py3dbl.constraints[name] for name in ("weight_within_limit","fits_inside_bin","no_overlap")])
+    packed = py3dbl.Bin(0,model)
+    py3dbl.algorithms['all_lay']([packed],generate_instance(ITEMS,seed,item_params),[])
+    bins = dict()
+    for fill in fill_levels:
+        bin = py3dbl.Bin(fill,model)
+        loaded = 0
+        for item in packed.items:
+            loaded += item.volume()
+            if loaded > Decimal(fill)*bin.volume():
+                break
+            bin.items.append(item)
+            bin.weight += item.weight
+        bins[fill] = bin
+    return bins
+
+def probe_items(bin : py3dbl.Bin, count : int = PROBES, seed : int = SEED, item_params : dict = ITEM_PARAMS) -> list[py3dbl.Item]:
+    """
+    Items placed next to the loaded ones, as the candidate positions generated by the algorithms
+    """
+    rng = random.Random(seed)
+    probes = generate_instance(count,seed+1,item_params)
+    for probe in probes:
+        if bin.items:
+            pivot = rng.choice(bin.items)
+            axis = rng.randrange(3)
+            probe.position = pivot.position + [pivot.size[a] if a == axis else 0 for a in range(3)]
+    return probes
+
+def micro_benchmarker(fill_levels : tuple[float] = FILL_LEVELS, repeat : int = REPEAT, min_time : float = MIN_TIME, seed : int = SEED, output_file : None|str = "micro_benchmarking_result.json") -> dict:
+    """
+    Measure the cost per call (in nanoseconds) of the geometry and constraint primitives
+
+    Primitives that depend on the bin content (put_item and the constraints) are measured at each fill level,
+    each call evaluates the next of a fixed set of probe items.
+
+    :param fill_levels: Fractions of the bin volume loaded
+    :type fill_levels: tuple[float]
+    :param repeat: Number of samples for each primitive
+    :type repeat: int
+    :param min_time: Minimum duration of a sample in seconds
+    :type min_time: float
+    :param seed: Seed of the generated items
+    :type seed: int
+    :param output_file: JSON file to write the results to (None to skip)
+    :type output_file: None | str
+    :return: The results, as written to output_file
+    :rtype: dict
+    """
+    results = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "system": system_information(),
+        "parameters": {"fill_levels": list(fill_levels), "repeat": repeat, "min_time": min_time, "seed": seed},
+        "results": dict()
+    }
+    measure = lambda func: per_call_ns(func,repeat,min_time)
+
+    a = py3dbl.Volume([1,2,3],[0,0,0])
+    b = py3dbl.Volume([2,2,2],[.5,1,1])
+    v = py3dbl.Vector3(1,2,3)
+    primitives = results["results"]["geometry"] = dict()
+    primitives["Space.rect_intersect"] = measure(lambda: rect_intersect(a,b,0,1))
+    primitives["Space.intersect"] = measure(lambda: intersect(a,b))
+    primitives["Vector3.__add__"] = measure(lambda: v + v)
+    primitives["Volume.rotate90"] = measure(lambda: a.rotate90(orizontal=True))
+
+    for fill, bin in filled_bins(fill_levels,seed).items():
+        probes = probe_items(bin,seed=seed)
+        next_probe = itertools.cycle(probes).__next__
+        cell = results["results"][f"fill {fill}"] = {"items_loaded": len(bin.items)}
+        def put_item():
+            if bin.put_item(next_probe()):
+                bin.weight -= bin.items.pop().weight
+        cell["Bin.put_item"] = measure(put_item)
+        for name, constraint in py3dbl.constraints.items():
+            cell[f"constraints['{name}']"] = measure(lambda: constraint(bin,next_probe()))
+
+    if output_file is not None:
+        with open(output_file,mode="w") as file:
+            json.dump(results,file,indent=1)
+    return results
+
+def main(argv : None|list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="py3dbl micro benchmarks of the geometry and constraint primitives")
+    parser.add_argument("--fill-levels", nargs="+", type=float, default=list(FILL_LEVELS))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default="micro_benchmarking_result.json")
+    args = parser.parse_args(argv)
+    results = micro_benchmarker(tuple(args.fill_levels),args.repeat,args.min_time,args.seed,args.output)
+    for group, cells in results["results"].items():
+        print(group + (f" ({cells['items_loaded']} items)" if "items_loaded" in cells else ""))
+        for name, summary in cells.items():
+            if name != "items_loaded":
+                print(f"  {name:<40} median {summary['median']:>12.1f} ns  p95 {summary['p95']:>12.1f} ns")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
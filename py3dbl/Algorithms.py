@@ -1,8 +1,10 @@
 from decimal import Decimal
 from .Bin import Bin, BinModel
 from .Item import Item
-from .Space import Vector3
+from .Space import Vector3, Volume
 from .Constraints import Constraint
+from .Profiler import phase
+from .checkpoint import current_checkpoint
 
 class PackingAlgorithm:
     def __init__(self,func):
@@ -19,7 +21,7 @@ class PackingAlgorithm:
         """
         self.kwargs[name] = value
 
-    def __call__(self, bins : list[Bin], items : list[Item], constraints : list[Constraint]):
+    def __call__(self, bins : list[Bin], items : list[Item], constraints : list[Constraint], **kwargs):
         """
         Algorithm Execution
         
@@ -29,8 +31,10 @@ class PackingAlgorithm:
         :type items: list[Item]
         :param constraints: Constraints to follow during the packing
         :type constraints: list[Constraint]
+        :param kwargs: Parameters for this execution only, they override the ones set with set_parameter
         """
-        return self.func(bins,items,constraints,**self.kwargs)
+        with phase(self.func.__name__):
+            return self.func(bins,items,constraints,**{**self.kwargs, **kwargs})
 
 algorithms : dict[str:PackingAlgorithm] = dict()
 
@@ -79,8 +83,9 @@ def base_packer(available_bins : list[Bin], items_to_pack : list[Item], constrai
     if fresh_start:
         for bin in available_bins:
             bin.reset()
-    items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
-    available_bins.sort(key=lambda bin: bin.free_volume())
+    with phase("sorting"):
+        items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
+        available_bins.sort(key=lambda bin: bin.free_volume())
 
     while len(items_to_pack) != 0:
         if available_bins != None and len(available_bins) > len(current_configuration):
@@ -90,14 +95,17 @@ def base_packer(available_bins : list[Bin], items_to_pack : list[Item], constrai
         else:
             break
 
-        for item in items_to_pack:
-            if not bin.items:
-                item.position = Vector3()
-                if not bin.put_item(item,constraints):
-                    unfitted_items.append(item)
-            else:
-                if not try_fit(bin,item):
-                    unfitted_items.append(item)
+        with phase("bin pass"):
+            for item in items_to_pack:
+                if not bin.items:
+                    item.position = Vector3()
+                    if not bin.put_item(item,constraints):
+                        unfitted_items.append(item)
+                else:
+                    with phase("candidate generation"):
+                        fitted = try_fit(bin,item)
+                    if not fitted:
+                        unfitted_items.append(item)
 
         # if no item has been packed probably there's no solution
         if len(bin.items) == 0:
@@ -156,13 +164,15 @@ def all_stand(available_bins : list[Bin], items_to_pack : list[Item], constraint
             bin.reset()
     available_bins.sort(key=lambda bin: bin.free_volume())
 
-    for item in items_to_pack:
-        surface_idx = item.shortest_surface()
-        item.stand = True
-        item.min_surface = item.dimensions[surface_idx[0]] * item.dimensions[surface_idx[1]]
-        item.set_bottom_surface(surface_idx)
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            surface_idx = item.shortest_surface()
+            item.stand = True
+            item.min_surface = item.dimensions[surface_idx[0]] * item.dimensions[surface_idx[1]]
+            item.set_bottom_surface(surface_idx)
         
-    items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
+    with phase("sorting"):
+        items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
 
     while len(items_to_pack) != 0:
         if available_bins != None and len(available_bins) > len(current_configuration):
@@ -172,15 +182,17 @@ def all_stand(available_bins : list[Bin], items_to_pack : list[Item], constraint
         else:
             break
 
-        for item in items_to_pack:
-            
-            if not bin.items:
-                item.position = Vector3()
-                if not bin.put_item(item,constraints):
-                    unfitted_items.append(item)
-            else:
-                if not _try_fit(bin,item,constraints,allow_full_rotation=allow_full_rotation):
-                    unfitted_items.append(item)
+        with phase("bin pass"):
+            for item in items_to_pack:
+                if not bin.items:
+                    item.position = Vector3()
+                    if not bin.put_item(item,constraints):
+                        unfitted_items.append(item)
+                else:
+                    with phase("candidate generation"):
+                        fitted = _try_fit(bin,item,constraints,allow_full_rotation=allow_full_rotation)
+                    if not fitted:
+                        unfitted_items.append(item)
 
         # if no item has been packed probably there's no solution
         if len(bin.items) == 0 and (available_bins == None or len(available_bins)==0):
@@ -218,13 +230,15 @@ def all_lay(available_bins : list[Bin], items_to_pack : list[Item], constraints
             bin.reset()
     available_bins.sort(key=lambda bin: bin.free_volume(),reverse=True)
 
-    for item in items_to_pack:
-        surface_idx = item.widest_surface()
-        item.stand = False
-        item.max_surface = item.dimensions[surface_idx[0]] * item.dimensions[surface_idx[1]]
-        item.set_bottom_surface(surface_idx)
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            surface_idx = item.widest_surface()
+            item.stand = False
+            item.max_surface = item.dimensions[surface_idx[0]] * item.dimensions[surface_idx[1]]
+            item.set_bottom_surface(surface_idx)
 
-    items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
+    with phase("sorting"):
+        items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
 
     while len(items_to_pack) != 0:
         if available_bins != None and len(available_bins) > len(current_configuration):
@@ -234,15 +248,17 @@ def all_lay(available_bins : list[Bin], items_to_pack : list[Item], constraints
         else:
             break
 
-        for item in items_to_pack:
-            
-            if not bin.items:
-                item.position = Vector3()
-                if not bin.put_item(item,constraints):
-                    unfitted_items.append(item)
-            else:
-                if not _try_fit(bin,item,constraints,allow_full_rotation=allow_full_rotation):
-                    unfitted_items.append(item)
+        with phase("bin pass"):
+            for item in items_to_pack:
+                if not bin.items:
+                    item.position = Vector3()
+                    if not bin.put_item(item,constraints):
+                        unfitted_items.append(item)
+                else:
+                    with phase("candidate generation"):
+                        fitted = _try_fit(bin,item,constraints,allow_full_rotation=allow_full_rotation)
+                    if not fitted:
+                        unfitted_items.append(item)
 
         # if no item has been packed probably there's no solution
         if len(bin.items) == 0:
@@ -283,14 +299,16 @@ def big_lay_small_stand(available_bins : list[Bin], items_to_pack : list[Item],
             bin.reset()
     available_bins.sort(key=lambda bin: bin.free_volume())
 
-    for item in items_to_pack:
-        item.stand = item.volume() < volume_threshold
-        item.set_bottom_surface(
-            item.shortest_surface() if item.volume() < volume_threshold else
-            item.widest_surface()
-        )     
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            item.stand = item.volume() < volume_threshold
+            item.set_bottom_surface(
+                item.shortest_surface() if item.volume() < volume_threshold else
+                item.widest_surface()
+            )     
 
-    items_to_pack.sort(key=lambda item: item.volume(), reverse=True)
+    with phase("sorting"):
+        items_to_pack.sort(key=lambda item: item.volume(), reverse=True)
 
     while len(items_to_pack) != 0:
         if available_bins != None and len(available_bins) > len(current_configuration):
@@ -300,15 +318,17 @@ def big_lay_small_stand(available_bins : list[Bin], items_to_pack : list[Item],
         else:
             break
 
-        for item in items_to_pack:
-            
-            if not bin.items:
-                item.position = Vector3()
-                if not bin.put_item(item,constraints):
-                    unfitted_items.append(item)
-            else:
-                if not _try_fit(bin,item,constraints, allow_full_rotation=allow_full_rotation):
-                    unfitted_items.append(item)
+        with phase("bin pass"):
+            for item in items_to_pack:
+                if not bin.items:
+                    item.position = Vector3()
+                    if not bin.put_item(item,constraints):
+                        unfitted_items.append(item)
+                else:
+                    with phase("candidate generation"):
+                        fitted = _try_fit(bin,item,constraints, allow_full_rotation=allow_full_rotation)
+                    if not fitted:
+                        unfitted_items.append(item)
 
         # if no item has been packed probably there's no solution
         if len(bin.items) == 0:
@@ -319,3 +339,710 @@ def big_lay_small_stand(available_bins : list[Bin], items_to_pack : list[Item],
         current_configuration.append(bin)
     
     return current_configuration
+
+## Search based algorithms
+
+def _orientations(size : Vector3, allow_full_rotation : bool = False) -> list[tuple]:
+    """
+    Distinct sizes of an item rotated around the vertical axis (and on the other axes with allow_full_rotation)
+    """
+    w, h, d = size
+    sizes = [(w,h,d), (d,h,w)]
+    if allow_full_rotation:
+        sizes += [(h,w,d), (d,w,h), (w,d,h), (h,d,w)]
+    return list(dict.fromkeys(sizes))
+
+def _candidate_positions(placed : tuple[Item]) -> list[tuple]:
+    """
+    Corner positions next to the placed items (the origin for an empty bin), lowest first then deepest then leftmost
+    """
+    if not placed:
+        return [(0,0,0)]
+    positions = set()
+    for item in placed:
+        x, y, z = item.position
+        w, h, d = item.size
+        positions.update(((x+w,y,z), (x,y+h,z), (x,y,z+d)))
+    return sorted(positions, key=lambda position: (position[1],position[2],position[0]))
+
+@algorithm
+def beam_search(available_bins : list[Bin], items_to_pack : list[Item], constraints : list[Constraint], default_bin : None|BinModel = None, beam_width : int = 4, branching : int = 3, allow_full_rotation : bool = False, fresh_start : bool = True):
+    """
+    A beam search that keeps the beam_width best partial packings, each one is expanded with the first
+    branching feasible placements of the next item (lowest, deepest and leftmost corners first)
+
+    Partial packings share their bins: a placement only copies the tuple of the bin it changes.
+    The greedy packing (first feasible placement of every item) is always kept in the beam.
+    Packings are ranked by bins used, packed volume and compactness (sum of the sides of the bounding box of the loads).
+    With beam_width 1 and branching 1 it behaves as a greedy corner packer.
+    
+    :param available_bins: A fleet of bins to use
+    :type available_bins: list[Bin]
+    :param items_to_pack: The list of items to pack
+    :type items_to_pack: list[Item]
+    :param constraints: Constraints to follow (additional to the constraints of the model)
+    :type constraints: list[Constraint]
+    :param default_bin: A default bin to use if there are no more available bins
+    :type default_bin: None | BinModel
+    :param beam_width: Number of partial packings kept after each item
+    :type beam_width: int
+    :param branching: Maximum number of placements tried for the next item in each partial packing
+    :type branching: int
+    :param allow_full_rotation: True allow items to rotate on the axis "other" axis
+    :type allow_full_rotation: bool
+    :param fresh_start: Used to clear the bins before the packing
+    :type fresh_start: bool
+    """
+    constraints.sort()
+    if fresh_start:
+        for bin in available_bins:
+            bin.reset()
+    # bins already loaded come first, they are open from the start
+    available_bins.sort(key=lambda bin: (not bin.items, -bin.free_volume()))
+
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            item.stand = False
+            item.set_bottom_surface(item.widest_surface())
+
+    with phase("sorting"):
+        items_to_pack.sort(key=lambda item: item.volume(),reverse=True)
+
+    # bins used to evaluate the constraints, one per position in the configuration
+    scratch_bins = []
+    def scratch_bin(idx : int) -> None|Bin:
+        while len(scratch_bins) <= idx:
+            count = len(scratch_bins)
+            if count < len(available_bins):
+                scratch_bins.append(Bin(available_bins[count].id, available_bins[count]._model))
+            elif default_bin is not None:
+                scratch_bins.append(Bin(count, default_bin))
+            else:
+                return None
+        return scratch_bins[idx]
+
+    def load_scratch(bin : Bin, placed : tuple[Item]) -> None:
+        # states extend each other, so only the items after the common prefix are taken out and put in
+        common = 0
+        while common < min(len(bin.items), len(placed)) and bin.items[common] is placed[common]:
+            common += 1
+        while len(bin.items) > common:
+            bin.pop_item()
+        for probe in placed[common:]:
+            bin.place_item(probe)
+
+    def bin_state(items : tuple[Item], weight) -> tuple:
+        extent = tuple(max((item.position[axis]+item.size[axis] for item in items), default=0) for axis in range(3))
+        return (items, weight, extent)
+
+    # a partial packing is (bins, packed volume), a bin is (placed items, weight, extent of the loads)
+    opened = tuple(bin_state(tuple(bin.items), bin.weight) for bin in available_bins if bin.items)
+    beam = [(opened, Decimal(0))]
+    originals = dict()
+
+    def score(state : tuple) -> tuple:
+        bins, volume = state
+        return (len(bins), -volume, sum(sum(extent) for _,_,extent in bins))
+
+    def expand(state : tuple, item : Item) -> list[tuple]:
+        bins, volume = state
+        children = []
+        for idx in range(len(bins)+1):
+            if idx == len(bins):
+                # a new bin is opened only if the item fits nowhere else
+                if children:
+                    break
+                bin = scratch_bin(idx)
+                if bin is None:
+                    break
+                placed, weight, extent = (), 0, (0,0,0)
+            else:
+                bin = scratch_bin(idx)
+                placed, weight, extent = bins[idx]
+            load_scratch(bin, placed)
+            with phase("candidate generation"):
+                for position in _candidate_positions(placed):
+                    for size in _orientations(item.size, allow_full_rotation):
+                        probe = Item(item.name, Volume(size, position), item.weight, item.priority, item.max_load)
+                        if not bin.put_item(probe, constraints):
+                            continue
+                        bin.pop_item()
+                        originals[id(probe)] = (probe, item)
+                        child = (placed+(probe,), weight+probe.weight,
+                                 tuple(max(extent[axis], probe.position[axis]+probe.size[axis]) for axis in range(3)))
+                        children.append((bins[:idx]+(child,)+bins[idx+1:], volume+probe.volume()))
+                        if len(children) >= branching:
+                            return children
+        if not children:
+            children.append(state) # the item is left out
+        return children
+
+    for item in items_to_pack:
+        with phase("bin pass"):
+            # the first state follows the greedy choices, so the result is never worse than a greedy packing
+            greedy, *children = expand(beam[0], item)
+            children.extend(child for state in beam[1:] for child in expand(state, item))
+            children.sort(key=score)
+            beam = [greedy] + children[:beam_width-1]
+
+    # the best packing is applied to the real bins and items, its placements have already been checked on the scratch bins
+    bins, _ = min(beam, key=score)
+    current_configuration = []
+    for idx, (placed, _, _) in enumerate(bins):
+        bin = available_bins[idx] if idx < len(available_bins) else Bin(idx, default_bin)
+        for probe in placed:
+            if id(probe) not in originals:
+                continue # loaded before the packing
+            item = originals[id(probe)][1]
+            item.position = Vector3(*probe.position)
+            item.size = Vector3(*probe.size)
+            bin.place_item(item)
+        current_configuration.append(bin)
+    return current_configuration
+
+# problem evaluated by the genetic_packer workers, set by _genetic_init
+_genetic_problem = None
+
+def _genetic_init(problem : tuple) -> None:
+    global _genetic_problem
+    _genetic_problem = problem
+
+def _genetic_decode(problem : tuple, order : list[int], genes : list[int]) -> tuple[list[Bin],int]:
+    """
+    Place the items in the order of the chromosome, each one with the orientation of its gene, in the first
+    corner position of the first bin that accepts it (a new bin is opened when none does)
+
+    :param problem: (fleet, items, sizes of the items before rotation, constraints, default bin, allow_full_rotation)
+    :type problem: tuple
+    :return: The configuration and the number of items left out
+    :rtype: tuple[list[Bin], int]
+    """
+    fleet, items, sizes, constraints, default_bin, allow_full_rotation = problem
+    for bin in fleet:
+        bin.reset()
+    configuration = []
+    left_out = 0
+    for idx in order:
+        item = items[idx]
+        orientations = _orientations(sizes[idx], allow_full_rotation)
+        size = orientations[genes[idx] % len(orientations)]
+        placed = False
+        for bin in configuration:
+            for position in _candidate_positions(bin.items):
+                item.position = Vector3(*position)
+                item.size = Vector3(*size)
+                if bin.put_item(item, constraints):
+                    placed = True
+                    break
+            if placed:
+                break
+        if not placed:
+            count = len(configuration)
+            bin = fleet[count] if count < len(fleet) else Bin(count, default_bin) if default_bin is not None else None
+            if bin is not None:
+                item.position = Vector3()
+                item.size = Vector3(*size)
+                if bin.put_item(item, constraints):
+                    configuration.append(bin)
+                    placed = True
+        if not placed:
+            left_out += 1
+    return configuration, left_out
+
+def _genetic_fitness(problem : tuple, chromosome : tuple[list[int],list[int]]) -> float:
+    """
+    Fitness of a chromosome, lower is better: items left out weigh more than bins, the fill rate
+    of the emptiest bin breaks ties (so emptying a bin is rewarded)
+    """
+    configuration, left_out = _genetic_decode(problem, *chromosome)
+    if not configuration:
+        return float(left_out*len(problem[1]))
+    emptiest = min(sum(item.volume() for item in bin.items)/bin.volume() for bin in configuration)
+    return left_out*len(problem[1]) + len(configuration) + float(emptiest)
+
+def _genetic_evaluate(chromosome : tuple[list[int],list[int]]) -> float:
+    return _genetic_fitness(_genetic_problem, chromosome)
+
+def _order_crossover(rng, first : list[int], second : list[int]) -> list[int]:
+    """
+    Order crossover (OX): a slice of the first parent, the other genes in the order of the second
+    """
+    start, end = sorted(rng.sample(range(len(first)+1), 2))
+    kept = set(first[start:end])
+    rest = [gene for gene in second if gene not in kept]
+    return rest[:start] + first[start:end] + rest[start:]
+
+@algorithm
+def genetic_packer(available_bins : list[Bin], items_to_pack : list[Item], constraints : list[Constraint], default_bin : None|BinModel = None, population_size : int = 30, generations : int = 100,
+                   time_limit : None|float = 60.0, elite : int = 2, mutation_rate : float = .2, tournament : int = 3, workers : None|int = 1, seed : None|int = None,
+                   allow_full_rotation : bool = False, fresh_start : bool = True):
+    """
+    A genetic algorithm on chromosomes made of an item permutation and an orientation gene per item,
+    decoded by a first fit corner heuristic
+
+    The population is seeded with the packings of all_lay and big_lay_small_stand and evaluated in this process, or on a process pool
+    when workers is more than 1 (not advisable when the packer already runs in a worker, e.g. with pack_batch).
+    The best chromosomes (elite) survive each generation, parents are chosen by tournament.
+    The search stops after the given generations or when time_limit is exceeded.
+    With an active checkpoint (see py3dbl.checkpoint) the population is saved periodically and a new run resumes from it.
+    
+    :param available_bins: A fleet of bins to use
+    :type available_bins: list[Bin]
+    :param items_to_pack: The list of items to pack
+    :type items_to_pack: list[Item]
+    :param constraints: Constraints to follow (additional to the constraints of the model)
+    :type constraints: list[Constraint]
+    :param default_bin: A default bin to use if there are no more available bins
+    :type default_bin: None | BinModel
+    :param population_size: Number of chromosomes of each generation
+    :type population_size: int
+    :param generations: Maximum number of generations
+    :type generations: int
+    :param time_limit: Seconds after which no new generation is started (None for no limit)
+    :type time_limit: None | float
+    :param elite: Number of best chromosomes copied to the next generation
+    :type elite: int
+    :param mutation_rate: Probability of mutating a child (a swap in the order and a new orientation gene)
+    :type mutation_rate: float
+    :param tournament: Number of chromosomes competing to be a parent
+    :type tournament: int
+    :param workers: Number of worker processes evaluating the population (0 or 1 to evaluate in this process, None for the number of CPUs)
+    :type workers: None | int
+    :param seed: Seed of the random choices
+    :type seed: None | int
+    :param allow_full_rotation: True allow items to rotate on the axis "other" axis
+    :type allow_full_rotation: bool
+    :param fresh_start: Used to clear the bins before the packing (the genetic packer always packs all the fleet from scratch)
+    :type fresh_start: bool
+    """
+    import copy
+    import os
+    import random
+    import time
+
+    begin = time.perf_counter()
+    rng = random.Random(seed)
+    constraints.sort()
+    for bin in available_bins:
+        bin.reset()
+    if not items_to_pack:
+        return []
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            item.stand = False
+            item.set_bottom_surface(item.widest_surface())
+    sizes = [tuple(item.size) for item in items_to_pack]
+    count = len(items_to_pack)
+    problem = (available_bins, items_to_pack, sizes, constraints, default_bin, allow_full_rotation)
+
+    # with a checkpoint the population is saved with the items numbered as in the checkpoint
+    checkpoint = current_checkpoint.get()
+    saved = None
+    if checkpoint is not None:
+        to_saved = [checkpoint.index(item) for item in items_to_pack]
+        from_saved = {saved_idx: idx for idx, saved_idx in enumerate(to_saved)}
+        saved = checkpoint.resume_state("genetic_packer")
+        def save_state(generation : int) -> None:
+            population = []
+            for _, _, (order, genes) in scored:
+                saved_genes = [0]*count
+                for idx, gene in enumerate(genes):
+                    saved_genes[to_saved[idx]] = gene
+                population.append([[to_saved[idx] for idx in order], saved_genes])
+            version, internal, gauss = rng.getstate()
+            state = {"generation": generation, "population": population, "random": [version, list(internal), gauss]}
+            configuration, _ = _genetic_decode(problem, *scored[0][2])
+            checkpoint.save("genetic_packer", state, configuration)
+
+    with phase("seeding"):
+        population = []
+        generation = 0
+        if saved is not None:
+            generation = saved["generation"]
+            for order, genes in saved["population"]:
+                population.append(([from_saved[idx] for idx in order], [genes[to_saved[idx]] for idx in range(count)]))
+            version, internal, gauss = saved["random"]
+            rng.setstate((version, tuple(internal), gauss))
+        for seed_algorithm in ("all_lay", "big_lay_small_stand") if saved is None else ():
+            fleet, items = copy.deepcopy((available_bins, items_to_pack))
+            index = {id(item): idx for idx, item in enumerate(items)}
+            configuration = algorithms[seed_algorithm](fleet, items, list(constraints), default_bin=default_bin, allow_full_rotation=allow_full_rotation)
+            order = [index[id(item)] for bin in configuration for item in bin.items]
+            placed = set(order)
+            order += [idx for idx in range(count) if idx not in placed]
+            genes = [0]*count
+            for item in items:
+                idx = index[id(item)]
+                orientations = _orientations(sizes[idx], allow_full_rotation)
+                current = tuple(item.size)
+                genes[idx] = orientations.index(current) if current in orientations else 0
+            population.append((order, genes))
+        while len(population) < population_size:
+            order = list(range(count))
+            rng.shuffle(order)
+            population.append((order, [rng.randrange(6) for _ in range(count)]))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers, initializer=_genetic_init, initargs=(problem,))
+    evaluation_problem = copy.deepcopy(problem)
+    def evaluate(chromosomes : list) -> list[float]:
+        with phase("fitness evaluation"):
+            if executor is None:
+                return [_genetic_fitness(evaluation_problem, chromosome) for chromosome in chromosomes]
+            return list(executor.map(_genetic_evaluate, chromosomes, chunksize=max(1, len(chromosomes)//(4*workers))))
+
+    try:
+        scored = sorted(zip(evaluate(population), range(len(population)), population))
+        for generation in range(generation, generations):
+            if time_limit is not None and time.perf_counter() - begin > time_limit:
+                break
+            if checkpoint is not None and checkpoint.due():
+                with phase("checkpoint"):
+                    save_state(generation)
+            def select():
+                return min(rng.sample(scored, min(tournament, len(scored))))[2]
+            children = []
+            while len(children) < population_size - elite:
+                first, second = select(), select()
+                order = _order_crossover(rng, first[0], second[0])
+                genes = [rng.choice((a, b)) for a, b in zip(first[1], second[1])]
+                if rng.random() < mutation_rate:
+                    a, b = rng.randrange(count), rng.randrange(count)
+                    order[a], order[b] = order[b], order[a]
+                    genes[rng.randrange(count)] = rng.randrange(6)
+                children.append((order, genes))
+            elite_chromosomes = scored[:elite]
+            scored = sorted(elite_chromosomes + list(zip(evaluate(children), range(elite, elite+len(children)), children)))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    configuration, _ = _genetic_decode(problem, *scored[0][2])
+    return configuration
+
+class _SearchLimit(Exception):
+    """
+    Raised to stop a search that reached its node or time limit
+    """
+    pass
+
+@algorithm
+def branch_and_bound(available_bins : list[Bin], items_to_pack : list[Item], constraints : list[Constraint], default_bin : None|BinModel = None, node_limit : None|int = 1000000,
+                     time_limit : None|float = 10.0, memo_limit : int = 1000000, allow_full_rotation : bool = False, fresh_start : bool = True):
+    """
+    An exact depth first search for small instances (e.g. the parcels of a single delivery): it maximizes the loaded volume,
+    then minimizes the bins used
+
+    Every item is tried in every open bin at every corner position (see _candidate_positions) in every orientation, in a new bin, or left out,
+    so the packing is optimal among the packings whose items are placed at corners, under all the constraints.
+    Branches are cut when the free volume, the free weight capacity (a fractional knapsack) or the bins needed
+    cannot improve the best packing found. Identical items are placed in non decreasing bins (left out ones last),
+    bins of the same model are opened in order and partial packings already explored are remembered.
+    When the node or time limit is reached the best packing found so far is returned.
+    With an active checkpoint (see py3dbl.checkpoint) the best packing is saved periodically and a new run starts from it.
+
+    :param available_bins: A fleet of bins to use
+    :type available_bins: list[Bin]
+    :param items_to_pack: The list of items to pack
+    :type items_to_pack: list[Item]
+    :param constraints: Constraints to follow (additional to the constraints of the model)
+    :type constraints: list[Constraint]
+    :param default_bin: A default bin to use if there are no more available bins
+    :type default_bin: None | BinModel
+    :param node_limit: Maximum number of nodes explored (None for no limit)
+    :type node_limit: None | int
+    :param time_limit: Seconds after which the search stops (None for no limit)
+    :type time_limit: None | float
+    :param memo_limit: Maximum number of partial packings remembered
+    :type memo_limit: int
+    :param allow_full_rotation: True allow items to rotate on the axis "other" axis
+    :type allow_full_rotation: bool
+    :param fresh_start: Used to clear the bins before the packing
+    :type fresh_start: bool
+    """
+    import copy
+    import math
+    import time
+
+    begin = time.perf_counter()
+    constraints.sort()
+    if fresh_start:
+        for bin in available_bins:
+            bin.reset()
+
+    with phase("pre-orientation"):
+        for item in items_to_pack:
+            item.stand = False
+            item.set_bottom_surface(item.widest_surface())
+
+    with phase("sorting"):
+        # identical items are next to each other
+        items_to_pack.sort(key=lambda item: (-item.volume(), sorted(item.size), item.weight, item.priority))
+    count = len(items_to_pack)
+    kinds = []
+    for idx, item in enumerate(items_to_pack):
+        key = (tuple(sorted(item.size)), item.weight, item.priority)
+        kinds.append(kinds[idx-1] if idx and key == previous else idx)
+        previous = key
+    volumes = [item.volume() for item in items_to_pack]
+    orientations = [_orientations(item.size, allow_full_rotation) for item in items_to_pack]
+    original_sizes = [tuple(item.size) for item in items_to_pack]
+
+    # bins already loaded are open from the start, the others are opened when an item is placed in them
+    open_bins = [Bin(bin.id, bin._model) for bin in available_bins if bin.items]
+    sources = [idx for idx, bin in enumerate(available_bins) if bin.items]
+    for bin, idx in zip(open_bins, sources):
+        for item in available_bins[idx].items:
+            bin.place_item(item)
+    unused = [idx for idx, bin in enumerate(available_bins) if not bin.items]
+    models_available = [available_bins[idx]._model for idx in unused] + ([default_bin] if default_bin is not None else [])
+
+    # items that cannot fit any bin by themselves do not count in the bounds
+    def packable(idx : int) -> bool:
+        return any(items_to_pack[idx].weight <= model.max_weight and
+                   any(all(size[axis] <= model.dimensions[axis] for axis in range(3)) for size in orientations[idx])
+                   for model in [*models_available, *(bin._model for bin in open_bins)])
+    bounded = [volumes[idx] if packable(idx) else Decimal(0) for idx in range(count)]
+    suffix_volume = [Decimal(0)]*(count+1)
+    for idx in reversed(range(count)):
+        suffix_volume[idx] = suffix_volume[idx+1] + bounded[idx]
+    by_density = sorted((idx for idx in range(count) if bounded[idx]),
+                        key=lambda idx: -volumes[idx]/items_to_pack[idx].weight if items_to_pack[idx].weight > 0 else -Decimal("Infinity"))
+
+    def unopened() -> list[tuple]:
+        """
+        Bins that can be opened: (fleet index or None for the default bin, model), one per model
+        """
+        opened = set(sources)
+        options = dict()
+        for idx in unused:
+            if idx not in opened and id(available_bins[idx]._model) not in options:
+                options[id(available_bins[idx]._model)] = (idx, available_bins[idx]._model)
+        if not options and default_bin is not None:
+            options[None] = (None, default_bin)
+        return list(options.values())
+
+    def bound(step : int, loaded : Decimal) -> tuple[Decimal,int]:
+        """
+        Best loaded volume and fewest bins reachable from the current partial packing
+        """
+        free_volume = sum((bin.volume() - sum((item.volume() for item in bin.items), Decimal(0)) for bin in open_bins), Decimal(0))
+        free_weight = sum((bin.max_weight - bin.weight for bin in open_bins), Decimal(0))
+        opened = set(sources)
+        largest = Decimal(0)
+        for idx in unused:
+            if idx not in opened:
+                model = available_bins[idx]._model
+                free_volume += model.volume()
+                free_weight += model.max_weight
+                largest = max(largest, model.volume())
+        if default_bin is not None:
+            free_volume = free_weight = Decimal("Infinity")
+            largest = max(largest, default_bin.volume())
+        # fractional knapsack of the remaining items on the free weight capacity
+        weight_bound = Decimal(0)
+        for idx in by_density:
+            if idx < step:
+                continue
+            weight = items_to_pack[idx].weight
+            if weight <= free_weight:
+                free_weight -= weight
+                weight_bound += volumes[idx]
+            else:
+                weight_bound += volumes[idx]*free_weight/weight
+                break
+        reachable = min(suffix_volume[step], free_volume, weight_bound)
+        bins = len(open_bins)
+        if reachable == suffix_volume[step] and largest > 0:
+            # every remaining item has to be packed, in the open bins or in new ones
+            free_open = sum((bin.volume() - sum((item.volume() for item in bin.items), Decimal(0)) for bin in open_bins), Decimal(0))
+            bins += max(0, math.ceil((suffix_volume[step]-free_open)/largest))
+        return loaded + reachable, bins
+
+    # value, bin sources and placements of the best packing
+    best = [(Decimal(-1), 0), list(sources), []]
+    # the beam search packing is the first incumbent
+    with phase("warm start"):
+        fleet, items = copy.deepcopy((available_bins, items_to_pack))
+        fleet_index = {id(bin): idx for idx, bin in enumerate(fleet)}
+        steps = {id(item): step for step, item in enumerate(items)}
+        configuration = algorithms["beam_search"](fleet, items, list(constraints), default_bin=default_bin, allow_full_rotation=allow_full_rotation, fresh_start=False)
+        loaded = sum((volumes[steps[id(item)]] for bin in configuration for item in bin.items if id(item) in steps), Decimal(0))
+        best[0] = (loaded, -len(configuration))
+        best[1] = [fleet_index.get(id(bin)) for bin in configuration]
+        best[2] = [(steps[id(item)], slot, tuple(item.position), tuple(item.size))
+                   for slot, bin in enumerate(configuration) for item in bin.items if id(item) in steps]
+
+    # with a checkpoint the best packing is saved periodically, a saved one replaces the warm start when it is better
+    checkpoint = current_checkpoint.get()
+    if checkpoint is not None:
+        to_saved = [checkpoint.index(item) for item in items_to_pack]
+        saved = checkpoint.resume_state("branch_and_bound")
+        if saved is not None and (Decimal(saved["value"][0]), saved["value"][1]) > best[0]:
+            from_saved = {saved_idx: step for step, saved_idx in enumerate(to_saved)}
+            best[0] = (Decimal(saved["value"][0]), saved["value"][1])
+            best[1] = saved["sources"]
+            best[2] = [(from_saved[idx], slot, tuple(map(Decimal, position)), tuple(map(Decimal, size))) for idx, slot, position, size in saved["placements"]]
+
+    def save_best() -> None:
+        value, best_sources, best_placements = best
+        # the items are being moved by the search: the configuration is saved with copies
+        bins = [Bin(available_bins[idx].id, available_bins[idx]._model) if idx is not None else Bin(slot, default_bin) for slot, idx in enumerate(best_sources)]
+        saved_index = dict()
+        for step, slot, position, size in best_placements:
+            item = items_to_pack[step]
+            placed = Item(item.name, Volume(size, position), item.weight, item.priority, item.max_load)
+            saved_index[id(placed)] = to_saved[step]
+            bins[slot].place_item(placed)
+        fleet_index = {id(bin): idx for bin, idx in zip(bins, best_sources)}
+        state = {"value": [str(value[0]), value[1]], "sources": best_sources,
+                 "placements": [[to_saved[step], slot, [str(v) for v in position], [str(v) for v in size]] for step, slot, position, size in best_placements]}
+        checkpoint.save("branch_and_bound", state, bins, index=lambda item: saved_index[id(item)], bin_index=lambda bin: fleet_index[id(bin)])
+
+    placements = []
+    visited = set()
+    nodes = 0
+
+    def state(step : int, previous : None|int) -> tuple:
+        loads = [[] for _ in open_bins]
+        for idx, slot, position, size in placements:
+            loads[slot].append((kinds[idx], position, size))
+        return (step, previous, tuple((id(bin._model), frozenset(load)) for bin, load in zip(open_bins, loads)))
+
+    def search(step : int, loaded : Decimal, previous : None|int) -> None:
+        nonlocal nodes
+        nodes += 1
+        if node_limit is not None and nodes > node_limit:
+            raise _SearchLimit()
+        if time_limit is not None and nodes % 256 == 0 and time.perf_counter() - begin > time_limit:
+            raise _SearchLimit()
+        if checkpoint is not None and nodes % 256 == 0 and checkpoint.due():
+            with phase("checkpoint"):
+                save_best()
+        if step == count:
+            value = (loaded, -len(open_bins))
+            if value > best[0]:
+                best[0] = value
+                best[1] = list(sources)
+                best[2] = list(placements)
+            return
+        reachable, bins = bound(step, loaded)
+        if (reachable, -bins) <= best[0]:
+            return
+        key = state(step, previous)
+        if key in visited:
+            return
+        if len(visited) < memo_limit:
+            visited.add(key)
+
+        item = items_to_pack[step]
+        same = step > 0 and kinds[step] == kinds[step-1]
+        # an item identical to a left out one is left out too
+        if not (same and previous is None):
+            first = previous if same else 0
+            for slot in range(first, len(open_bins)):
+                bin = open_bins[slot]
+                with phase("candidate generation"):
+                    candidates = [(position, size) for position in _candidate_positions(bin.items) for size in orientations[step]]
+                for position, size in candidates:
+                    item.position = Vector3(*position)
+                    item.size = Vector3(*size)
+                    if not bin.put_item(item, constraints):
+                        continue
+                    placements.append((step, slot, tuple(item.position), tuple(item.size)))
+                    try:
+                        search(step+1, loaded+volumes[step], slot)
+                    finally:
+                        placements.pop()
+                        bin.pop_item()
+            for fleet_idx, model in unopened():
+                bin = Bin(available_bins[fleet_idx].id if fleet_idx is not None else len(open_bins), model)
+                for size in orientations[step]:
+                    item.position = Vector3()
+                    item.size = Vector3(*size)
+                    if not bin.put_item(item, constraints):
+                        continue
+                    open_bins.append(bin)
+                    sources.append(fleet_idx)
+                    placements.append((step, len(open_bins)-1, tuple(item.position), tuple(item.size)))
+                    try:
+                        search(step+1, loaded+volumes[step], len(open_bins)-1)
+                    finally:
+                        placements.pop()
+                        sources.pop()
+                        open_bins.pop()
+                        bin.pop_item()
+        search(step+1, loaded, None)
+
+    with phase("search"):
+        try:
+            search(0, Decimal(0), None)
+        except _SearchLimit:
+            pass
+    if checkpoint is not None:
+        save_best()
+
+    # the best packing is applied to the real bins and items, in the order of the search that checked its placements
+    _, best_sources, best_placements = best
+    for item, size in zip(items_to_pack, original_sizes):
+        item.position = Vector3()
+        item.size = Vector3(*size)
+    current_configuration = [available_bins[idx] if idx is not None else Bin(slot, default_bin) for slot, idx in enumerate(best_sources)]
+    for step, slot, position, size in best_placements:
+        item = items_to_pack[step]
+        item.position = Vector3(*position)
+        item.size = Vector3(*size)
+        current_configuration[slot].place_item(item)
+    return current_configuration
+
+if __name__ == "__main__":
+    # Algorithms testing: every item is packed and the configurations pass the constraints when rebuilt from scratch
+    import random
+    from .Constraints import constraints as registered
+
+    testmodel1 = BinModel("test",(4,3,5),100,[registered['weight_within_limit'],registered['fits_inside_bin'],registered['no_overlap'],registered['is_supported']])
+
+    def testitems(count : int, seed : int) -> list[Item]:
+        rng = random.Random(seed)
+        return [Item(f"item{idx}",Volume((rng.randint(1,3),rng.randint(1,2),rng.randint(1,3))),rng.randint(1,10),0) for idx in range(count)]
+
+    def check(configuration : list[Bin], items : list[Item], model : BinModel = testmodel1) -> None:
+        loaded = [item for bin in configuration for item in bin.items]
+        assert sorted(map(id, loaded)) == sorted(map(id, items)), (len(loaded), len(items))
+        for bin in configuration:
+            rebuilt = Bin(None,model)
+            assert all(rebuilt.put_item(item) for item in bin.items), [str(item) for item in bin.items]
+            assert rebuilt.weight == bin.weight, (rebuilt.weight, bin.weight)
+
+    items = testitems(30,1)
+    configuration = algorithms['beam_search']([],items,[],default_bin=testmodel1)
+    check(configuration,items)
+    greedy = algorithms['all_lay']([],testitems(30,1),[],default_bin=testmodel1)
+    assert len(configuration) <= len(greedy), (len(configuration), len(greedy))
+
+    # genetic_packer: the same seed gives the same packing, in process or with a pool of workers
+    items = testitems(20,2)
+    configuration = algorithms['genetic_packer']([],items,[],default_bin=testmodel1,population_size=6,generations=4,workers=1,seed=5)
+    check(configuration,items)
+    placements = [[(item.name, tuple(item.position), tuple(item.size)) for item in bin.items] for bin in configuration]
+    items = testitems(20,2)
+    configuration = algorithms['genetic_packer']([],items,[],default_bin=testmodel1,population_size=6,generations=4,workers=2,seed=5)
+    check(configuration,items)
+    assert [[(item.name, tuple(item.position), tuple(item.size)) for item in bin.items] for bin in configuration] == placements
+
+    # branch_and_bound: never worse than the beam search it starts from, also with a partly loaded fleet
+    items = testitems(8,3)
+    configuration = algorithms['branch_and_bound']([],items,[],default_bin=testmodel1,time_limit=5.0)
+    check(configuration,items)
+    assert len(configuration) <= len(algorithms['beam_search']([],testitems(8,3),[],default_bin=testmodel1))
+    testfleet = [Bin("loaded",testmodel1)]
+    preloaded = Item("preloaded",Volume((4,1,5)),10,0)
+    assert testfleet[0].put_item(preloaded)
+    items = testitems(6,4)
+    configuration = algorithms['branch_and_bound'](testfleet,items,[],default_bin=testmodel1,time_limit=5.0,fresh_start=False)
+    assert configuration[0] is testfleet[0] and testfleet[0].items[0] is preloaded, [str(bin) for bin in configuration]
+    check(configuration,items+[preloaded])
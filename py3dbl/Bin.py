@@ -2,6 +2,8 @@ from decimal import Decimal
 from .Decimal import set_to_decimal
 from .Item import Item
 from .Space import Vector3, Volume
+from .Monitor import current_monitor
+from .Indexes import BinIndex, Moments, SupportGraph
 from typing import Sequence, Iterable
 from functools import reduce
 
@@ -65,20 +67,28 @@ class BinModel():
         self.depth = set_to_decimal(self.depth, number_of_decimals)
         self.max_weight = set_to_decimal(self.max_weight, number_of_decimals)
 
-# BinModel Testing
-testmodel1 = BinModel("testmodel",(1,2,3),1,[],[Volume((1,1,1))])
-assert str(testmodel1) == "testmodel(1x2x3, max_weight:1) vol(5)", str(testmodel1)
-testmodel1.width = Decimal(1.1111)
-testmodel1.height = Decimal(2.2222)
-testmodel1.depth = Decimal(3.3333)
-testmodel1.max_weight = Decimal(1.1111)
-testmodel1.format_numbers(2)
-assert str(testmodel1) == "testmodel(1.11x2.22x3.33, max_weight:1.11) vol(7.205786)", str(testmodel1)
-# set_constraints to test in constraints module
+# dictionary of currently registered models
+models : dict[str:BinModel] = dict()
+
+def register_model(model : BinModel) -> BinModel:
+    """
+    Register a model by its name (e.g. to make it available to the packing server)
+
+    :param model: The model to register
+    :type model: BinModel
+    :return: The registered model
+    :rtype: BinModel
+    """
+    models[model.name] = model
+    return model
 
 class Bin:
     """
     Describes a loadable bin (i.e. an instance of a bin)
+
+    The items of a bin are changed only through put_item, place_item, pop_item, remove_item and reset: they keep the weight,
+    the indexes (see Indexes.BinIndex) and the active monitor up to date. Other changes to the items list are only noticed
+    by the indexes when they change its length or its last item, which then triggers a full rebuild on their next use.
     """
     def __init__(self, id, model : BinModel):
         """
@@ -90,6 +100,7 @@ class Bin:
         self._model = model
         self.items  = list() # Current loaded items
         self.weight = 0      # Current loaded weight
+        self._indexes : dict[str:BinIndex] = dict()
 
     # Properties to access model data
     # Note: direct write access is not allowed
@@ -130,39 +141,128 @@ class Bin:
         :type static_constraints: list[Constraint]
         """
         
-        if all(map(lambda c: c(self,item), additional_constraints)) and all(map(lambda c: c(self,item),self._model.constraints)):
-            self.items.append(item)
-            self.weight += item.weight
+        monitor = current_monitor.get()
+        if monitor is None:
+            passed = all(map(lambda c: c(self,item), additional_constraints)) and all(map(lambda c: c(self,item),self._model.constraints))
+        else:
+            passed = monitor.check(self,item,[*additional_constraints,*self._model.constraints])
+        if passed:
+            self.place_item(item)
             return True
         else:
             return False
+
+    def place_item(self, item : Item) -> None:
+        """
+        Insert an item without checking any constraint (e.g. to restore a saved configuration)
+
+        :param item: Item to insert, in its final position
+        :type item: Item
+        """
+        self.items.append(item)
+        self.weight += item.weight
+        for index in self._indexes.values():
+            index._inserted(self, item)
+        monitor = current_monitor.get()
+        if monitor is not None:
+            monitor.on_insert(self, item)
+
+    def pop_item(self) -> Item:
+        """
+        Remove the last inserted item without checking the constraints of the other items (e.g. to undo a tentative placement)
+
+        :return: The removed item
+        :rtype: Item
+        """
+        item = self.items.pop()
+        self.weight -= item.weight
+        for index in self._indexes.values():
+            index._removed(self, item)
+        monitor = current_monitor.get()
+        if monitor is not None:
+            monitor.on_remove(self, item)
+        return item
     
     def remove_item(self, item : Item) -> bool:
         """
         Remove the specified Item from the list, return True if the item was found, False if not
+
+        The items resting on it (then the ones resting on them, and so on) are checked again against the constraints of the model
+        and removed if they fail, the support graph of the bin (see Indexes.SupportGraph) limits the check to them.
         
         :param item: The item to remove
         :type item: Item
         :return: True if item was present else False
         :rtype: bool
         """
-        try:
-            self.items.remove(item)
-            self.weight -= item.weight
-            old_items = self.items
-            for item in old_items:
-                if not all(map(lambda c: c(self,item),self._model.constraints)):
-                    self.items.remove(item)
-            return True
-        except ValueError:
+        if item not in self.items:
             return False # the item was not there
+        if not self._model.constraints:
+            self._take_out(item)
+            return True
+        graph = self.index("support", SupportGraph)
+        pending = graph.resting_on(item)
+        self._take_out(item)
+        while pending:
+            other = pending.pop()
+            if other not in self.items:
+                continue
+            resting = graph.resting_on(other)
+            self._take_out(other)
+            if all(map(lambda c: c(self,other),self._model.constraints)):
+                self.place_item(other)
+            else:
+                pending.extend(resting)
+        return True
+
+    def _take_out(self, item : Item) -> None:
+        self.items.remove(item)
+        self.weight -= item.weight
+        for index in self._indexes.values():
+            index._removed(self, item)
+        monitor = current_monitor.get()
+        if monitor is not None:
+            monitor.on_remove(self, item)
         
     def reset(self) -> None:
         """
         Clear the bin from any item
         """
+        monitor = current_monitor.get()
+        if monitor is not None:
+            for item in self.items:
+                monitor.on_remove(self, item)
         self.items = list()
         self.weight = 0
+        for index in self._indexes.values():
+            index.rebuild(self)
+
+    def index(self, name : str, factory : type[BinIndex]) -> BinIndex:
+        """
+        The index with the given name, created with factory on first use and kept up to date with the items
+
+        :param name: Name of the index (e.g. "moments")
+        :type name: str
+        :param factory: Class of the index
+        :type factory: type[BinIndex]
+        :rtype: BinIndex
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = factory()
+            index.rebuild(self)
+        else:
+            index.sync(self)
+        return index
+
+    def center_of_gravity(self) -> None|Vector3:
+        """
+        Centre of gravity of the loaded items (None if the bin carries no weight)
+        """
+        moments = self.index("moments", Moments)
+        if moments.weight == 0:
+            return None
+        return Vector3(*(moment/moments.weight for moment in moments.moment))
 
     def prune(self,constraint) -> dict[str:list[Item]]:
         """
@@ -181,11 +281,23 @@ class Bin:
                 to_remove.append(item)
         return {"notpass":to_remove,"pass":to_keep}
 
-# Bin testing
-testbin1 = Bin(1,testmodel1)
-assert str(testbin1) == "Bin 1 of model testmodel: loaded items 0", str(testbin1)
-testitem1 = Item("testitem",Volume([2,2,2]),2,0) # no constraints are set so I can put anything
-assert testbin1.put_item(testitem1), " ".join(testbin1.items)
-testbin1.reset()
-assert len(testbin1.items) == 0, len(testbin1.items)
-# prune to test in constraints module
+if __name__ == "__main__":
+    # BinModel Testing
+    testmodel1 = BinModel("testmodel",(1,2,3),1,[],[Volume((1,1,1))])
+    assert str(testmodel1) == "testmodel(1x2x3, max_weight:1) vol(5)", str(testmodel1)
+    testmodel1.width = Decimal(1.1111)
+    testmodel1.height = Decimal(2.2222)
+    testmodel1.depth = Decimal(3.3333)
+    testmodel1.max_weight = Decimal(1.1111)
+    testmodel1.format_numbers(2)
+    assert str(testmodel1) == "testmodel(1.11x2.22x3.33, max_weight:1.11) vol(7.205786)", str(testmodel1)
+    # set_constraints to test in constraints module
+
+    # Bin testing
+    testbin1 = Bin(1,testmodel1)
+    assert str(testbin1) == "Bin 1 of model testmodel: loaded items 0", str(testbin1)
+    testitem1 = Item("testitem",Volume([2,2,2]),2,0) # no constraints are set so I can put anything
+    assert testbin1.put_item(testitem1), " ".join(testbin1.items)
+    testbin1.reset()
+    assert len(testbin1.items) == 0, len(testbin1.items)
+    # prune to test in constraints module
@@ -1,6 +1,8 @@
+from decimal import Decimal
 from .Bin import Bin,BinModel
 from .Item import Item
 from .Space import Volume,Vector3, intersect, rect_intersect
+from .Indexes import Moments, SupportGraph, DoorIndex
 
 class Constraint:
     """
@@ -129,28 +131,184 @@ def is_supported(bin: Bin, item : Item, allow_item_fall : bool = False, minimum_
         return True
     else:
         return False
-        
-# Constraint Testing
-assert len(constraints) == 4, len(constraints)
-assert constraints['weight_within_limit'] < constraints['fits_inside_bin'], constraints['weight_within_limit'].weight
-testmodel1 = BinModel(None,[1,1.5,1],1,[constraints['weight_within_limit']],[Volume((1,.5,1),(0,1,0))])
-testbin1 = Bin(None,testmodel1)
-testitem1 = Item(None,Volume([1,.5,1]),.5,0)
-testitem2 = Item(None,Volume([1,.5,1]),.5,0)
-assert testbin1.put_item(testitem1), constraints['weight_within_limit'](testbin1,testitem1)
-assert testbin1.items[0] == testitem1, testbin1.items
-assert testbin1.put_item(testitem2,[constraints['fits_inside_bin']])
-assert testbin1.items[1] == testitem2
-prune_return = testbin1.prune(constraint=constraints['no_overlap'])
-assert prune_return['notpass'] == [testitem1,testitem2] and prune_return['pass'] == [], (prune_return['notpass'],prune_return['pass'])
-assert testbin1.remove_item(testitem2) and len(testbin1.items) == 1, testbin1.items
-testmodel1.set_constraints([constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap'],constraints['is_supported']])
-assert not testbin1.put_item(testitem2) and len(testbin1.items) == 1
-testitem2.position = Vector3(0,.5,0)
-assert testbin1.put_item(testitem2), [c(testbin1,testitem2) for c in testbin1._model.constraints]
-testitem3 = Item(None,Volume([.5,.5,.5]),0,0)
-assert [c(testbin1,testitem3) for c in constraints.values()] == [ True, True, False, True], [c(testbin1,testitem3) for c in constraints.values()]
-testitem3.position = Vector3(1,1.5,1)
-testmodel1._size.y = 2 # bin 1x2x1
-testitem3.weight = .001
-assert [c(testbin1,testitem3) for c in constraints.values()] == [ False, False, True, False], [c(testbin1,testitem3) for c in constraints.values()]
\ No newline at end of file
+
+@constraint(weight=12)
+def weight_distribution(bin : Bin, item : Item, min_cog_x : None|Decimal = None, max_cog_x : None|Decimal = None, max_cog_y : None|Decimal = None,
+                        min_cog_z : None|Decimal = None, max_cog_z : None|Decimal = None, front_axle : None|Decimal = None, rear_axle : None|Decimal = None,
+                        max_front_load : None|Decimal = None, max_rear_load : None|Decimal = None, min_weight : Decimal = 0) -> bool:
+    """
+    Check that with the item the centre of gravity of the load stays within limits and the load on the axles does not exceed their capacity
+
+    Weight and moments of the load are kept by the bin (see Bin.center_of_gravity), so the check does not depend on the number of items.
+    Limits are coordinates in the bin, None for no limit. The z axis runs along the vehicle, the axles are at the given z
+    (they can be outside the bin) and the load of the axles is the one due to the loaded items.
+    Limits are usually set per model, with a copy of this constraint in the model constraints::
+
+        balance = Constraint(constraints['weight_distribution'].func, constraints['weight_distribution'].weight)
+        balance.set_parameter("front_axle", Decimal("-0.4"))
+        ...
+        van = BinModel("van", (1.6,1.3,2.4), 900, [balance])
+
+    :param bin: Target bin
+    :type bin: Bin
+    :param item: Target item
+    :type item: Item
+    :param min_cog_x: Minimum x of the centre of gravity (e.g. the left side)
+    :param max_cog_x: Maximum x of the centre of gravity
+    :param max_cog_y: Maximum height of the centre of gravity
+    :param min_cog_z: Minimum z of the centre of gravity
+    :param max_cog_z: Maximum z of the centre of gravity
+    :param front_axle: Position of the front axle along z
+    :param rear_axle: Position of the rear axle along z
+    :param max_front_load: Maximum load on the front axle
+    :param max_rear_load: Maximum load on the rear axle
+    :param min_weight: The centre of gravity limits apply only to loads of at least this weight (the first items of a load are rarely balanced)
+    :type min_weight: Decimal
+    :raises ValueError: If only one of the axles is given, or a maximum axle load without the axles
+    """
+    if (front_axle is None) != (rear_axle is None) or (front_axle is None and (max_front_load is not None or max_rear_load is not None)):
+        raise ValueError("weight_distribution: the axle loads need both front_axle and rear_axle")
+    if front_axle is None and all(limit is None for limit in (min_cog_x, max_cog_x, max_cog_y, min_cog_z, max_cog_z)):
+        return True
+    weight, moment = bin.index("moments", Moments).with_item(item)
+    if weight <= 0:
+        return True
+    # limits may also be floats
+    if front_axle is not None:
+        rear_load = (moment[2] - weight*Decimal(front_axle))/(Decimal(rear_axle) - Decimal(front_axle))
+        if max_rear_load is not None and rear_load > max_rear_load:
+            return False
+        if max_front_load is not None and weight - rear_load > max_front_load:
+            return False
+    if weight < min_weight:
+        return True
+    for axis, low, high in ((0, min_cog_x, max_cog_x), (1, None, max_cog_y), (2, min_cog_z, max_cog_z)):
+        if low is not None and moment[axis] < Decimal(low)*weight:
+            return False
+        if high is not None and moment[axis] > Decimal(high)*weight:
+            return False
+    return True
+
+@constraint(weight=25)
+def stacking_weight(bin : Bin, item : Item, max_load_ratio : None|Decimal = None) -> bool:
+    """
+    Check that the weight of the item, spread on the items below it, does not exceed the load they can bear
+
+    The load of an item is limited by its max_load and by max_load_ratio times its weight.
+    The bin keeps the support graph and the load of every item, so only the items under the new one are visited.
+
+    :param bin: Target bin
+    :type bin: Bin
+    :param item: Target item
+    :type item: Item
+    :param max_load_ratio: Maximum load of every item as a multiple of its own weight (None for no limit)
+    :type max_load_ratio: None | Decimal
+    """
+    graph = bin.index("support", SupportGraph)
+    supports, contact = graph.supports(bin, item)
+    for support, added in graph.spread(supports, contact, item.weight):
+        load = graph.load[id(support)] + added
+        if support.max_load is not None and load > support.max_load:
+            return False
+        if max_load_ratio is not None and load > max_load_ratio*support.weight:
+            return False
+    return True
+
+@constraint(weight=17)
+def delivery_order(bin : Bin, item : Item, reverse : bool = False) -> bool:
+    """
+    Check that the items of earlier stops can be unloaded without moving the items of later stops:
+    an item must not stand between the doors (at the back of the bin, z = depth) and an item of an earlier stop
+
+    The stop of an item is its priority, lower priorities are unloaded first (the opposite with reverse).
+    The bin keeps its items on a grid of the x-y projection ordered by depth, so only the items in line with the new one are checked.
+    Packing the items of the last stops first helps the algorithms to satisfy it.
+
+    :param bin: Target bin
+    :type bin: Bin
+    :param item: Target item
+    :type item: Item
+    :param reverse: True if higher priorities are unloaded first
+    :type reverse: bool
+    """
+    doors = bin.index("access", DoorIndex)
+    stop = -item.priority if reverse else item.priority
+    for other in doors.behind(bin, item):
+        if (-other.priority if reverse else other.priority) < stop:
+            return False
+    for other in doors.in_front(bin, item):
+        if (-other.priority if reverse else other.priority) > stop:
+            return False
+    return True
+
+if __name__ == "__main__":
+    # Constraint Testing
+    assert len(constraints) == 7, len(constraints)
+    assert constraints['weight_within_limit'] < constraints['fits_inside_bin'], constraints['weight_within_limit'].weight
+    testmodel1 = BinModel(None,[1,1.5,1],1,[constraints['weight_within_limit']],[Volume((1,.5,1),(0,1,0))])
+    testbin1 = Bin(None,testmodel1)
+    testitem1 = Item(None,Volume([1,.5,1]),.5,0)
+    testitem2 = Item(None,Volume([1,.5,1]),.5,0)
+    assert testbin1.put_item(testitem1), constraints['weight_within_limit'](testbin1,testitem1)
+    assert testbin1.items[0] == testitem1, testbin1.items
+    assert testbin1.put_item(testitem2,[constraints['fits_inside_bin']])
+    assert testbin1.items[1] == testitem2
+    prune_return = testbin1.prune(constraint=constraints['no_overlap'])
+    assert prune_return['notpass'] == [testitem1,testitem2] and prune_return['pass'] == [], (prune_return['notpass'],prune_return['pass'])
+    assert testbin1.remove_item(testitem2) and len(testbin1.items) == 1, testbin1.items
+    testmodel1.set_constraints([constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap'],constraints['is_supported']])
+    assert not testbin1.put_item(testitem2) and len(testbin1.items) == 1
+    testitem2.position = Vector3(0,.5,0)
+    assert testbin1.put_item(testitem2), [c(testbin1,testitem2) for c in testbin1._model.constraints]
+    testitem3 = Item(None,Volume([.5,.5,.5]),0,0)
+    assert [c(testbin1,testitem3) for c in constraints.values()] == [ True, True, False, True, True, True, True], [c(testbin1,testitem3) for c in constraints.values()]
+    testitem3.position = Vector3(1,1.5,1)
+    testmodel1._size.y = 2 # bin 1x2x1
+    testitem3.weight = .001
+    assert [c(testbin1,testitem3) for c in constraints.values()] == [ False, False, True, False, True, True, True], [c(testbin1,testitem3) for c in constraints.values()]
+    # stacking_weight: the load of an item is limited by its max_load and by max_load_ratio times its weight
+    testmodel2 = BinModel(None,(1,3,1),100,[constraints['fits_inside_bin'],constraints['no_overlap'],constraints['stacking_weight']])
+    testbin2 = Bin(None,testmodel2)
+    assert testbin2.put_item(Item("base",Volume((1,1,1)),2,0,max_load=3))
+    assert testbin2.put_item(Item("middle",Volume((1,1,1),(0,1,0)),2,0))
+    testitem4 = Item("top",Volume((1,1,1),(0,2,0)),2,0)
+    assert not testbin2.put_item(testitem4), testbin2.index("support",SupportGraph).load
+    testitem4.weight = 1
+    ratio = Constraint(constraints['stacking_weight'].func,constraints['stacking_weight'].weight)
+    ratio.set_parameter("max_load_ratio",Decimal("0.25"))
+    assert not ratio(testbin2,testitem4)
+    assert testbin2.put_item(testitem4) and [testbin2.index("support",SupportGraph).load[id(item)] for item in testbin2.items] == [3,1,0]
+    # delivery_order: no item stands between the doors (z = depth) and an item of an earlier stop
+    testmodel3 = BinModel(None,(1,1,3),100,[constraints['fits_inside_bin'],constraints['no_overlap'],constraints['delivery_order']])
+    testbin3 = Bin(None,testmodel3)
+    assert testbin3.put_item(Item("second",Volume((1,1,1)),1,2))
+    assert testbin3.put_item(Item("first",Volume((1,1,1),(0,0,1)),1,1))
+    testitem5 = Item("third",Volume((1,1,1),(0,0,2)),1,3)
+    assert not testbin3.put_item(testitem5)
+    reverse = Constraint(constraints['delivery_order'].func,constraints['delivery_order'].weight)
+    reverse.set_parameter("reverse",True)
+    assert reverse(testbin3,testitem5)
+    testbin4 = Bin(None,testmodel3)
+    assert testbin4.put_item(Item("first",Volume((1,1,1),(0,0,2)),1,1))
+    assert not testbin4.put_item(Item("zeroth",Volume((1,1,1)),1,0))
+    assert testbin4.put_item(Item("second",Volume((1,1,1)),1,2)) and len(testbin4.items) == 2
+    # weight_distribution: float weights are accepted, the axles are given together
+    balance = Constraint(constraints['weight_distribution'].func,constraints['weight_distribution'].weight)
+    balance.set_parameter("max_cog_z",1)
+    testbin5 = Bin(None,BinModel(None,(1,1,4),100,[constraints['fits_inside_bin'],constraints['no_overlap'],balance]))
+    assert testbin5.put_item(Item("front",Volume((1,1,1)),.5,0))
+    assert not testbin5.put_item(Item("back",Volume((1,1,1),(0,0,3)),.5,0))
+    assert testbin5.put_item(Item("middle",Volume((1,1,1),(0,0,1)),.25,0))
+    assert testbin5.center_of_gravity().z == Decimal("0.625")/Decimal("0.75"), testbin5.center_of_gravity()
+    balance.set_parameter("max_cog_z",None)
+    balance.set_parameter("front_axle",0)
+    try:
+        balance(testbin5,Item("probe",Volume((1,1,1),(0,0,2)),.25,0))
+        raise AssertionError("front_axle accepted without rear_axle")
+    except ValueError:
+        pass
+    balance.set_parameter("rear_axle",4)
+    balance.set_parameter("max_rear_load",.3)
+    assert not balance(testbin5,Item("probe",Volume((1,1,1),(0,0,2)),.25,0)) # rear load 1.25/4
+    balance.set_parameter("max_rear_load",.35)
+    assert balance(testbin5,Item("probe",Volume((1,1,1),(0,0,2)),.25,0))
@@ -0,0 +1,339 @@
+import bisect
+import heapq
+import math
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Iterator
+from .Space import Vector3, rect_intersect
+
+class BinIndex(ABC):
+    """
+    A structure derived from the items of a bin and updated incrementally as items are put in or taken out
+    (e.g. running sums or spatial lookups used by the constraints)
+
+    Indexes are created on demand by Bin.index and notified by the methods changing the items of the bin
+    (see the Bin class for the contract). Items are keyed by identity.
+    Subclasses implement clear and insert, and discard when an item can be taken out without a rebuild.
+    """
+    def __init__(self):
+        self.count = 0   # items indexed
+        self.last = None # last item indexed
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Forget every item
+        """
+
+    @abstractmethod
+    def insert(self, bin, item) -> None:
+        """
+        Add an item just put in the bin (bin.items already holds it, insert is also called for every item on a rebuild)
+        """
+
+    def discard(self, bin, item) -> bool:
+        """
+        Take out an item just removed from the bin
+
+        :return: False if the index has to be rebuilt instead
+        :rtype: bool
+        """
+        return False
+
+    def rebuild(self, bin) -> None:
+        self.clear()
+        for item in bin.items:
+            self.insert(bin, item)
+        self.count = len(bin.items)
+        self.last = bin.items[-1] if bin.items else None
+
+    def in_sync(self, bin, count : int) -> bool:
+        """
+        True if the index holds exactly the first count items of the bin
+        """
+        return self.count == count and (count == 0 or bin.items[count-1] is self.last)
+
+    def sync(self, bin) -> None:
+        if not self.in_sync(bin, len(bin.items)):
+            self.rebuild(bin)
+
+    def _inserted(self, bin, item) -> None:
+        if self.in_sync(bin, len(bin.items)-1):
+            self.insert(bin, item)
+            self.count += 1
+            self.last = item
+        else:
+            self.rebuild(bin)
+
+    def _removed(self, bin, item) -> None:
+        synced = self.count == len(bin.items)+1 and (self.last is item or (bin.items and bin.items[-1] is self.last))
+        if synced and self.discard(bin, item):
+            self.count -= 1
+            self.last = bin.items[-1] if bin.items else None
+        else:
+            self.rebuild(bin)
+
+class Moments(BinIndex):
+    """
+    Total weight and first moments of the weight of the items (weight times the position of their centre)
+
+    Weights may also be floats, they are summed as Decimal.
+    """
+    def clear(self) -> None:
+        self.weight = 0
+        self.moment = [0]*3
+
+    def insert(self, bin, item) -> None:
+        weight = Decimal(item.weight)
+        self.weight += weight
+        for axis in range(3):
+            self.moment[axis] += weight*(item.position[axis] + item.size[axis]/2)
+
+    def discard(self, bin, item) -> bool:
+        weight = Decimal(item.weight)
+        self.weight -= weight
+        for axis in range(3):
+            self.moment[axis] -= weight*(item.position[axis] + item.size[axis]/2)
+        return True
+
+    def with_item(self, item) -> tuple[Decimal,list[Decimal]]:
+        """
+        Weight and moments the bin would have with the item in its current position
+        """
+        weight = Decimal(item.weight)
+        moment = [self.moment[axis] + weight*(item.position[axis] + item.size[axis]/2) for axis in range(3)]
+        return self.weight + weight, moment
+
+class SupportGraph(BinIndex):
+    """
+    What rests on what: for every item the items below it with their contact area, the items above it
+    and the load (weight of the items stacked on it) it bears
+
+    The load of an item is spread on its supports proportionally to the contact areas (dead volumes and the floor take their share too).
+    Items are grouped by the height of their top and bottom faces, so finding the supports of an item only looks at one level.
+    """
+    def clear(self) -> None:
+        self.tops : dict[Decimal:list] = dict()    # height of the top face to items
+        self.bottoms : dict[Decimal:list] = dict() # height of the bottom face to items
+        self.below : dict[int:list] = dict()       # id of an item to [(supporting item, contact area)]
+        self.above : dict[int:list] = dict()       # id of an item to the items resting on it
+        self.contact : dict[int:Decimal] = dict()  # id of an item to its whole contact area (items, dead volumes)
+        self.load : dict[int:Decimal] = dict()     # id of an item to the weight it bears
+
+    def supports(self, bin, item) -> tuple[list,Decimal]:
+        """
+        The items that would support the item in its current position
+
+        :return: The supporting items with their contact area and the whole contact area (0 for an item on the floor, which bears it all)
+        :rtype: tuple[list, Decimal]
+        """
+        if item.position.y == 0:
+            return [], 0
+        supports = []
+        contact = 0
+        for other in self.tops.get(item.position.y, ()):
+            if other is item:
+                continue
+            area = rect_intersect(other, item, Vector3.AXIS['x'], Vector3.AXIS['z'])
+            if area > 0:
+                supports.append((other, area))
+                contact += area
+        for volume in bin._model.dead_volumes:
+            if volume.position.y + volume.height == item.position.y:
+                contact += rect_intersect(volume, item, Vector3.AXIS['x'], Vector3.AXIS['z'])
+        return supports, contact
+
+    def spread(self, supports : list, contact : Decimal, weight : Decimal) -> list[tuple]:
+        """
+        Loads added on the items below by a weight resting on the given supports, passed down level by level
+
+        :return: The items reached with the load added on each one
+        :rtype: list[tuple]
+        """
+        if not supports or contact <= 0:
+            return []
+        # sizes and weights may also be floats
+        weight = Decimal(weight)
+        contact = Decimal(contact)
+        added = dict()
+        queue = []
+        order = 0
+        for support, area in supports:
+            if id(support) not in added:
+                added[id(support)] = [support, 0]
+                heapq.heappush(queue, (-support.position.y, order, support))
+                order += 1
+            added[id(support)][1] += weight*Decimal(area)/contact
+        while queue:
+            # items are reached from above, so an item is passed down once all its load has arrived
+            _, _, item = heapq.heappop(queue)
+            total = Decimal(self.contact.get(id(item), 0))
+            if total <= 0:
+                continue
+            load = added[id(item)][1]
+            for support, area in self.below.get(id(item), ()):
+                if id(support) not in added:
+                    added[id(support)] = [support, 0]
+                    heapq.heappush(queue, (-support.position.y, order, support))
+                    order += 1
+                added[id(support)][1] += load*Decimal(area)/total
+        return [tuple(entry) for entry in added.values()]
+
+    def insert(self, bin, item) -> None:
+        top = item.position.y + item.size.y
+        self.tops.setdefault(top, []).append(item)
+        self.bottoms.setdefault(item.position.y, []).append(item)
+        supports, contact = self.supports(bin, item)
+        self.below[id(item)] = supports
+        self.contact[id(item)] = contact
+        self.above.setdefault(id(item), [])
+        self.load.setdefault(id(item), 0)
+        for support, _ in supports:
+            self.above[id(support)].append(item)
+        resting = [other for other in self.bottoms.get(top, ()) if rect_intersect(item, other, Vector3.AXIS['x'], Vector3.AXIS['z']) > 0]
+        if resting:
+            # the item has been slid under others: their supports change
+            self._relink(bin, resting)
+        else:
+            for support, added in self.spread(supports, contact, item.weight):
+                self.load[id(support)] += added
+
+    def discard(self, bin, item) -> bool:
+        if self.above.get(id(item)):
+            return False # the items above lose a support, rebuilt
+        self.tops[item.position.y + item.size.y].remove(item)
+        self.bottoms[item.position.y].remove(item)
+        for support, added in self.spread(self.below[id(item)], self.contact[id(item)], item.weight):
+            self.load[id(support)] -= added
+        for support, _ in self.below.pop(id(item)):
+            self.above[id(support)].remove(item)
+        del self.above[id(item)], self.contact[id(item)], self.load[id(item)]
+        return True
+
+    def _relink(self, bin, items : list) -> None:
+        for item in items:
+            for support, _ in self.below[id(item)]:
+                self.above[id(support)].remove(item)
+            supports, contact = self.supports(bin, item)
+            self.below[id(item)] = supports
+            self.contact[id(item)] = contact
+            for support, _ in supports:
+                self.above[id(support)].append(item)
+        # loads are summed again from the top
+        for key in self.load:
+            self.load[key] = 0
+        for item in sorted(bin.items, key=lambda item: -item.position.y):
+            if id(item) in self.below:
+                for support, added in self.spread(self.below[id(item)], self.contact[id(item)], item.weight):
+                    self.load[id(support)] += added
+
+    def resting_on(self, item) -> list:
+        """
+        The items resting directly on the item
+        """
+        return list(self.above.get(id(item), ()))
+
+class DoorIndex(BinIndex):
+    """
+    The items seen from the doors (at the back of the bin, z = depth): a grid on the x-y projection whose cells hold
+    the items covering them, ordered by depth, so the items in front of or behind an item are found without scanning the bin
+    """
+    GRID = 8
+
+    def clear(self) -> None:
+        # cell to [(front face z, item)] and [(back face z, item)], sorted
+        self.fronts : dict[tuple[int,int]:list] = dict()
+        self.backs : dict[tuple[int,int]:list] = dict()
+        self._order = 0
+
+    def _cells(self, bin, item) -> list[tuple[int,int]]:
+        ranges = []
+        for axis, size in ((0, bin.width), (1, bin.height)):
+            # floats are enough: cells only have to be monotonic in the coordinates
+            cell = float(size)/self.GRID
+            first = math.floor(float(item.position[axis])/cell) if cell > 0 else 0
+            last = math.floor((float(item.position[axis])+float(item.size[axis]))/cell) if cell > 0 else 0
+            ranges.append(range(max(0, first), min(self.GRID-1, last)+1))
+        return [(i, j) for i in ranges[0] for j in ranges[1]]
+
+    def insert(self, bin, item) -> None:
+        self._order += 1
+        for cell in self._cells(bin, item):
+            bisect.insort(self.fronts.setdefault(cell, []), (item.position.z + item.size.z, self._order, item))
+            bisect.insort(self.backs.setdefault(cell, []), (item.position.z, self._order, item))
+
+    def discard(self, bin, item) -> bool:
+        for cell in self._cells(bin, item):
+            self.fronts[cell] = [entry for entry in self.fronts[cell] if entry[2] is not item]
+            self.backs[cell] = [entry for entry in self.backs[cell] if entry[2] is not item]
+        return True
+
+    def behind(self, bin, item) -> Iterator:
+        """
+        Items whose x-y projection overlaps the one of the item, entirely behind it (farther from the doors)
+        """
+        seen = set()
+        for cell in self._cells(bin, item):
+            entries = self.fronts.get(cell, ())
+            for front, _, other in entries[:bisect.bisect_right(entries, (item.position.z, math.inf))]:
+                if id(other) not in seen and other is not item:
+                    seen.add(id(other))
+                    if rect_intersect(other, item, Vector3.AXIS['x'], Vector3.AXIS['y']) > 0:
+                        yield other
+
+    def in_front(self, bin, item) -> Iterator:
+        """
+        Items whose x-y projection overlaps the one of the item, entirely in front of it (between it and the doors)
+        """
+        seen = set()
+        front = item.position.z + item.size.z
+        for cell in self._cells(bin, item):
+            entries = self.backs.get(cell, ())
+            for _, _, other in entries[bisect.bisect_left(entries, (front, -math.inf)):]:
+                if id(other) not in seen and other is not item:
+                    seen.add(id(other))
+                    if rect_intersect(other, item, Vector3.AXIS['x'], Vector3.AXIS['y']) > 0:
+                        yield other
+
+if __name__ == "__main__":
+    # incremental indexes testing: the updated index matches a rebuilt one
+    import random
+    from .Bin import Bin, BinModel
+    from .Item import Item
+    from .Space import Volume
+
+    testbin1 = Bin(None,BinModel(None,(4,4,4),100))
+    rng = random.Random(1)
+    testitems = []
+    for idx in range(12):
+        item = Item(idx,Volume((1,1,1),(rng.randint(0,3),idx//4,rng.randint(0,3))),rng.randint(1,5),0)
+        testbin1.place_item(item)
+        testitems.append(item)
+    moments = testbin1.index("moments",Moments)
+    graph = testbin1.index("support",SupportGraph)
+    doors = testbin1.index("doors",DoorIndex)
+    testbin1.pop_item()
+    testbin1.remove_item(testitems[0])
+    testbin1.place_item(Item("last",Volume((2,1,2),(0,3,0)),3,0))
+    for name, factory in (("moments",Moments),("support",SupportGraph),("doors",DoorIndex)):
+        rebuilt = factory()
+        rebuilt.rebuild(testbin1)
+        index = testbin1.index(name,factory)
+        assert index.count == len(testbin1.items) and index.last is testbin1.items[-1], (name, index.count)
+        if factory is Moments:
+            assert (index.weight, index.moment) == (rebuilt.weight, rebuilt.moment), (index.moment, rebuilt.moment)
+        elif factory is SupportGraph:
+            assert all(index.load[id(item)] == rebuilt.load[id(item)] for item in testbin1.items), name
+            assert all(set(map(id, index.resting_on(item))) == set(map(id, rebuilt.resting_on(item))) for item in testbin1.items), name
+        else:
+            for item in testbin1.items:
+                assert set(map(id, index.behind(testbin1,item))) == set(map(id, rebuilt.behind(testbin1,item))), item
+                assert set(map(id, index.in_front(testbin1,item))) == set(map(id, rebuilt.in_front(testbin1,item))), item
+    weight = sum(item.weight for item in testbin1.items)
+    assert tuple(testbin1.center_of_gravity()) == tuple(sum(item.weight*(item.position[axis]+item.size[axis]/2) for item in testbin1.items)/weight
+                                                        for axis in range(3)), testbin1.center_of_gravity()
+    try:
+        BinIndex()
+        raise AssertionError("BinIndex is abstract")
+    except TypeError:
+        pass
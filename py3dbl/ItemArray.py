@@ -0,0 +1,156 @@
+from array import array
+from decimal import Decimal, Context, MAX_PREC, MAX_EMAX, MIN_EMIN
+from typing import Iterable, Iterator
+from .Item import Item
+from .Space import Volume
+
+# context of the exact conversions (the default one rounds to 28 digits)
+_EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+_INT64 = range(-2**63, 2**63)
+
+def to_fixed(value, decimals : int) -> int:
+    """
+    Fixed point representation of a number (value*10^decimals as an integer)
+
+    Values are never rounded: round them beforehand (e.g. with Item.format_numbers) or keep more decimals.
+
+    :raises ValueError: If the value has more decimals or does not fit in 64 bits
+    """
+    fixed = Decimal(value).scaleb(decimals, _EXACT)
+    if not fixed.is_finite() or fixed != fixed.to_integral_value() or int(fixed) not in _INT64:
+        raise ValueError(f"{value} is not representable with {decimals} decimals in 64 bits, round it first (see Item.format_numbers)")
+    return int(fixed)
+
+def decimals_of(values : Iterable) -> int:
+    """
+    Fewest decimals representing every value exactly in fixed point (see to_fixed)
+    """
+    decimals = 0
+    for value in values:
+        value = Decimal(value)
+        if value.is_finite() and value:
+            _, digits, exponent = value.as_tuple()
+            while digits[-1] == 0:
+                digits = digits[:-1]
+                exponent += 1
+            decimals = max(decimals, -exponent)
+    return decimals
+
+def from_fixed(value : int, decimals : int) -> Decimal:
+    """
+    Decimal value of a fixed point number (inverse of to_fixed)
+    """
+    return Decimal(value).scaleb(-decimals)
+
+# value of the max_load column for the items without a maximum load
+NO_LIMIT = -1
+
+class ItemArray:
+    """
+    Columnar storage of items: a column of fixed point integers per attribute and a list of names
+
+    Columns can be any sequence of integers supporting the buffer protocol (e.g. array('q') or a
+    memoryview on a mapped file), Item objects are only built when requested.
+    The max_load column holds NO_LIMIT for the items without a maximum load, it is added when missing from the given columns.
+    """
+    COLUMNS = ("width", "height", "depth", "weight", "priority", "max_load")
+
+    def __init__(self, decimals : int = 3, columns : None|dict = None, names : None|list = None):
+        """
+        :param decimals: Number of decimals kept by the fixed point columns
+        :type decimals: int
+        :param columns: Column name to integer sequence, None for empty columns
+        :type columns: None | dict
+        :param names: Names of the items, None for unnamed items
+        :type names: None | list
+        """
+        self.decimals = decimals
+        if columns is None:
+            columns = {column: array('q') for column in self.COLUMNS}
+        elif "max_load" not in columns:
+            columns = {**columns, "max_load": array('q', [NO_LIMIT])*len(columns[self.COLUMNS[0]])}
+        self.columns = columns
+        self.names = list(names) if names is not None else [None]*len(columns[self.COLUMNS[0]])
+
+    @classmethod
+    def from_items(cls, items : Iterable[Item], decimals : int = 3):
+        """
+        Build the columnar representation of a list of items
+
+        :param items: Items to store
+        :type items: Iterable[Item]
+        :param decimals: Number of decimals kept (sizes and weights must not have more, see to_fixed)
+        :type decimals: int
+        """
+        item_array = cls(decimals)
+        item_array.extend(items)
+        return item_array
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, item : Item) -> None:
+        """
+        Add an item at the end of the columns
+        """
+        columns = self.columns
+        columns["width"].append(to_fixed(item.width, self.decimals))
+        columns["height"].append(to_fixed(item.height, self.decimals))
+        columns["depth"].append(to_fixed(item.depth, self.decimals))
+        columns["weight"].append(to_fixed(item.weight, self.decimals))
+        columns["priority"].append(int(item.priority))
+        columns["max_load"].append(to_fixed(item.max_load, self.decimals) if item.max_load is not None else NO_LIMIT)
+        self.names.append(item.name)
+
+    def extend(self, items : Iterable[Item]) -> None:
+        for item in items:
+            self.append(item)
+
+    def size(self, idx : int) -> tuple[Decimal,Decimal,Decimal]:
+        """
+        :return: Width, height and depth of the item at idx
+        :rtype: tuple[Decimal, Decimal, Decimal]
+        """
+        return tuple(from_fixed(self.columns[axis][idx], self.decimals) for axis in self.COLUMNS[:3])
+
+    def item(self, idx : int) -> Item:
+        """
+        Build the Item object stored at idx
+        """
+        max_load = self.columns["max_load"][idx]
+        return Item(
+            name     = self.names[idx],
+            volume   = Volume(self.size(idx)),
+            weight   = from_fixed(self.columns["weight"][idx], self.decimals),
+            priority = self.columns["priority"][idx],
+            max_load = from_fixed(max_load, self.decimals) if max_load != NO_LIMIT else None
+        )
+
+    def __getitem__(self, idx : int) -> Item:
+        return self.item(idx)
+
+    def __iter__(self) -> Iterator[Item]:
+        for idx in range(len(self)):
+            yield self.item(idx)
+
+    def to_items(self) -> list[Item]:
+        return list(self)
+
+if __name__ == "__main__":
+    # columnar storage testing: items come back as they were put, columns without max_load are items without a maximum load
+    testitems = [Item("a",Volume((1,Decimal("0.25"),2)),Decimal("1.5"),2,Decimal("0.5")), Item("b",Volume((3,1,1)),0,0,0), Item(None,Volume((1,1,1)),1,1)]
+    testarray = ItemArray.from_items(testitems)
+    describe = lambda item: (item.name, tuple(item.size), item.weight, item.priority, item.max_load)
+    assert list(map(describe, testarray)) == list(map(describe, testitems)), [str(item) for item in testarray]
+    assert list(testarray.columns["max_load"]) == [500, 0, NO_LIMIT]
+    legacy = ItemArray(3, {name: testarray.columns[name] for name in ItemArray.COLUMNS[:5]}, testarray.names)
+    assert [item.max_load for item in legacy] == [None]*3 and list(map(describe, legacy))[0][:4] == describe(testitems[0])[:4]
+    # values are never rounded
+    assert decimals_of([1, Decimal("2.50"), .25, Decimal("1E+3"), 0, -Decimal("0.001")]) == 3
+    assert (to_fixed(Decimal("1.500"),1), to_fixed(.5,1), to_fixed(-2,0)) == (15, 5, -2)
+    for value, decimals in ((Decimal("0.0005"),3), (.1,3), (10**17,3), (Decimal("Infinity"),0)):
+        try:
+            to_fixed(value, decimals)
+            raise AssertionError(f"{value} converted with {decimals} decimals")
+        except ValueError:
+            pass
@@ -0,0 +1,207 @@
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable
+
+# monitor observing the Bin.put_item calls of the current context (thread or task)
+current_monitor : ContextVar = ContextVar("py3dbl_current_monitor", default=None)
+
+class PackingMonitor:
+    """
+    Observer of the placement attempts (probes) made while packing
+
+    A monitor is active inside a with statement and only for the current context,
+    so concurrent packings in other threads or tasks are not affected.
+    When no monitor is active Bin.put_item pays a single context lookup.
+    """
+    def __init__(self):
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(current_monitor.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        current_monitor.reset(self._tokens.pop())
+        return False
+
+    def check(self, bin, item, constraints : list) -> bool:
+        """
+        Evaluate the constraints for a placement attempt, called by Bin.put_item in place of the plain evaluation
+
+        :param bin: Target bin
+        :type bin: Bin
+        :param item: Target item
+        :type item: Item
+        :param constraints: All the constraints to follow, in evaluation order
+        :type constraints: list[Constraint]
+        :return: True if all the constraints are satisfied
+        :rtype: bool
+        """
+        placed = all(map(lambda c: c(bin,item), constraints))
+        self.on_probe(bin, item, placed)
+        return placed
+
+    def on_probe(self, bin, item, placed : bool) -> None:
+        """
+        Called after every placement attempt
+
+        :param bin: Target bin
+        :type bin: Bin
+        :param item: Target item
+        :type item: Item
+        :param placed: True if the item has been put in the bin
+        :type placed: bool
+        """
+        pass
+
+    def on_insert(self, bin, item) -> None:
+        """
+        Called when an item is put in a bin (checked by put_item or not, see Bin.place_item)
+        """
+        pass
+
+    def on_remove(self, bin, item) -> None:
+        """
+        Called when an item is taken out of a bin (Bin.pop_item, Bin.remove_item, Bin.reset), e.g. when a tentative placement is undone
+        """
+        pass
+
+class RejectionMonitor(PackingMonitor):
+    """
+    Count the probes and, for each constraint, the checks and the rejections
+    """
+    def __init__(self):
+        super().__init__()
+        self.probes = 0
+        # constraint name to [checks, rejections]
+        self.checks : dict[str:list[int]] = dict()
+
+    def _count(self, constraint, satisfied : bool) -> None:
+        entry = self.checks.get(constraint.func.__name__)
+        if entry is None:
+            entry = self.checks[constraint.func.__name__] = [0, 0]
+        entry[0] += 1
+        if not satisfied:
+            entry[1] += 1
+
+    def check(self, bin, item, constraints : list) -> bool:
+        self.probes += 1
+        placed = True
+        for constraint in constraints:
+            satisfied = constraint(bin,item)
+            self._count(constraint, satisfied)
+            if not satisfied:
+                placed = False
+                break
+        self.on_probe(bin, item, placed)
+        return placed
+
+    def rejections(self) -> dict[str:int]:
+        """
+        :return: Number of placements rejected by each constraint
+        :rtype: dict[str:int]
+        """
+        return {name: rejections for name, (_, rejections) in self.checks.items()}
+
+class PackingCancelled(Exception):
+    """
+    Raised inside a packing run that has been cancelled
+    """
+    pass
+
+class ProgressMonitor(PackingMonitor):
+    """
+    Count placed items and opened bins, report them to a callback and stop the run when cancelled
+
+    Only the items currently in a bin are counted: tentative placements undone by the algorithms (e.g. beam_search,
+    branch_and_bound) are taken back, so the counts never exceed the items given.
+    """
+    def __init__(self, callback : None|Callable[[int,int],None] = None, cancel_event = None, items : None|list = None, interval : float = .1):
+        """
+        :param callback: Called as callback(items_placed, bins_opened) when the counts change, at most once every interval seconds,
+            and once more with the final counts when the monitor is left
+        :type callback: None | Callable[[int, int], None]
+        :param cancel_event: When set the packing is interrupted with PackingCancelled at the next probe
+        :type cancel_event: None | threading.Event
+        :param items: The items to count (None for any item), copies made by the algorithms are then ignored
+        :type items: None | list[Item]
+        :param interval: Minimum seconds between two calls of the callback
+        :type interval: float
+        """
+        super().__init__()
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.interval = interval
+        self.items_placed = 0
+        self.bins_opened = 0
+        self._counted = None if items is None else {id(item) for item in items}
+        self._placed = dict() # id of a placed item to its bin
+        self._loads = dict()  # id of a bin to the number of counted items in it
+        self._reported = (0, 0)
+        self._last = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._report(True)
+        return super().__exit__(*exc_info)
+
+    def on_probe(self, bin, item, placed : bool) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise PackingCancelled()
+
+    def on_insert(self, bin, item) -> None:
+        if self._counted is not None and id(item) not in self._counted:
+            return
+        previous = self._placed.get(id(item))
+        if previous is not None:
+            self._unload(previous)
+        self._placed[id(item)] = bin
+        self._loads[id(bin)] = self._loads.get(id(bin), 0) + 1
+        self._report()
+
+    def on_remove(self, bin, item) -> None:
+        if self._placed.get(id(item)) is bin:
+            del self._placed[id(item)]
+            self._unload(bin)
+            self._report()
+
+    def _unload(self, bin) -> None:
+        self._loads[id(bin)] -= 1
+        if not self._loads[id(bin)]:
+            del self._loads[id(bin)]
+
+    def _report(self, force : bool = False) -> None:
+        self.items_placed = len(self._placed)
+        self.bins_opened = len(self._loads)
+        if self.callback is None or (self.items_placed, self.bins_opened) == self._reported:
+            return
+        now = perf_counter()
+        if force or now - self._last >= self.interval:
+            self._reported = (self.items_placed, self.bins_opened)
+            self._last = now
+            self.callback(self.items_placed, self.bins_opened)
+
+if __name__ == "__main__":
+    # ProgressMonitor testing: tentative placements taken back are not counted
+    # (the monitor has to come from the imported module, whose context variable is the one read by Bin)
+    from .Monitor import ProgressMonitor
+    from .Bin import Bin, BinModel
+    from .Item import Item
+    from .Space import Volume
+    testbin1 = Bin(0,BinModel(None,(2,2,2),10))
+    testitems = [Item(idx,Volume((1,1,1),(idx,0,0)),1,0) for idx in range(2)]
+    reports = []
+    with ProgressMonitor(lambda items_placed, bins_opened: reports.append((items_placed,bins_opened)), items=testitems, interval=0) as monitor:
+        assert testbin1.put_item(testitems[0])
+        assert testbin1.put_item(testitems[1])
+        testbin1.pop_item()
+        testbin1.put_item(Item("copy",Volume((1,1,1)),1,0))
+        assert (monitor.items_placed, monitor.bins_opened) == (1,1), (monitor.items_placed, monitor.bins_opened)
+        testbin1.reset()
+        assert (monitor.items_placed, monitor.bins_opened) == (0,0), (monitor.items_placed, monitor.bins_opened)
+    assert reports == [(1,1),(2,1),(1,1),(0,0)], reports
+    # throttled callback: only the final counts are reported
+    reports.clear()
+    with ProgressMonitor(lambda items_placed, bins_opened: reports.append((items_placed,bins_opened)), interval=60):
+        for item in testitems:
+            testbin1.put_item(item)
+    assert reports == [(2,1)], reports
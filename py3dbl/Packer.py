@@ -1,14 +1,20 @@
+import os
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Callable
 from .Item import Item
 from .Bin import Bin, BinModel
 from .Constraints import Constraint
 from .Algorithms import PackingAlgorithm, algorithms
+from .Monitor import ProgressMonitor, RejectionMonitor
+from .Profiler import Profiler, PROFILE_ENV
 
 class Packer():
     """
     Store configurations and execute 3D bin packing algorithm(s)
     """
     def __init__(self, algorithm : PackingAlgorithm = algorithms['base_packer'], default_bin : None|BinModel = None,
-                 fleet : list[Bin] = [], items : list[Item] = [], current_configuration : list[Bin] = []
+                 fleet : list[Bin] = [], items : list[Item] = [], current_configuration : list[Bin] = [], telemetry = None
                 ):
         """
         :param default_bin: A bin model that describes the preferred bin to pack in case the fleet is insufficent
@@ -19,12 +25,20 @@ class Packer():
         :type items: list[Item]
         :param current_configuration: A configuration to start on
         :type current_configuration: None | list[Bin]
+        :param telemetry: A sink receiving a record of every packing run (see py3dbl.telemetry)
+        :type telemetry: None | JsonLinesSink | OpenMetricsSink
         """
         self.bins   =  list(fleet)
         self.items  =  list(items)
         self.default_bin           = default_bin
         self.current_configuration = list(current_configuration)
         self.algorithm = algorithm
+        self.telemetry = telemetry
+        # wall time in seconds of the last packing run
+        self.elapsed = None
+        # items with their sizes before the last packing run and snapshot of the current configuration (see result)
+        self._items_before = None
+        self._result = None
     
     def set_default_bin(self, bin : BinModel):
         """
@@ -45,6 +59,24 @@ class Packer():
         self.algorithm, algorithm = algorithm, self.algorithm
         return algorithm
     
+    def set_telemetry(self, sink):
+        """
+        Set the sink receiving a record of every packing run (None to disable telemetry)
+
+        :param sink: A telemetry sink
+        :type sink: None | JsonLinesSink | OpenMetricsSink
+        """
+        self.telemetry = sink
+
+    def _telemetry_sink(self):
+        if self.telemetry is not None:
+            return self.telemetry
+        if os.environ.get("PY3DBL_TELEMETRY"):
+            # imported on use as the telemetry module pulls json and datetime
+            from .telemetry import sink_from_environment
+            return sink_from_environment()
+        return None
+
     def add_bin(self, bin : Bin):
         """
         Add a bin to the current fleet
@@ -81,6 +113,27 @@ class Packer():
         """
         self.items = list()
 
+    def _keep_items(self) -> None:
+        # algorithms sort and rotate the items in place, the result refers to them as they were before the run
+        self._items_before = (list(self.items), [tuple(item.size) for item in self.items])
+
+    @property
+    def result(self):
+        """
+        Immutable columnar snapshot of the current configuration (see PackingResult), taken on first access after a packing run
+        (or after current_configuration is replaced): bins changed in place afterwards are not reflected
+
+        Items are referenced by their index in the packer's items and orientations are relative to their sizes, both as they were before the last packing run.
+        Values are kept with the fewest decimals representing them exactly (ValueError if they need more than 64 bits, e.g. floats like 0.1).
+
+        :rtype: PackingResult
+        """
+        if self._result is None or self._result[0] is not self.current_configuration:
+            from .PackingResult import PackingResult
+            items, sizes = self._items_before if self._items_before is not None else (self.items, None)
+            self._result = (self.current_configuration, PackingResult.from_configuration(self.current_configuration, items, sizes))
+        return self._result[1]
+
     def reset_current_configuration(self):
         """
         Clear the current configuration
@@ -106,25 +159,191 @@ class Packer():
         return algorithm(bins,self.items,constraints)
     
     
-    def pack(self, algorithm : PackingAlgorithm = None, constraints : list[Constraint] = []):
+    def pack(self, algorithm : PackingAlgorithm = None, constraints : list[Constraint] = [], profiler : None|Profiler = None,
+             checkpoint = None, **parameters):
         """
         Execute the 3D bin packing on the given batch and fleet
+
+        When the PY3DBL_PROFILE environment variable is set every run without a profiler is profiled and the profile is saved
+        to the file it names (cProfile statistics for a ".prof" file, collapsed stacks appended otherwise).
+        When a telemetry sink is set (or PY3DBL_TELEMETRY names one) a record of the run is written to it.
+        With a checkpoint, algorithms that support it save their progress periodically and resume from the file
+        of an interrupted run; the configuration found is saved to it at the end (see load_checkpoint).
+        
+        :param algorithm: A packing algorithm to use (None for the packer's one)
+        :type algorithm: None | PackingAlgorithm
+        :param constraints: Constraints to follow during the packing
+        :type constraints: list[Constraint]
+        :param profiler: A profiler collecting the phases of this run (None for no profiling)
+        :type profiler: None | Profiler
+        :param checkpoint: A checkpoint of the run (None for no checkpoint)
+        :type checkpoint: None | Checkpoint
+        :param parameters: Algorithm parameters for this run only (see PackingAlgorithm.set_parameter)
+        """
+        if algorithm == None:
+            algorithm = self.algorithm
+
+        # the environment only profiles the runs that are not given a profiler, the caller saves its own
+        profile_path = os.environ.get(PROFILE_ENV) if profiler is None else None
+        if profile_path:
+            profiler = Profiler(cprofile=profile_path.endswith(".prof"))
+        sink = self._telemetry_sink()
+        monitor = profiler
+        if monitor is None and sink is not None:
+            monitor = RejectionMonitor()
+
+        self._keep_items()
+        begin = perf_counter()
+        if checkpoint is not None:
+            checkpoint.bind(self.items,self.bins,self.default_bin)
+        with checkpoint if checkpoint is not None else nullcontext():
+            if monitor is None:
+                self.current_configuration = algorithm(self.bins,self.items,constraints,default_bin=self.default_bin,**parameters)
+            else:
+                with monitor:
+                    self.current_configuration = algorithm(self.bins,self.items,constraints,default_bin=self.default_bin,**parameters)
+        self.elapsed = perf_counter() - begin
+        if checkpoint is not None:
+            # the state is kept only if this run's algorithm saved one (bind forgets the ones of earlier runs)
+            name = algorithm.func.__name__
+            checkpoint.save(name, checkpoint.state if checkpoint.algorithm == name else None, self.current_configuration)
+
+        if profile_path:
+            profiler.save(profile_path)
+        if sink is not None:
+            from .telemetry import pack_record
+            sink.write(pack_record(self,algorithm,parameters,self.elapsed,monitor))
+
+    def load_checkpoint(self, checkpoint) -> bool:
+        """
+        Set the current configuration to the one saved in a checkpoint of a run on the same items and fleet,
+        e.g. the best configuration found before the run was interrupted
+
+        :param checkpoint: The checkpoint to load
+        :type checkpoint: Checkpoint
+        :return: False if the checkpoint file does not exist
+        :rtype: bool
+        """
+        checkpoint.bind(self.items,self.bins,self.default_bin)
+        self._keep_items()
+        configuration = checkpoint.configuration()
+        if configuration is None:
+            return False
+        self.current_configuration = configuration
+        return True
+
+    def pack_decomposed(self, algorithm : PackingAlgorithm = None, constraints : list[Constraint] = [], groups : None|int = None, key = "volume",
+                        fill_threshold : float = .5, max_workers : None|int = None, decimals : int = 3, **parameters):
+        """
+        Version of pack for large batches: the items are split in groups of similar items packed in parallel,
+        then the items left out are placed and the under-filled bins merged (see py3dbl.decomposition)
+
+        Sizes, weights and positions must have at most the given number of decimals, otherwise ValueError is raised.
+
+        :param algorithm: A packing algorithm to use (None for the packer's one)
+        :type algorithm: None | PackingAlgorithm
+        :param constraints: Constraints to follow during the packing
+        :type constraints: list[Constraint]
+        :param groups: Number of groups (None for the number of workers)
+        :type groups: None | int
+        :param key: "volume", "priority", "density" or a function of the item, the items are grouped by it
+        :type key: str | Callable[[Item], object]
+        :param fill_threshold: Fill rate under which a bin is emptied into the others if possible
+        :type fill_threshold: float
+        :param max_workers: Number of worker processes (None for the number of CPUs)
+        :type max_workers: None | int
+        :param decimals: Number of decimals kept when exchanging the items with the workers
+        :type decimals: int
+        :param parameters: Algorithm parameters for this run only (see PackingAlgorithm.set_parameter)
+        """
+        from .decomposition import pack_decomposed
+
+        if algorithm == None:
+            algorithm = self.algorithm
+        self._keep_items()
+        begin = perf_counter()
+        self.current_configuration = pack_decomposed(self.items, self.bins, self.default_bin, algorithm, constraints, parameters,
+                                                     groups, key, fill_threshold, max_workers, decimals)
+        self.elapsed = perf_counter() - begin
+
+        sink = self._telemetry_sink()
+        if sink is not None:
+            from .telemetry import pack_record
+            sink.write(pack_record(self,algorithm,parameters,self.elapsed))
+
+    async def pack_async(self, algorithm : PackingAlgorithm = None, constraints : list[Constraint] = [], executor = None,
+                         timeout : None|float = None, progress : None|Callable[[int,int],None] = None, **parameters
+                        ):
+        """
+        Awaitable version of pack, the packing runs on an executor so the event loop stays responsive
+
+        On cancellation or timeout a thread-based packing is interrupted at its next placement attempt,
+        a packing running on a ProcessPoolExecutor is left to finish in background.
+        On a ProcessPoolExecutor the worker packs copies of the items, the configuration found is rebuilt on the packer's items and fleet.
         
-        :param bigger_first: Description
-        :param number_of_decimals: Description
+        :param algorithm: A packing algorithm to use (None for the packer's one)
+        :type algorithm: None | PackingAlgorithm
+        :param constraints: Constraints to follow during the packing
+        :type constraints: list[Constraint]
+        :param executor: Executor to run the packing on (None for the loop's default thread pool)
+        :type executor: None | concurrent.futures.Executor
+        :param timeout: Seconds to wait before interrupting the packing with TimeoutError (None for no limit)
+        :type timeout: None | float
+        :param progress: Called on the event loop as progress(items_placed, bins_opened) when the placed items change
+            (at most ten times per second, see ProgressMonitor), not available with a ProcessPoolExecutor
+        :type progress: None | Callable[[int, int], None]
+        :param parameters: Algorithm parameters for this run only (see PackingAlgorithm.set_parameter)
         """
+        # imported here as they are only needed by service embeddings
+        import asyncio
+        import threading
+        from concurrent.futures import ProcessPoolExecutor
+
         if algorithm == None:
             algorithm = self.algorithm
+        loop = asyncio.get_running_loop()
+        self._keep_items()
+
+        if isinstance(executor, ProcessPoolExecutor):
+            if progress is not None:
+                raise ValueError("progress reporting is not available on a ProcessPoolExecutor")
+            from .batch import PackingJob, run_job_indexed, rebuild_indexed
+            # the worker packs copies of the items, the configuration comes back by indexes and is rebuilt on the originals
+            job = PackingJob(None,self.items,self.bins,self.default_bin,algorithm,constraints,parameters)
+            bins, placements, self.elapsed = await asyncio.wait_for(loop.run_in_executor(executor,run_job_indexed,job),timeout)
+            self.current_configuration = rebuild_indexed(job,bins,placements)
+        else:
+            cancel_event = threading.Event()
+            callback = None
+            if progress is not None:
+                callback = lambda items_placed, bins_opened: loop.call_soon_threadsafe(progress,items_placed,bins_opened)
+            def run():
+                begin = perf_counter()
+                with ProgressMonitor(callback,cancel_event,self.items):
+                    configuration = algorithm(self.bins,self.items,list(constraints),default_bin=self.default_bin,**parameters)
+                return configuration, perf_counter() - begin
+            try:
+                self.current_configuration, self.elapsed = await asyncio.wait_for(loop.run_in_executor(executor,run),timeout)
+            except BaseException:
+                cancel_event.set() # stop the worker thread on cancellation, timeout or errors
+                raise
 
-        algorithm.set_parameter("default_bin",self.default_bin)
-        self.current_configuration = algorithm(self.bins,self.items,constraints)
+        sink = self._telemetry_sink()
+        if sink is not None:
+            from .telemetry import pack_record
+            sink.write(pack_record(self,algorithm,parameters,self.elapsed))
 
     def calculate_statistics(self) -> dict[str:any]:
+        """
+        Statistics of the current configuration: bins used, items, volume and weight loaded,
+        fill rate of the bins used (average_volume, 0 when no bin is used) and wall time of the last packing run (elapsed)
+        """
         statistics = {
             "bins_used": len(self.current_configuration),
             "items_loaded": 0,
             "loaded_volume": 0,
             "loaded_weight": 0,
+            "elapsed": self.elapsed,
         }
         configuration_volume = 0
         for bin in self.current_configuration:
@@ -133,6 +352,6 @@ class Packer():
             statistics["loaded_weight"] += bin.weight
             statistics['items_loaded'] += len(bin.items)
             configuration_volume += bin.volume()
-        statistics["average_volume"] = statistics["loaded_volume"]/configuration_volume
+        statistics["average_volume"] = statistics["loaded_volume"]/configuration_volume if configuration_volume else 0
         return statistics
 
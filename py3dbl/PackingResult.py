@@ -0,0 +1,264 @@
+from array import array
+from decimal import Decimal
+from typing import Iterable, Iterator
+from .Item import Item
+from .Bin import Bin, BinModel
+from .Space import Volume, Vector3
+from .ItemArray import ItemArray, to_fixed, from_fixed, decimals_of
+
+# orientation code to the axes of the item (width, height, depth) along the axes of the bin
+ORIENTATIONS = ((0,1,2), (0,2,1), (1,0,2), (1,2,0), (2,0,1), (2,1,0))
+RESULT_COLUMNS = ("item", "x", "y", "z", "orientation", "weight")
+
+def orientation_code(size : tuple[int,int,int], placed : tuple[int,int,int]) -> int:
+    """
+    Code of the orientation turning an item of the given size into the placed one (sizes in fixed point)
+    """
+    for code, axes in enumerate(ORIENTATIONS):
+        if all(size[axis] == value for axis, value in zip(axes, placed)):
+            return code
+    raise ValueError(f"placed size {placed} is not a rotation of {size}")
+
+class PackingResult:
+    """
+    Immutable columnar snapshot of a packing configuration
+
+    Items are referenced by their index in the items given to the packer (kept as an ItemArray with their sizes before
+    the packing), each placement is a row of fixed point integer columns (see RESULT_COLUMNS): item index, position,
+    orientation code (see ORIENTATIONS) and weight. The rows of a bin are contiguous, columns are exposed as read-only
+    memoryviews, so a result is compact, cheap to pickle and safe to share between threads.
+    Item and Bin objects are only built on request (see items_of and to_configuration).
+    """
+    def __init__(self, items : ItemArray, bin_ids : list, models : list[BinModel], offsets : array, columns : dict[str:array]):
+        """
+        Use from_configuration to build a result
+
+        :param items: The items referenced by the placements, with their sizes before the packing
+        :type items: ItemArray
+        :param bin_ids: Id of every bin
+        :type bin_ids: list
+        :param models: Model of every bin
+        :type models: list[BinModel]
+        :param offsets: First row of every bin, followed by the number of rows
+        :type offsets: array
+        :param columns: Column name (see RESULT_COLUMNS) to integer array, with the decimals of the items
+        :type columns: dict[str:array]
+        """
+        self._items = items
+        self._bin_ids = tuple(bin_ids)
+        self._models = tuple(models)
+        self._offsets = offsets
+        self._columns = columns
+
+    @classmethod
+    def from_configuration(cls, configuration : list[Bin], items : Iterable[Item] = (), sizes : None|list[tuple] = None, decimals : None|int = None):
+        """
+        Take a snapshot of a configuration
+
+        :param configuration: A packing configuration
+        :type configuration: list[Bin]
+        :param items: The items of the instance, placements refer to their index (the other loaded items are added after them)
+        :type items: Iterable[Item]
+        :param sizes: Sizes of the items before the packing (None for their current sizes), orientations are relative to them
+        :type sizes: None | list[tuple]
+        :param decimals: Number of decimals kept for sizes, positions and weights (None for the fewest representing them exactly),
+            values are never rounded (see to_fixed)
+        :type decimals: None | int
+        :raises ValueError: If a value can not be represented with the decimals
+        """
+        items = list(items)
+        if decimals is None:
+            def values():
+                for idx, item in enumerate(items):
+                    yield from (item.size if sizes is None else sizes[idx])
+                    yield item.weight
+                    if item.max_load is not None:
+                        yield item.max_load
+                for bin in configuration:
+                    for item in bin.items:
+                        yield from item.position
+                        yield from item.size
+                        yield item.weight
+                        if item.max_load is not None:
+                            yield item.max_load
+            decimals = decimals_of(values())
+        reference = ItemArray(decimals)
+        index = dict()
+        for idx, item in enumerate(items):
+            index[id(item)] = idx
+            reference.append(item)
+            if sizes is not None:
+                for axis, name in enumerate(ItemArray.COLUMNS[:3]):
+                    reference.columns[name][idx] = to_fixed(sizes[idx][axis], decimals)
+        offsets = array('q')
+        columns = {name: array('q') for name in RESULT_COLUMNS}
+        for bin in configuration:
+            offsets.append(len(columns["item"]))
+            for item in bin.items:
+                idx = index.get(id(item))
+                if idx is None:
+                    # loaded before the packing, e.g. in a bin of the fleet
+                    idx = index[id(item)] = len(reference)
+                    reference.append(item)
+                placed = tuple(to_fixed(value, decimals) for value in item.size)
+                columns["item"].append(idx)
+                for axis, name in enumerate(("x","y","z")):
+                    columns[name].append(to_fixed(item.position[axis], decimals))
+                columns["orientation"].append(orientation_code(tuple(reference.columns[name][idx] for name in ItemArray.COLUMNS[:3]), placed))
+                columns["weight"].append(reference.columns["weight"][idx])
+        offsets.append(len(columns["item"]))
+        return cls(reference, [bin.id for bin in configuration], [bin._model for bin in configuration], offsets, columns)
+
+    @property
+    def decimals(self) -> int:
+        return self._items.decimals
+
+    @property
+    def items(self) -> ItemArray:
+        """
+        The referenced items, with read-only columns
+        """
+        return ItemArray(self.decimals, {name: memoryview(column).toreadonly() for name, column in self._items.columns.items()}, self._items.names)
+
+    @property
+    def bin_ids(self) -> tuple:
+        return self._bin_ids
+
+    @property
+    def models(self) -> tuple[BinModel]:
+        return self._models
+
+    def __len__(self):
+        return len(self._bin_ids)
+
+    def rows(self, bin_idx : int) -> range:
+        """
+        Rows of the placements of a bin
+        """
+        return range(self._offsets[bin_idx], self._offsets[bin_idx+1])
+
+    def column(self, name : str, bin_idx : None|int = None) -> memoryview:
+        """
+        Read-only view of a column (see RESULT_COLUMNS), for all the placements or the ones of a bin
+        """
+        view = memoryview(self._columns[name]).toreadonly()
+        if bin_idx is None:
+            return view
+        return view[self._offsets[bin_idx]:self._offsets[bin_idx+1]]
+
+    def placed_count(self) -> int:
+        return len(self._columns["item"])
+
+    def unplaced(self) -> list[int]:
+        """
+        Indexes of the items not loaded in any bin
+        """
+        placed = set(self._columns["item"])
+        return [idx for idx in range(len(self._items)) if idx not in placed]
+
+    def placed_size(self, row : int) -> tuple[int,int,int]:
+        """
+        Size (fixed point) of the item of a placement, as rotated
+        """
+        idx = self._columns["item"][row]
+        size = [self._items.columns[name][idx] for name in ItemArray.COLUMNS[:3]]
+        return tuple(size[axis] for axis in ORIENTATIONS[self._columns["orientation"][row]])
+
+    def position(self, row : int) -> tuple[Decimal,Decimal,Decimal]:
+        return tuple(from_fixed(self._columns[axis][row], self.decimals) for axis in ("x","y","z"))
+
+    def item(self, row : int) -> Item:
+        """
+        A new Item object for a placement, rotated and positioned
+        """
+        item = self._items.item(self._columns["item"][row])
+        item.size = Vector3(*(from_fixed(value, self.decimals) for value in self.placed_size(row)))
+        item.position = Vector3(*self.position(row))
+        return item
+
+    def items_of(self, bin_idx : int) -> Iterator[Item]:
+        for row in self.rows(bin_idx):
+            yield self.item(row)
+
+    def to_configuration(self) -> list[Bin]:
+        """
+        Build a new configuration (new bins and items) from the result, without checking constraints
+        """
+        configuration = []
+        for bin_idx, (bin_id, model) in enumerate(zip(self._bin_ids, self._models)):
+            bin = Bin(bin_id, model)
+            for item in self.items_of(bin_idx):
+                bin.place_item(item)
+            configuration.append(bin)
+        return configuration
+
+    def placed_items(self) -> ItemArray:
+        """
+        The loaded items, as rotated, in the order of the placements
+        """
+        columns = {name: array('q') for name in ItemArray.COLUMNS}
+        names = []
+        for row in range(self.placed_count()):
+            idx = self._columns["item"][row]
+            for name, value in zip(ItemArray.COLUMNS[:3], self.placed_size(row)):
+                columns[name].append(value)
+            columns["weight"].append(self._columns["weight"][row])
+            columns["priority"].append(self._items.columns["priority"][idx])
+            columns["max_load"].append(self._items.columns["max_load"][idx])
+            names.append(self._items.names[idx])
+        return ItemArray(self.decimals, columns, names)
+
+    def statistics(self) -> dict[str:any]:
+        """
+        Bins used, items loaded, volume and weight loaded and fill rate of the bins used (average_volume, 0 when no bin is used)
+        """
+        sizes = self._items.columns
+        loaded_volume = 0
+        for idx in self._columns["item"]:
+            loaded_volume += sizes["width"][idx]*sizes["height"][idx]*sizes["depth"][idx]
+        loaded_volume = Decimal(loaded_volume).scaleb(-3*self.decimals)
+        configuration_volume = sum((model.volume() for model in self._models), 0)
+        return {
+            "bins_used": len(self),
+            "items_loaded": self.placed_count(),
+            "loaded_volume": loaded_volume,
+            "loaded_weight": from_fixed(sum(self._columns["weight"]), self.decimals),
+            "average_volume": loaded_volume/Decimal(configuration_volume) if configuration_volume else 0,
+        }
+
+if __name__ == "__main__":
+    from .Constraints import constraints
+
+    model = BinModel("test", (2,2,2), 100, [constraints["weight_within_limit"], constraints["fits_inside_bin"], constraints["no_overlap"]])
+    items = [Item(str(idx), Volume((1,2,Decimal("0.5"))), 2, 0) for idx in range(5)]
+    sizes = [tuple(item.size) for item in items]
+    bins = [Bin(0, model), Bin(1, model)]
+    items[0].size = Vector3(2,1,Decimal("0.5"))
+    bins[0].put_item(items[0])
+    items[1].position = Vector3(0,0,Decimal("0.5"))
+    bins[0].put_item(items[1])
+    bins[1].put_item(items[2])
+    result = PackingResult.from_configuration(bins, items, sizes)
+    assert len(result) == 2 and result.placed_count() == 3 and result.unplaced() == [3, 4]
+    assert list(result.column("orientation", 0)) == [2, 0] and list(result.column("item", 1)) == [2]
+    assert result.statistics()["loaded_volume"] == 3 and result.statistics()["loaded_weight"] == 6
+    rebuilt = result.to_configuration()
+    assert [[(item.name, tuple(item.position), tuple(item.size)) for item in bin.items] for bin in rebuilt] \
+        == [[(item.name, tuple(item.position), tuple(item.size)) for item in bin.items] for bin in bins]
+    try:
+        result.column("x")[0] = 1
+        raise AssertionError("columns are writable")
+    except TypeError:
+        pass
+    try:
+        result.items.columns["width"][0] = 1
+        raise AssertionError("item columns are writable")
+    except TypeError:
+        pass
+    # values are kept exactly: a packer's statistics and its result agree on small items
+    from .Packer import Packer
+    packer = Packer(default_bin=model, items=[Item(str(idx), Volume((Decimal("0.0004"),1,1)), Decimal("0.25"), 0) for idx in range(5)])
+    packer.pack()
+    statistics = packer.calculate_statistics()
+    assert statistics["loaded_volume"] == Decimal("0.0020") and statistics["average_volume"] == Decimal("0.0020")/8, statistics
+    assert packer.result.decimals == 4 and packer.result.statistics() == {name: value for name, value in statistics.items() if name != "elapsed"}
@@ -0,0 +1,238 @@
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter_ns
+from .Monitor import RejectionMonitor
+
+# profiler collecting the phases of the current context (thread or task)
+current_profiler : ContextVar = ContextVar("py3dbl_current_profiler", default=None)
+
+# environment variable that enables profiling of every Packer.pack call, its value is the output file
+PROFILE_ENV = "PY3DBL_PROFILE"
+
+_NO_PHASE = nullcontext()
+
+def phase(name : str):
+    """
+    Context manager delimiting a phase of a packing algorithm, it does nothing when no profiler is active
+
+    :param name: Name of the phase (e.g. "sorting")
+    :type name: str
+    """
+    profiler = current_profiler.get()
+    if profiler is None:
+        return _NO_PHASE
+    return profiler.phase(name)
+
+class _Phase:
+    __slots__ = ("profiler", "name", "begin")
+
+    def __init__(self, profiler, name : str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+        self.begin = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._pop(perf_counter_ns()-self.begin)
+        return False
+
+class Profiler(RejectionMonitor):
+    """
+    Collect the time spent in the phases of a packing run and in each constraint check
+
+    Phases are nested (e.g. "base_packer;bin pass;candidate generation;no_overlap"), the time of every
+    stack of phases is kept so it can be written in the collapsed stack format read by flamegraph tools.
+    Optionally the whole run is also profiled with cProfile.
+    """
+    def __init__(self, cprofile : bool = False):
+        """
+        :param cprofile: Also run cProfile while the profiler is active
+        :type cprofile: bool
+        """
+        super().__init__()
+        self._profiler_tokens = []
+        self._stack = []
+        self._prefix = ""
+        # phase stack to [calls, inclusive nanoseconds]
+        self.stacks : dict[str:list[int]] = dict()
+        self.cprofile = None
+        if cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+
+    def __enter__(self):
+        super().__enter__()
+        self._profiler_tokens.append(current_profiler.set(self))
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        current_profiler.reset(self._profiler_tokens.pop())
+        return super().__exit__(*exc_info)
+
+    def phase(self, name : str) -> _Phase:
+        return _Phase(self, name)
+
+    def _push(self, name : str) -> None:
+        self._stack.append(name)
+        self._prefix = ";".join(self._stack)
+
+    def _pop(self, elapsed : int) -> None:
+        self._add(self._prefix, elapsed)
+        self._stack.pop()
+        self._prefix = ";".join(self._stack)
+
+    def _add(self, stack : str, elapsed : int) -> None:
+        entry = self.stacks.get(stack)
+        if entry is None:
+            entry = self.stacks[stack] = [0, 0]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def check(self, bin, item, constraints : list) -> bool:
+        self.probes += 1
+        prefix = self._prefix + ";" if self._prefix else ""
+        placed = True
+        for constraint in constraints:
+            begin = perf_counter_ns()
+            satisfied = constraint(bin,item)
+            self._add(prefix + constraint.func.__name__, perf_counter_ns()-begin)
+            self._count(constraint, satisfied)
+            if not satisfied:
+                placed = False
+                break
+        self.on_probe(bin, item, placed)
+        return placed
+
+    def self_times(self) -> dict[str:int]:
+        """
+        Nanoseconds spent in each stack of phases excluding the nested phases
+
+        :rtype: dict[str:int]
+        """
+        times = {stack: elapsed for stack, (_, elapsed) in self.stacks.items()}
+        for stack, (_, elapsed) in self.stacks.items():
+            parent = stack.rpartition(";")[0]
+            if parent in times:
+                times[parent] -= elapsed
+        return times
+
+    def phases(self) -> dict[str:dict]:
+        """
+        Calls, total and self time (nanoseconds) of each phase, summed over the stacks it appears in
+        (constraint checks are reported as "constraint:name")
+
+        :rtype: dict[str:dict]
+        """
+        self_times = self.self_times()
+        phases = dict()
+        for stack, (calls, elapsed) in self.stacks.items():
+            name = stack.rpartition(";")[2]
+            if name in self.checks:
+                name = "constraint:" + name
+            entry = phases.setdefault(name, {"calls": 0, "total_ns": 0, "self_ns": 0})
+            entry["calls"] += calls
+            entry["self_ns"] += self_times[stack]
+            # a phase nested in itself (recursion) is counted once
+            if name not in stack.rpartition(";")[0].split(";"):
+                entry["total_ns"] += elapsed
+        return phases
+
+    def report(self) -> dict:
+        """
+        :return: Probes, phases (see phases) and checks and rejections of each constraint
+        :rtype: dict
+        """
+        return {
+            "probes": self.probes,
+            "phases": self.phases(),
+            "constraints": {name: {"checks": checks, "rejections": rejections} for name, (checks, rejections) in self.checks.items()}
+        }
+
+    def collapsed_stacks(self) -> list[str]:
+        """
+        The phases in the collapsed stack format ("phase;nested phase microseconds"), as read by flamegraph.pl, speedscope or inferno
+
+        :rtype: list[str]
+        """
+        return [f"{stack} {elapsed//1000}" for stack, elapsed in self.self_times().items() if elapsed >= 1000]
+
+    def write_collapsed(self, path : str, append : bool = True) -> None:
+        """
+        Write the collapsed stacks to a file, appending by default so that many runs add up
+        """
+        with open(path, mode="a" if append else "w") as file:
+            for line in self.collapsed_stacks():
+                file.write(line + "\n")
+
+    def stats(self, sort : str = "cumulative"):
+        """
+        The cProfile statistics of the run (requires cprofile=True)
+
+        :rtype: pstats.Stats
+        """
+        if self.cprofile is None:
+            raise ValueError("the profiler has been created without cprofile")
+        import pstats
+        return pstats.Stats(self.cprofile).sort_stats(sort)
+
+    def dump_stats(self, path : str) -> None:
+        """
+        Write the cProfile statistics to a file (e.g. for snakeviz or gprof2dot)
+        """
+        self.stats().dump_stats(path)
+
+    def print_report(self, file = None) -> None:
+        report = self.report()
+        print(f"probes: {report['probes']}", file=file)
+        for name, entry in sorted(report["phases"].items(), key=lambda entry: -entry[1]["total_ns"]):
+            print(f"  {name:<32} calls {entry['calls']:>9} total {entry['total_ns']/1e6:>10.2f} ms self {entry['self_ns']/1e6:>10.2f} ms", file=file)
+        for name, entry in report["constraints"].items():
+            print(f"  {name:<32} checks {entry['checks']:>9} rejections {entry['rejections']:>9}", file=file)
+
+    def save(self, path : str) -> None:
+        """
+        Write the profile to a file: cProfile statistics for a ".prof" path (requires cprofile=True), collapsed stacks otherwise
+        """
+        if path.endswith(".prof"):
+            self.dump_stats(path)
+        else:
+            self.write_collapsed(path)
+
+if __name__ == "__main__":
+    # profiler testing: phases nest, constraint checks are timed and counted, PY3DBL_PROFILE profiles the runs without a profiler
+    # (the classes are imported from the package, so the algorithms see the profiler made active here)
+    import os
+    import tempfile
+    from .Space import Volume
+    from .Item import Item
+    from .Bin import BinModel
+    from .Constraints import constraints
+    from .Algorithms import algorithms
+    from .Packer import Packer
+    from .Profiler import Profiler, PROFILE_ENV
+    testmodel1 = BinModel("test",(2,2,2),100,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap']])
+    testpacker = lambda: Packer(algorithms['base_packer'],testmodel1,items=[Item(str(idx),Volume((1,1,1)),1,0) for idx in range(10)])
+    testprofiler = Profiler()
+    testpacker().pack(profiler=testprofiler)
+    report = testprofiler.report()
+    assert report["phases"]["base_packer"]["calls"] == 1 and "constraint:no_overlap" in report["phases"], report["phases"]
+    assert report["probes"] == report["constraints"]["weight_within_limit"]["checks"] > 0, report
+    assert report["phases"]["base_packer"]["total_ns"] >= sum(entry["self_ns"] for entry in report["phases"].values()) - 1
+    assert all(line.startswith("base_packer") for line in testprofiler.collapsed_stacks())
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("stacks.txt", "run.prof"):
+            path = os.path.join(directory, name)
+            os.environ[PROFILE_ENV] = path
+            try:
+                testpacker().pack()
+            finally:
+                del os.environ[PROFILE_ENV]
+            assert os.path.getsize(path) > 0, name
+        assert open(os.path.join(directory, "stacks.txt")).readline().startswith("base_packer")
@@ -68,20 +68,6 @@ class Vector3:
         if vertical:
             self.vect[1], self.vect[2] = self.vect[2], self.vect[1]
 
-# Vector3 Testing
-
-v3test1 = Vector3(2,1)
-assert str(v3test1) == "x:2,y:1,z:0", str(v3test1)
-assert str(v3test1+[1,1,1]) == "x:3,y:2,z:1", str(v3test1+[1,1,1])
-v3test2 = Vector3(*v3test1)
-assert str(v3test2) == str(v3test1)
-v3test2.rotate90(orizontal=True)
-assert v3test2.x == v3test1.z and v3test2.z == v3test1.x, (v3test2,v3test1)
-v3test2.rotate90(orizontal=True)
-assert str(v3test2) == str(v3test1), (v3test2, v3test1)
-v3test2.rotate90(vertical=True)
-assert v3test2.y == v3test1.z and v3test2.z == v3test1.y
-
 class Volume:
     """
     Models an occupied space
@@ -231,29 +217,44 @@ def intersect(item1 : Volume, item2 : Volume) -> bool:
         rect_intersect(item1, item2, Vector3.AXIS["x"], Vector3.AXIS["z"])!=0
     )
 
-# Volume Testing
+if __name__ == "__main__":
+    # Vector3 Testing
+
+    v3test1 = Vector3(2,1)
+    assert str(v3test1) == "x:2,y:1,z:0", str(v3test1)
+    assert str(v3test1+[1,1,1]) == "x:3,y:2,z:1", str(v3test1+[1,1,1])
+    v3test2 = Vector3(*v3test1)
+    assert str(v3test2) == str(v3test1)
+    v3test2.rotate90(orizontal=True)
+    assert v3test2.x == v3test1.z and v3test2.z == v3test1.x, (v3test2,v3test1)
+    v3test2.rotate90(orizontal=True)
+    assert str(v3test2) == str(v3test1), (v3test2, v3test1)
+    v3test2.rotate90(vertical=True)
+    assert v3test2.y == v3test1.z and v3test2.z == v3test1.y
+
+    # Volume Testing
 
-v3size = Vector3(3,2,1)
-voltest1 = Volume(v3size)
-assert str(v3size) == str(voltest1.size) and str(Vector3()) == str(voltest1.position), ",".join(str(voltest1.size),str(voltest1.position))
-assert voltest1.volume() == 6, voltest1.volume()
-voltest2 = Volume(v3size)
-assert rect_intersect(voltest1,voltest2,0,1) == 6, rect_intersect(voltest1,voltest2,0,1)
-assert rect_intersect(voltest1,voltest2,0,2) == 3, rect_intersect(voltest1,voltest2,0,2)
-assert rect_intersect(voltest1,voltest2,1,2) == 2, rect_intersect(voltest1,voltest2,1,2)
-voltest2.position = Vector3(3,2,1)
-assert rect_intersect(voltest1,voltest2,0,1) == 0, rect_intersect(voltest1,voltest2,0,1)
-assert rect_intersect(voltest1,voltest2,0,2) == 0, rect_intersect(voltest1,voltest2,0,2)
-assert rect_intersect(voltest1,voltest2,1,2) == 0, rect_intersect(voltest1,voltest2,1,2)
-assert voltest1.widest_surface() == (0,1) or voltest1.widest_surface() == (1,0) , str(voltest1.widest_surface())
-assert voltest1.widest_surface() == voltest2.widest_surface(), str(voltest1.widest_surface())
-assert voltest1.shortest_surface() == (2,1) or voltest1.shortest_surface() == (1,2)
-assert voltest1.shortest_surface() == voltest2.shortest_surface()
-surface_axes = voltest1.widest_surface()
-surface_area = voltest1.size[surface_axes[0]]*voltest1.size[surface_axes[1]]
-voltest1.set_bottom_surface(surface_axes)
-assert voltest1.width*voltest1.depth == surface_area
-surface_axes = voltest1.shortest_surface()
-surface_area = voltest1.size[surface_axes[0]]*voltest1.size[surface_axes[1]]
-voltest1.set_bottom_surface(surface_axes)
-assert voltest1.width*voltest1.depth == surface_area
\ No newline at end of file
+    v3size = Vector3(3,2,1)
+    voltest1 = Volume(v3size)
+    assert str(v3size) == str(voltest1.size) and str(Vector3()) == str(voltest1.position), ",".join(str(voltest1.size),str(voltest1.position))
+    assert voltest1.volume() == 6, voltest1.volume()
+    voltest2 = Volume(v3size)
+    assert rect_intersect(voltest1,voltest2,0,1) == 6, rect_intersect(voltest1,voltest2,0,1)
+    assert rect_intersect(voltest1,voltest2,0,2) == 3, rect_intersect(voltest1,voltest2,0,2)
+    assert rect_intersect(voltest1,voltest2,1,2) == 2, rect_intersect(voltest1,voltest2,1,2)
+    voltest2.position = Vector3(3,2,1)
+    assert rect_intersect(voltest1,voltest2,0,1) == 0, rect_intersect(voltest1,voltest2,0,1)
+    assert rect_intersect(voltest1,voltest2,0,2) == 0, rect_intersect(voltest1,voltest2,0,2)
+    assert rect_intersect(voltest1,voltest2,1,2) == 0, rect_intersect(voltest1,voltest2,1,2)
+    assert voltest1.widest_surface() == (0,1) or voltest1.widest_surface() == (1,0) , str(voltest1.widest_surface())
+    assert voltest1.widest_surface() == voltest2.widest_surface(), str(voltest1.widest_surface())
+    assert voltest1.shortest_surface() == (2,1) or voltest1.shortest_surface() == (1,2)
+    assert voltest1.shortest_surface() == voltest2.shortest_surface()
+    surface_axes = voltest1.widest_surface()
+    surface_area = voltest1.size[surface_axes[0]]*voltest1.size[surface_axes[1]]
+    voltest1.set_bottom_surface(surface_axes)
+    assert voltest1.width*voltest1.depth == surface_area
+    surface_axes = voltest1.shortest_surface()
+    surface_area = voltest1.size[surface_axes[0]]*voltest1.size[surface_axes[1]]
+    voltest1.set_bottom_surface(surface_axes)
+    assert voltest1.width*voltest1.depth == surface_area
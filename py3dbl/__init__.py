@@ -1,8 +1,55 @@
 from .Packer import Packer
-from .Bin import Bin, BinModel
+from .Bin import Bin, BinModel, models, register_model
 from .Item import Item
+from .ItemArray import ItemArray
+from .PackingResult import PackingResult
 from .Space import Volume, Vector3
-from .item_generator import item_generator
-from .render import render_bin_interactive, render_item_interactive, render_volume_interactive
+from .item_generator import item_generator, item_array_generator, iter_item_arrays, iter_items, catalog_generator
 from .Constraints import Constraint, constraint, constraints
-from .Algorithms import PackingAlgorithm, algorithm, algorithms
\ No newline at end of file
+from .Algorithms import PackingAlgorithm, algorithm, algorithms
+from .Monitor import PackingMonitor, ProgressMonitor, RejectionMonitor, PackingCancelled
+from .Profiler import Profiler, phase
+
+# names loaded on first use, to keep "import py3dbl" cheap (e.g. the rendering stack imports plotly)
+_LAZY_NAMES = {
+    "render_bin_interactive": ".render",
+    "render_item_interactive": ".render",
+    "render_volume_interactive": ".render",
+    "render_volumes_merged": ".render",
+    "bin_figure": ".render",
+    "fleet_figure": ".render",
+    "render_fleet_interactive": ".render",
+    "write_fleet": ".render",
+    "export_fleets": ".render",
+    "PackingJob": ".batch",
+    "JobResult": ".batch",
+    "pack_batch": ".batch",
+    "pack_decomposed": ".decomposition",
+    "cluster_items": ".decomposition",
+    "SharedItemArray": ".shared",
+    "SharedPlacementArray": ".shared",
+    "save_problem": ".storage",
+    "load_problem": ".storage",
+    "save_configuration": ".storage",
+    "load_configuration": ".storage",
+    "Instance": ".instances",
+    "iter_instances": ".instances",
+    "iter_library": ".instances",
+    "load_instances": ".instances",
+    "load_bounds": ".instances",
+    "Checkpoint": ".checkpoint",
+    "JsonLinesSink": ".telemetry",
+    "OpenMetricsSink": ".telemetry",
+    "open_sink": ".telemetry",
+}
+
+def __getattr__(name : str):
+    if name in _LAZY_NAMES:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY_NAMES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_NAMES])
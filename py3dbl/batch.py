@@ -0,0 +1,269 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator
+from .Item import Item
+from .Bin import Bin, BinModel
+from .Space import Vector3
+from .Constraints import Constraint
+from .Algorithms import PackingAlgorithm, algorithms
+from .Packer import Packer
+
+class PackingJob:
+    """
+    An independent packing instance (items, fleet and algorithm) to run in a batch
+    """
+    def __init__(self, id, items : list[Item], fleet : list[Bin] = [], default_bin : None|BinModel = None,
+                 algorithm : None|str|PackingAlgorithm = None, constraints : list[Constraint] = [], parameters : dict = {}
+                ):
+        """
+        :param id: identifier of the job, returned with its result
+        :param items: Items to pack
+        :type items: list[Item]
+        :param fleet: Fleet to pack the items in
+        :type fleet: list[Bin]
+        :param default_bin: A bin model to use if the fleet is insufficient
+        :type default_bin: None | BinModel
+        :param algorithm: The packing algorithm (or its registered name), None for the Packer default
+        :type algorithm: None | str | PackingAlgorithm
+        :param constraints: Additional constraints to follow during the packing
+        :type constraints: list[Constraint]
+        :param parameters: Algorithm parameters for this job only (see PackingAlgorithm.set_parameter)
+        :type parameters: dict
+        """
+        self.id = id
+        self.items = list(items)
+        self.fleet = list(fleet)
+        self.default_bin = default_bin
+        self.algorithm = algorithm
+        self.constraints = list(constraints)
+        self.parameters = dict(parameters)
+
+class JobResult:
+    """
+    Outcome of a PackingJob, either a configuration or the error that made the job fail
+    """
+    def __init__(self, id, configuration : None|list[Bin] = None, elapsed : float = 0.0, error : None|BaseException = None):
+        """
+        :param id: identifier of the originating job
+        :param configuration: The packing configuration found (None if the job failed)
+        :type configuration: None | list[Bin]
+        :param elapsed: Wall time in seconds spent packing inside the worker
+        :type elapsed: float
+        :param error: The exception raised by the job (None if the job succeeded)
+        :type error: None | BaseException
+        """
+        self.id = id
+        self.configuration = configuration
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __str__(self):
+        if self.ok:
+            return f"Job {self.id}: {len(self.configuration)} bins in {self.elapsed:.3f}s"
+        return f"Job {self.id}: failed with {self.error!r}"
+
+def run_job(job : PackingJob) -> JobResult:
+    """
+    Execute a single job in the current process
+
+    :param job: The job to run
+    :type job: PackingJob
+    :return: The result of the job, exceptions are reported in JobResult.error
+    :rtype: JobResult
+    """
+    try:
+        algorithm = job.algorithm
+        if algorithm is None:
+            algorithm = algorithms['base_packer']
+        elif isinstance(algorithm, str):
+            algorithm = algorithms[algorithm]
+        packer = Packer(algorithm=algorithm, default_bin=job.default_bin, fleet=job.fleet, items=job.items)
+        start = time.perf_counter()
+        packer.pack(constraints=list(job.constraints),**job.parameters)
+        elapsed = time.perf_counter() - start
+        return JobResult(job.id, packer.current_configuration, elapsed)
+    except Exception as error:
+        return JobResult(job.id, error=error)
+
+def run_job_indexed(job : PackingJob) -> tuple[list,list,float]:
+    """
+    Execute a job in the current process (usually a worker) and describe the configuration found by indexes,
+    so that the caller can rebuild it on its own items and fleet (see rebuild_indexed)
+
+    Items are referenced by their index in the job items followed by the items loaded in the fleet before the run.
+
+    :param job: The job to run
+    :type job: PackingJob
+    :return: For each bin its index in the fleet (or None for a new bin of the default model, then its id),
+        the placements (bin index, item index, position, size as rotated) and the elapsed time
+    :rtype: tuple[list, list, float]
+    :raises Exception: The exception raised by the job
+    """
+    index = {id(item): idx for idx, item in enumerate([*job.items, *(item for bin in job.fleet for item in bin.items)])}
+    fleet_index = {id(bin): idx for idx, bin in enumerate(job.fleet)}
+    result = run_job(job)
+    if not result.ok:
+        raise result.error
+    bins = [(fleet_index.get(id(bin)), bin.id) for bin in result.configuration]
+    placements = [(bin_idx, index[id(item)], tuple(item.position), tuple(item.size))
+                  for bin_idx, bin in enumerate(result.configuration) for item in bin.items]
+    return bins, placements, result.elapsed
+
+def rebuild_indexed(job : PackingJob, bins : list, placements : list) -> list[Bin]:
+    """
+    Rebuild in the calling process the configuration found by run_job_indexed, on the original items and fleet of the job,
+    without checking constraints
+    """
+    items = [*job.items, *(item for bin in job.fleet for item in bin.items)]
+    configuration = []
+    for fleet_idx, bin_id in bins:
+        if fleet_idx is None:
+            configuration.append(Bin(bin_id, job.default_bin))
+        else:
+            bin = job.fleet[fleet_idx]
+            bin.reset()
+            configuration.append(bin)
+    for bin_idx, item_idx, position, size in placements:
+        item = items[item_idx]
+        item.position = Vector3(*position)
+        item.size = Vector3(*size)
+        configuration[bin_idx].place_item(item)
+    return configuration
+
+class _SharedSubmission:
+    """
+    The shared memory blocks of a job submitted with shared_memory=True
+    """
+    def __init__(self, job : PackingJob, decimals : int):
+        from .shared import SharedItemArray, SharedPlacementArray
+        self.items = SharedItemArray.create(job.items, decimals)
+        try:
+            self.placements = SharedPlacementArray.create(len(job.items), decimals)
+        except BaseException:
+            self.items.close()
+            raise
+
+    def submit(self, executor : ProcessPoolExecutor, job : PackingJob):
+        from .shared import run_shared
+        return executor.submit(run_shared, self.items, self.placements, job.fleet, job.default_bin, job.algorithm, job.constraints, job.parameters)
+
+    def result(self, job : PackingJob, outcome : tuple[list,float]) -> JobResult:
+        from .shared import rebuild_configuration
+        bins, elapsed = outcome
+        return JobResult(job.id, rebuild_configuration(job.items, self.placements, bins, job.fleet, job.default_bin), elapsed)
+
+    def close(self) -> None:
+        self.items.close()
+        self.placements.close()
+
+def pack_batch(jobs : Iterable[PackingJob], max_workers : None|int = None, max_pending : None|int = None, mp_context = None,
+               shared_memory : bool = False, decimals : int = 3) -> Iterator[JobResult]:
+    """
+    Pack many independent jobs on a process pool, yielding results as soon as they finish
+
+    Jobs are consumed lazily: at most max_pending of them are submitted at once.
+    A failing job (or a worker crash) only affects its own result.
+
+    With shared_memory the items and the placements travel through shared memory blocks (see py3dbl.shared)
+    instead of being pickled, and the configurations are rebuilt on the original items and fleet of the jobs.
+    Sizes and weights must then have at most the given number of decimals, otherwise the job fails with ValueError
+    (round the items beforehand, e.g. with Item.format_numbers, or raise decimals).
+
+    :param jobs: The jobs to run
+    :type jobs: Iterable[PackingJob]
+    :param max_workers: Number of worker processes (None for the number of CPUs)
+    :type max_workers: None | int
+    :param max_pending: Maximum number of submitted but unfinished jobs (None for twice the workers)
+    :type max_pending: None | int
+    :param mp_context: A multiprocessing context used to start the workers
+    :param shared_memory: Exchange items and placements through shared memory
+    :type shared_memory: bool
+    :param decimals: Number of decimals kept in shared memory
+    :type decimals: int
+    :return: An iterator over the results, in completion order
+    :rtype: Iterator[JobResult]
+    """
+    jobs = iter(jobs)
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+    if max_pending is None:
+        max_pending = 2*(max_workers or os.cpu_count() or 1)
+    pending = dict()
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                elif shared_memory:
+                    try:
+                        submission = _SharedSubmission(job, decimals)
+                    except Exception as error:
+                        yield JobResult(job.id, error=error)
+                        continue
+                    pending[submission.submit(executor, job)] = (job, submission)
+                else:
+                    pending[executor.submit(run_job, job)] = (job, None)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job, submission = pending.pop(future)
+                try:
+                    result = future.result()
+                    if submission is not None:
+                        result = submission.result(job, result)
+                except BrokenProcessPool as error:
+                    broken = True
+                    result = JobResult(job.id, error=error)
+                except Exception as error: # e.g. the job or its result could not be pickled
+                    result = JobResult(job.id, error=error)
+                finally:
+                    if submission is not None:
+                        submission.close()
+                yield result
+            if broken:
+                # a dead worker poisons the whole pool: fail the affected jobs and start over
+                for job, submission in pending.values():
+                    if submission is not None:
+                        submission.close()
+                    yield JobResult(job.id, error=BrokenProcessPool("worker pool restarted"))
+                pending.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        for _, submission in pending.values():
+            if submission is not None:
+                submission.close()
+
+if __name__ == "__main__":
+    # pack_batch testing: results of every job come back, a failing job only affects its own result
+    from .Space import Volume
+    from .Constraints import constraints
+    testmodel1 = BinModel("test",(2,2,2),10,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap']])
+    testjobs = [PackingJob(idx,[Item(f"{idx}-{n}",Volume((1,1,1)),1,0) for n in range(9+idx)],default_bin=testmodel1) for idx in range(3)]
+    testjobs.append(PackingJob("broken",[Item(None,Volume((1,1,1)),1,0)],default_bin=testmodel1,algorithm="no_such_algorithm"))
+    testresults = {result.id: result for result in pack_batch(testjobs,max_workers=2)}
+    assert sorted(map(str,testresults)) == ["0","1","2","broken"], list(testresults)
+    for idx in range(3):
+        assert testresults[idx].ok, testresults[idx]
+        assert len(testresults[idx].configuration) == 2, testresults[idx]
+        assert sorted(item.name for bin in testresults[idx].configuration for item in bin.items) == sorted(item.name for item in testjobs[idx].items)
+    assert not testresults["broken"].ok and isinstance(testresults["broken"].error, KeyError), testresults["broken"]
+    # pack_async on a process pool: the configuration comes back on the packer's own items and fleet
+    import asyncio
+    testfleet = [Bin("fleet",testmodel1)]
+    testpacker = Packer(default_bin=testmodel1,fleet=testfleet,items=[Item(str(n),Volume((1,1,1)),1,0) for n in range(10)])
+    with ProcessPoolExecutor(1) as testexecutor:
+        asyncio.run(testpacker.pack_async(executor=testexecutor))
+    assert testpacker.current_configuration[0] is testfleet[0] and len(testpacker.current_configuration) == 2
+    assert sorted(id(item) for bin in testpacker.current_configuration for item in bin.items) == sorted(map(id, testpacker.items))
+    assert testpacker.result.unplaced() == [] and testpacker.result.placed_count() == 10, testpacker.result.unplaced()
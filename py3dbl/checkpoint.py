@@ -0,0 +1,254 @@
+"""
+Checkpoints of long packing runs: the state of the algorithm and the best configuration found so far are saved
+periodically to a local file, a new run with the same checkpoint file resumes from them
+
+A checkpoint is active inside a with statement (Packer.pack(checkpoint=...) does it), algorithms that support it
+(genetic_packer, branch_and_bound) read it with current_checkpoint.
+
+The file uses the py3dbl storage format (see py3dbl.storage): the header holds the algorithm, its state (JSON),
+the seconds spent on the run (resumed runs included) and the bins, the placed items are stored as fixed point columns with their placements.
+Items are referenced by their index in the items of the packer, so a resumed run must be given the same items in the same order.
+"""
+import os
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable
+from .Item import Item
+from .Bin import Bin, BinModel
+from .Space import Vector3
+
+# checkpoint of the packing run of the current context (thread or task)
+current_checkpoint : ContextVar = ContextVar("py3dbl_current_checkpoint", default=None)
+
+class Checkpoint:
+    """
+    A checkpoint file with the state of an algorithm and a packing configuration
+    """
+    def __init__(self, path : str, interval : float = 60.0, decimals : int = 3):
+        """
+        :param path: File of the checkpoint, read on resume and replaced on every save
+        :type path: str
+        :param interval: Minimum seconds between two saves (see due)
+        :type interval: float
+        :param decimals: Number of decimals kept for sizes and positions
+        :type decimals: int
+        """
+        self.path = path
+        self.interval = interval
+        self.decimals = decimals
+        self.items : list[Item] = []
+        self.fleet : list[Bin] = []
+        self.default_bin = None
+        self.algorithm = None # algorithm of the last state saved
+        self.state = None
+        self.resumed_elapsed = 0.0 # seconds spent by the runs resumed from the file (see resume_state)
+        self._index = dict()
+        self._saved = perf_counter()
+        self._bound = self._saved
+        self._loaded = None
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(current_checkpoint.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        current_checkpoint.reset(self._tokens.pop())
+        return False
+
+    def bind(self, items : list[Item], fleet : list[Bin] = [], default_bin : None|BinModel = None) -> None:
+        """
+        Set the items and the fleet of the run, in their original order (before the algorithm sorts them)
+
+        The algorithm and the state of a previous run are forgotten, the file is left as it is until the next save.
+        """
+        self.items = list(items)
+        self.fleet = list(fleet)
+        self.default_bin = default_bin
+        self.algorithm = None
+        self.state = None
+        self.resumed_elapsed = 0.0
+        self._index = {id(item): idx for idx, item in enumerate(self.items)}
+        self._saved = perf_counter()
+        self._bound = self._saved
+
+    def index(self, item : Item) -> int:
+        """
+        Index of a bound item, as stored in the file
+        """
+        return self._index[id(item)]
+
+    def due(self) -> bool:
+        """
+        True if interval seconds have passed since the last save (or the bind)
+        """
+        return perf_counter() - self._saved >= self.interval
+
+    def elapsed(self) -> float:
+        """
+        Seconds spent on the run since the bind, plus the ones of the resumed runs
+        """
+        return self.resumed_elapsed + perf_counter() - self._bound
+
+    def save(self, algorithm : str, state : None|dict, configuration : list[Bin] = [], index : None|Callable[[Item],int] = None,
+             bin_index : None|Callable[[Bin],None|int] = None) -> None:
+        """
+        Write the checkpoint, replacing the file atomically
+
+        :param algorithm: Name of the algorithm the state belongs to
+        :type algorithm: str
+        :param state: JSON serializable state of the algorithm
+        :type state: None | dict
+        :param configuration: Best configuration found so far
+        :type configuration: list[Bin]
+        :param index: Index of the items of the configuration in the bound items (None for the bound items themselves, see index,
+            the other items, e.g. loaded in the fleet beforehand, are not saved)
+        :type index: None | Callable[[Item], int]
+        :param bin_index: Index of the bins of the configuration in the bound fleet, None for new bins (None for the bound bins themselves)
+        :type bin_index: None | Callable[[Bin], None | int]
+        """
+        from array import array
+        from .storage import Writer, PLACEMENT_COLUMNS
+        from .ItemArray import to_fixed
+
+        if index is None:
+            index = self.index
+            placed = lambda bin: [item for item in bin.items if id(item) in self._index]
+        else:
+            placed = lambda bin: bin.items
+        if bin_index is None:
+            fleet_index = {id(bin): idx for idx, bin in enumerate(self.fleet)}
+            bin_index = lambda bin: fleet_index.get(id(bin))
+        header = {
+            "type": "checkpoint",
+            "algorithm": algorithm,
+            "state": state,
+            "elapsed": self.elapsed(),
+            "bins": [{"id": bin.id, "fleet": bin_index(bin)} for bin in configuration],
+        }
+        placements = {name: array('q') for name in PLACEMENT_COLUMNS}
+        items = [placed(bin) for bin in configuration]
+        for bin_idx, bin_items in enumerate(items):
+            for item in bin_items:
+                placements["bin"].append(bin_idx)
+                placements["item"].append(index(item))
+                for axis, name in enumerate(("x","y","z")):
+                    placements[name].append(to_fixed(item.position[axis], self.decimals))
+        temporary = self.path + ".tmp"
+        with Writer(temporary, header, self.decimals) as writer:
+            # the placed items with their sizes as rotated, in the order of the placements
+            writer.write_items(item for bin_items in items for item in bin_items)
+            writer.write_placements(placements)
+        os.replace(temporary, self.path)
+        self.algorithm = algorithm
+        self.state = state
+        self._loaded = None
+        self._saved = perf_counter()
+
+    def load(self) -> None|dict:
+        """
+        Read the file (None if there is none)
+
+        :return: A dictionary with keys algorithm, state, elapsed, bins and placements ([(bin index, item index, position, size)])
+        :rtype: None | dict
+        """
+        if self._loaded is not None:
+            return self._loaded
+        if not os.path.exists(self.path):
+            return None
+        from .storage import Reader
+        from .ItemArray import from_fixed
+
+        with Reader(self.path, use_mmap=False) as reader:
+            sizes = [tuple(item.size) for item in reader.items()]
+            placements = []
+            for columns in reader.placements():
+                for row in range(len(columns["bin"])):
+                    position = tuple(from_fixed(columns[axis][row], reader.decimals) for axis in ("x","y","z"))
+                    placements.append((columns["bin"][row], columns["item"][row], position, sizes[len(placements)]))
+            header = reader.header
+        self._loaded = {"algorithm": header["algorithm"], "state": header["state"], "elapsed": header["elapsed"], "bins": header["bins"], "placements": placements}
+        return self._loaded
+
+    def resume_state(self, algorithm : str) -> None|dict:
+        """
+        The saved state of the algorithm (None if there is no checkpoint or it belongs to another algorithm)
+
+        Resuming from a state adds the seconds spent on the saved run to the elapsed ones (see elapsed).
+        """
+        loaded = self.load()
+        if loaded is None or loaded["algorithm"] != algorithm:
+            return None
+        if loaded["state"] is not None:
+            self.resumed_elapsed = loaded["elapsed"]
+        return loaded["state"]
+
+    def configuration(self) -> None|list[Bin]:
+        """
+        Put the bound items back in the bound fleet (new bins of the default model for the others) as saved, without checking constraints
+
+        :return: The saved configuration (None if there is no checkpoint)
+        :rtype: None | list[Bin]
+        """
+        loaded = self.load()
+        if loaded is None:
+            return None
+        configuration = []
+        for bin in loaded["bins"]:
+            if bin["fleet"] is None:
+                configuration.append(Bin(bin["id"], self.default_bin))
+            else:
+                configuration.append(self.fleet[bin["fleet"]])
+                configuration[-1].reset()
+        for bin_idx, item_idx, position, size in loaded["placements"]:
+            item = self.items[item_idx]
+            item.position = Vector3(*position)
+            item.size = Vector3(*size)
+            configuration[bin_idx].place_item(item)
+        return configuration
+
+if __name__ == "__main__":
+    # checkpoint testing: an interrupted run resumes to the result of an uninterrupted one
+    # (the classes are imported from the package, so the algorithms see the checkpoint made active here)
+    import random
+    import tempfile
+    from decimal import Decimal
+    from .Space import Volume
+    from .Constraints import constraints
+    from .Algorithms import algorithms
+    from .Packer import Packer
+    from .checkpoint import Checkpoint
+    testmodel1 = BinModel("test",(4,3,5),100,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap'],constraints['is_supported']])
+    def testitems():
+        rng = random.Random(7)
+        return [Item(str(idx),Volume([Decimal(rng.randint(5,20))/10 for _ in range(3)]),rng.randint(1,9),0) for idx in range(14)]
+    def describe(configuration):
+        return [[(item.name, tuple(item.position), tuple(item.size)) for item in bin.items] for bin in configuration]
+    parameters = dict(seed=3, workers=1, time_limit=None, population_size=8)
+
+    packer = Packer(algorithms['genetic_packer'],testmodel1,items=testitems())
+    packer.pack(generations=6, **parameters)
+    uninterrupted = describe(packer.current_configuration)
+    with tempfile.TemporaryDirectory() as directory:
+        testcheckpoint = Checkpoint(os.path.join(directory, "run.py3dbl"), interval=0)
+        packer = Packer(algorithms['genetic_packer'],testmodel1,items=testitems())
+        packer.pack(checkpoint=testcheckpoint, generations=3, **parameters)
+        assert testcheckpoint.load()["algorithm"] == "genetic_packer" and testcheckpoint.load()["state"]["generation"] == 2
+        interrupted = describe(packer.current_configuration)
+        packer = Packer(algorithms['genetic_packer'],testmodel1,items=testitems())
+        assert packer.load_checkpoint(testcheckpoint) and describe(packer.current_configuration) == interrupted
+        first_elapsed = testcheckpoint.load()["elapsed"]
+        assert first_elapsed > 0, first_elapsed
+        packer = Packer(algorithms['genetic_packer'],testmodel1,items=testitems())
+        resumed = Checkpoint(testcheckpoint.path, interval=0)
+        packer.pack(checkpoint=resumed, generations=6, **parameters)
+        assert describe(packer.current_configuration) == uninterrupted, (describe(packer.current_configuration), uninterrupted)
+        # the resumed run counts the time of the first one
+        assert resumed.resumed_elapsed == first_elapsed and resumed.load()["elapsed"] > first_elapsed, (resumed.resumed_elapsed, first_elapsed)
+        # the same checkpoint reused by another algorithm does not keep the state of the previous run
+        packer = Packer(algorithms['base_packer'],testmodel1,items=testitems())
+        packer.pack(checkpoint=testcheckpoint)
+        assert testcheckpoint.load()["algorithm"] == "base_packer" and testcheckpoint.load()["state"] is None
+        assert testcheckpoint.resume_state("genetic_packer") is None and testcheckpoint.resumed_elapsed == 0
+        loaded = Packer(algorithms['base_packer'],testmodel1,items=testitems())
+        assert loaded.load_checkpoint(testcheckpoint) and describe(loaded.current_configuration) == describe(packer.current_configuration)
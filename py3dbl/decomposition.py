@@ -0,0 +1,227 @@
+"""
+Decomposition of large instances: the items are split in groups packed in parallel (see batch.pack_batch),
+then a repair pass places the items left out and empties the under-filled bins into the others.
+
+Groups are contiguous slices of the items sorted by a key (volume, priority, density or any function of the item),
+with about the same volume each, so every group holds similar items and the bins they fill stay homogeneous.
+"""
+import os
+from decimal import Decimal
+from typing import Callable
+from .Item import Item
+from .Bin import Bin, BinModel
+from .Space import Vector3
+from .Constraints import Constraint
+from .Algorithms import PackingAlgorithm, algorithms, _candidate_positions, _orientations
+
+# keys to group the items by
+KEYS : dict[str:Callable[[Item],object]] = {
+    "volume": lambda item: item.volume(),
+    "priority": lambda item: item.priority,
+    "density": lambda item: item.weight/item.volume() if item.volume() else Decimal(0),
+}
+
+def cluster_items(items : list[Item], groups : int, key : str|Callable[[Item],object] = "volume") -> list[list[Item]]:
+    """
+    Split the items in groups of similar items and about the same volume
+
+    :param items: Items to split
+    :type items: list[Item]
+    :param groups: Number of groups (fewer groups are returned when there are not enough items)
+    :type groups: int
+    :param key: "volume", "priority", "density" (weight over volume) or a function of the item
+    :type key: str | Callable[[Item], object]
+    :rtype: list[list[Item]]
+    """
+    if isinstance(key, str):
+        try:
+            key = KEYS[key]
+        except KeyError:
+            raise ValueError(f"unknown key '{key}', use one of {tuple(KEYS)} or a function") from None
+    ordered = sorted(items, key=key, reverse=True)
+    total = sum((item.volume() for item in ordered), Decimal(0))
+    clusters = [[]]
+    filled = Decimal(0)
+    for item in ordered:
+        # a group is closed when it reaches its share of the whole volume
+        if clusters[-1] and len(clusters) < groups and filled >= total*len(clusters)/groups:
+            clusters.append([])
+        clusters[-1].append(item)
+        filled += item.volume()
+    return [cluster for cluster in clusters if cluster]
+
+def split_fleet(fleet : list[Bin], clusters : list[list[Item]]) -> list[list[Bin]]:
+    """
+    Share the fleet among the groups: each group takes bins, in fleet order, until they hold its volume, the last group takes the rest
+    """
+    shares = []
+    remaining = list(fleet)
+    for idx, cluster in enumerate(clusters):
+        if idx == len(clusters)-1:
+            shares.append(remaining)
+            break
+        needed = sum((item.volume() for item in cluster), Decimal(0))
+        share = []
+        while remaining and needed > 0:
+            bin = remaining.pop(0)
+            share.append(bin)
+            needed -= bin.volume()
+        shares.append(share)
+    return shares
+
+def place_anywhere(item : Item, bins : list[Bin], constraints : list[Constraint], allow_full_rotation : bool = False) -> None|Bin:
+    """
+    Put the item at the first corner position of the first bin that accepts it
+
+    :return: The bin that received the item (None if no bin did, the item is then left as it was)
+    :rtype: None | Bin
+    """
+    position, size = item.position, item.size
+    for bin in bins:
+        for corner in _candidate_positions(bin.items):
+            for rotated in _orientations(size, allow_full_rotation):
+                item.position = Vector3(*corner)
+                item.size = Vector3(*rotated)
+                if bin.put_item(item, constraints):
+                    return bin
+    item.position, item.size = position, size
+    return None
+
+def merge_bins(configuration : list[Bin], constraints : list[Constraint] = [], fill_threshold : float = .5, allow_full_rotation : bool = False) -> list[Bin]:
+    """
+    Empty the under-filled bins into the others, starting from the emptiest: a bin is dropped when all its items fit elsewhere
+
+    :param configuration: A packing configuration
+    :type configuration: list[Bin]
+    :param constraints: Constraints to follow (additional to the constraints of the models)
+    :type constraints: list[Constraint]
+    :param fill_threshold: Bins loaded with less than this fraction of their volume are emptied if possible
+    :type fill_threshold: float
+    :return: The configuration without the emptied bins
+    :rtype: list[Bin]
+    """
+    def fill(bin : Bin):
+        return sum((item.volume() for item in bin.items), Decimal(0))/bin.volume() if bin.volume() else Decimal(1)
+
+    kept = list(configuration)
+    for donor in sorted(configuration, key=fill):
+        if fill(donor) >= Decimal(fill_threshold):
+            break
+        receivers = [bin for bin in kept if bin is not donor]
+        moved = []
+        for item in sorted(donor.items, key=lambda item: item.volume(), reverse=True):
+            previous = (item.position, item.size)
+            receiver = place_anywhere(item, receivers, constraints, allow_full_rotation)
+            if receiver is None:
+                break
+            moved.append((item, receiver, previous))
+        if len(moved) == len(donor.items):
+            donor.reset()
+            kept.remove(donor)
+        else:
+            # undo in reverse order, so every item is the last one of its receiver
+            for item, receiver, (position, size) in reversed(moved):
+                receiver.pop_item()
+                item.position, item.size = position, size
+    return kept
+
+def pack_decomposed(items : list[Item], fleet : list[Bin] = [], default_bin : None|BinModel = None, algorithm : None|str|PackingAlgorithm = None,
+                    constraints : list[Constraint] = [], parameters : dict = {}, groups : None|int = None, key : str|Callable[[Item],object] = "volume",
+                    fill_threshold : float = .5, max_workers : None|int = None, decimals : int = 3, mp_context = None) -> list[Bin]:
+    """
+    Pack the items in groups on a process pool, then repair the joined configuration: the items left out by the groups
+    are put in the bins used (then packed in the bins left) and the under-filled bins are emptied if possible (see merge_bins)
+
+    Items and placements travel through shared memory (see py3dbl.shared): sizes, weights and positions must have at most
+    the given number of decimals, otherwise ValueError is raised (they are never rounded, so the placements stay feasible).
+    New bins of the default model are numbered by their position in the configuration.
+
+    :param items: Items to pack
+    :type items: list[Item]
+    :param fleet: Fleet to pack the items in, shared among the groups (see split_fleet)
+    :type fleet: list[Bin]
+    :param default_bin: A bin model to use if the fleet is insufficient
+    :type default_bin: None | BinModel
+    :param algorithm: The packing algorithm (or its registered name), None for base_packer
+    :type algorithm: None | str | PackingAlgorithm
+    :param constraints: Additional constraints to follow during the packing
+    :type constraints: list[Constraint]
+    :param parameters: Algorithm parameters
+    :type parameters: dict
+    :param groups: Number of groups (None for the number of workers)
+    :type groups: None | int
+    :param key: Key grouping the items (see cluster_items)
+    :type key: str | Callable[[Item], object]
+    :param fill_threshold: Fill rate under which the repair pass tries to empty a bin
+    :type fill_threshold: float
+    :param max_workers: Number of worker processes (None for the number of CPUs)
+    :type max_workers: None | int
+    :param decimals: Number of decimals kept in shared memory
+    :type decimals: int
+    :param mp_context: A multiprocessing context used to start the workers
+    :return: The packing configuration
+    :rtype: list[Bin]
+    """
+    from .batch import PackingJob, pack_batch
+
+    if algorithm is None:
+        algorithm = algorithms['base_packer']
+    elif isinstance(algorithm, str):
+        algorithm = algorithms[algorithm]
+    if groups is None:
+        groups = max_workers or os.cpu_count() or 1
+    clusters = cluster_items(items, groups, key)
+    shares = split_fleet(fleet, clusters)
+    jobs = [PackingJob(idx, cluster, share, default_bin, algorithm, constraints, parameters) for idx, (cluster, share) in enumerate(zip(clusters, shares))]
+    configurations = dict()
+    for result in pack_batch(jobs, max_workers=max_workers, mp_context=mp_context, shared_memory=True, decimals=decimals):
+        if not result.ok:
+            raise result.error
+        configurations[result.id] = result.configuration
+    configuration = [bin for idx in range(len(jobs)) for bin in configurations[idx]]
+
+    # repair: items left out by a group may fit in the bins of the others
+    constraints = sorted(constraints)
+    allow_full_rotation = parameters.get("allow_full_rotation", algorithm.kwargs.get("allow_full_rotation", False))
+    loaded = {id(item) for bin in configuration for item in bin.items}
+    left_out = [item for item in items if id(item) not in loaded]
+    left_out = [item for item in left_out if place_anywhere(item, configuration, constraints, allow_full_rotation) is None]
+    if left_out:
+        used = {id(bin) for bin in configuration}
+        configuration.extend(algorithm([bin for bin in fleet if id(bin) not in used], left_out, list(constraints), default_bin=default_bin, **parameters))
+    configuration = merge_bins(configuration, constraints, fill_threshold, allow_full_rotation)
+
+    fleet_bins = {id(bin) for bin in fleet}
+    for idx, bin in enumerate(configuration):
+        if id(bin) not in fleet_bins:
+            bin.id = idx
+    return configuration
+
+if __name__ == "__main__":
+    # decomposition testing: the attributes of the items reach the workers (two cubes bearing no load need two bins)
+    from .Space import Volume
+    from .Constraints import constraints
+    testmodel1 = BinModel("tall",(1,2,1),100,[constraints[name] for name in ("weight_within_limit","fits_inside_bin","no_overlap","is_supported","stacking_weight")])
+    testitems = [Item(str(idx),Volume((1,1,1)),1,0,max_load=0) for idx in range(2)]
+    configuration = pack_decomposed(testitems,default_bin=testmodel1,groups=1,max_workers=1)
+    assert [[item.name for item in bin.items] for bin in configuration] == [["0"],["1"]], [[str(item) for item in bin.items] for bin in configuration]
+    def check(configuration, items):
+        # every item is loaded once and every bin satisfies the constraints of its model (fits inside, no overlap, ...)
+        assert sorted(id(item) for bin in configuration for item in bin.items) == sorted(map(id, items))
+        for bin in configuration:
+            rebuilt = Bin(None, bin._model)
+            assert all(rebuilt.put_item(item) for item in bin.items), [str(item) for item in bin.items]
+    check(configuration, testitems)
+    # items with more decimals than the shared ones are refused, with enough decimals they keep their sizes, only rotated
+    testmodel2 = BinModel("box",(2,2,2),100,[constraints[name] for name in ("weight_within_limit","fits_inside_bin","no_overlap")])
+    testitems = [Item(str(idx),Volume((Decimal("0.5004"),1,Decimal("0.2501"))),1,0) for idx in range(12)]
+    sizes = {id(item): sorted(item.size) for item in testitems}
+    try:
+        pack_decomposed(testitems,default_bin=testmodel2,groups=2,max_workers=1,decimals=3)
+        raise AssertionError("sizes rounded to the shared decimals")
+    except ValueError:
+        pass
+    configuration = pack_decomposed(testitems,default_bin=testmodel2,algorithm="all_lay",parameters={"allow_full_rotation": True},groups=2,max_workers=1,decimals=4)
+    assert any(item.height != 1 for item in testitems)
+    check(configuration, testitems)
+    assert all(sorted(item.size) == sizes[id(item)] for item in testitems), [str(item) for item in testitems]
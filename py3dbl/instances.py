@@ -0,0 +1,300 @@
+"""
+Loaders of standard 3D bin packing benchmark instances
+
+Supported formats:
+
+thpack (Bischoff and Ratcliff container loading problems, OR-Library files thpack1..thpack9),
+one container to fill as much as possible, published results are volume utilizations in percent::
+
+    P                                   number of problems in the file
+    problem seed                        for each problem
+    L W H                               container size
+    T                                   number of box types
+    type l v w v h v count              for each box type: sizes, vertical orientation flags (0/1) and count
+
+bpp (Martello, Pisinger and Vigo generator output), bins to minimize, published results are numbers of bins,
+a file can hold several instances one after the other::
+
+    n W H D                             number of items and bin size
+    [index] w h d                       for each item, the optional leading index is ignored
+
+Files are read line by line and instances are yielded one at a time, so instance libraries are never loaded entirely.
+Known best values and lower bounds come from a bounds file (see load_bounds).
+The vertical orientation flags of thpack are not represented by py3dbl items and are ignored.
+"""
+import csv
+import math
+import os
+from array import array
+from decimal import Decimal
+from typing import Iterable, Iterator, TextIO
+from .Bin import Bin, BinModel
+from .Item import Item
+from .ItemArray import ItemArray, NO_LIMIT
+from .Packer import Packer
+
+FORMATS = ("thpack", "bpp")
+UNLIMITED_WEIGHT = Decimal("Infinity")
+
+class InstanceFormatError(ValueError):
+    """
+    The instance file does not match the expected format
+    """
+    pass
+
+class Instance:
+    """
+    A benchmark instance: a bin model, the items to pack and the published reference values
+    """
+    def __init__(self, name : str, model : BinModel, items : ItemArray, objective : str, best : None|Decimal = None, lower_bound : None|Decimal = None):
+        """
+        :param name: Name of the instance (file name and position in the file)
+        :type name: str
+        :param model: The bin model
+        :type model: BinModel
+        :param items: The items to pack
+        :type items: ItemArray
+        :param objective: "bins" to minimize the bins used, "utilization" to maximize the loaded volume (percent) of a single bin
+        :type objective: str
+        :param best: Best known value of the objective
+        :type best: None | Decimal
+        :param lower_bound: Best known bound of the objective (a lower bound of the bins or an upper bound of the utilization)
+        :type lower_bound: None | Decimal
+        """
+        self.name = name
+        self.model = model
+        self.items = items
+        self.objective = objective
+        self.best = best
+        self.lower_bound = lower_bound
+
+    def __str__(self):
+        return "%s(%s items, %s, best:%s, bound:%s)" % (self.name, len(self.items), self.model, self.best, self.lower_bound)
+
+    def continuous_bound(self) -> int:
+        """
+        The continuous lower bound of the bins: total volume of the items over the volume of a bin
+        """
+        columns = self.items.columns
+        scale = Decimal(10)**(3*self.items.decimals)
+        volume = sum(w*h*d for w,h,d in zip(columns["width"],columns["height"],columns["depth"]))/scale
+        return math.ceil(volume/self.model.volume())
+
+    def reference(self) -> None|Decimal:
+        """
+        The value a result is compared with: the best known value, otherwise the known bound (the continuous bound for bins)
+        """
+        if self.best is not None:
+            return self.best
+        if self.lower_bound is not None:
+            return self.lower_bound
+        if self.objective == "bins":
+            return Decimal(self.continuous_bound())
+        return None
+
+    def evaluate(self, configuration : list[Bin]) -> Decimal:
+        """
+        Value of the objective for a packed configuration
+        """
+        if self.objective == "bins":
+            return Decimal(len(configuration))
+        loaded = sum((item.volume() for bin in configuration for item in bin.items), Decimal(0))
+        return 100*loaded/self.model.volume()
+
+    def gap(self, value : Decimal) -> None|Decimal:
+        """
+        Relative distance of a value of the objective from the reference, positive when the value is worse
+
+        :return: The gap (0.05 for 5%) or None if there is no reference
+        :rtype: None | Decimal
+        """
+        reference = self.reference()
+        if reference is None or reference == 0:
+            return None
+        if self.objective == "bins":
+            return (Decimal(value)-reference)/reference
+        return (reference-Decimal(value))/reference
+
+    def to_items(self) -> list[Item]:
+        return self.items.to_items()
+
+    def packer(self, **kwargs) -> Packer:
+        """
+        A packer loaded with the instance: the bin model is the default bin when minimizing bins,
+        a single bin of the model is the fleet when maximizing utilization
+
+        :param kwargs: Other arguments of Packer (e.g. algorithm)
+        """
+        if self.objective == "bins":
+            return Packer(default_bin=self.model, items=self.to_items(), **kwargs)
+        return Packer(fleet=[Bin(0,self.model)], items=self.to_items(), **kwargs)
+
+def load_bounds(path : str) -> dict[str:dict]:
+    """
+    Read the published values of instances from a CSV file with header "name,best,lower_bound" (empty cells are unknown values)
+
+    :return: Instance name to {"best": value, "lower_bound": value}
+    :rtype: dict[str:dict]
+    """
+    bounds = dict()
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            bounds[row["name"]] = {
+                key: Decimal(row[key]) if row.get(key) else None
+                for key in ("best", "lower_bound")
+            }
+    return bounds
+
+def _parse(number : int, fields : list[str], expected : None|tuple[int]) -> list[Decimal]:
+    if expected is not None and len(fields) not in expected:
+        raise InstanceFormatError(f"line {number}: expected {' or '.join(map(str,expected))} values, found {len(fields)}")
+    try:
+        return [Decimal(field) for field in fields]
+    except ArithmeticError:
+        raise InstanceFormatError(f"line {number}: not a number in '{' '.join(fields)}'") from None
+
+def _numbers(lines : Iterator[tuple[int,str]], expected : None|tuple[int] = None) -> list[Decimal]:
+    """
+    Next non empty line as a list of numbers
+
+    :param lines: Numbered lines of the file
+    :param expected: Allowed numbers of values, None for any
+    """
+    for number, line in lines:
+        fields = line.split()
+        if fields:
+            return _parse(number, fields, expected)
+    raise InstanceFormatError("unexpected end of file")
+
+def _model(name : str, size : list[Decimal], constraints : Iterable) -> BinModel:
+    return BinModel(name, size, UNLIMITED_WEIGHT, constraints)
+
+def _read_thpack(lines : Iterator[tuple[int,str]], stem : str, constraints : Iterable) -> Iterator[tuple[str,BinModel,ItemArray]]:
+    (problems,) = _numbers(lines, (1,))
+    for _ in range(int(problems)):
+        (problem, _seed) = _numbers(lines, (2,))
+        (length, width, height) = _numbers(lines, (3,))
+        (box_types,) = _numbers(lines, (1,))
+        columns = {column: array('q') for column in ItemArray.COLUMNS}
+        names = []
+        for _ in range(int(box_types)):
+            (box_type, l, _vl, w, _vw, h, _vh, count) = _numbers(lines, (8,))
+            count = int(count)
+            columns["width"].extend([int(w)]*count)
+            columns["height"].extend([int(h)]*count)
+            columns["depth"].extend([int(l)]*count)
+            columns["weight"].extend([0]*count)
+            columns["priority"].extend([0]*count)
+            columns["max_load"].extend([NO_LIMIT]*count)
+            names.extend([str(int(box_type))]*count)
+        name = f"{stem}-{int(problem)}"
+        yield name, _model(name, (width, height, length), constraints), ItemArray(0, columns, names)
+
+def _read_bpp(lines : Iterator[tuple[int,str]], stem : str, constraints : Iterable) -> Iterator[tuple[str,BinModel,ItemArray]]:
+    index = 0
+    for number, line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        index += 1
+        count, width, height, depth = _parse(number, fields, (4,))
+        columns = {column: array('q') for column in ItemArray.COLUMNS}
+        for _ in range(int(count)):
+            values = _numbers(lines, (3,4))
+            w, h, d = values[-3:]
+            columns["width"].append(int(w))
+            columns["height"].append(int(h))
+            columns["depth"].append(int(d))
+        columns["weight"] = array('q', bytes(8*int(count)))
+        columns["priority"] = array('q', bytes(8*int(count)))
+        columns["max_load"] = array('q', [NO_LIMIT])*int(count)
+        name = f"{stem}-{index}"
+        yield name, _model(name, (width, height, depth), constraints), ItemArray(0, columns, [str(idx) for idx in range(int(count))])
+
+_READERS = {"thpack": (_read_thpack, "utilization"), "bpp": (_read_bpp, "bins")}
+
+def guess_format(path : str) -> str:
+    """
+    Format of an instance file from its name: thpack files start with "thpack", anything else is read as bpp
+    """
+    return "thpack" if os.path.basename(path).lower().startswith("thpack") else "bpp"
+
+def iter_instances(source : str|TextIO, format : None|str = None, bounds : dict[str:dict] = {}, constraints : Iterable = [], name : None|str = None) -> Iterator[Instance]:
+    """
+    Lazily read the instances of a file
+
+    :param source: Path of the file or an open text file
+    :type source: str | TextIO
+    :param format: "thpack" or "bpp", None to guess it from the file name
+    :type format: None | str
+    :param bounds: Published values of the instances by name (see load_bounds)
+    :type bounds: dict[str:dict]
+    :param constraints: Constraints of the bin models
+    :type constraints: Iterable[Constraint]
+    :param name: Prefix of the instance names, None for the file name without extension
+    :type name: None | str
+    """
+    path = source if isinstance(source, str) else getattr(source, "name", "instance")
+    if format is None:
+        format = guess_format(path)
+    if format not in _READERS:
+        raise ValueError(f"unknown instance format '{format}', use one of {FORMATS}")
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    reader, objective = _READERS[format]
+    file = open(source) if isinstance(source, str) else source
+    try:
+        for instance_name, model, items in reader(enumerate(file, 1), name, constraints):
+            known = bounds.get(instance_name, {})
+            yield Instance(instance_name, model, items, objective, known.get("best"), known.get("lower_bound"))
+    finally:
+        if file is not source:
+            file.close()
+
+def iter_library(paths : Iterable[str], format : None|str = None, bounds : dict[str:dict] = {}, constraints : Iterable = []) -> Iterator[Instance]:
+    """
+    Lazily read the instances of many files (a directory is expanded to the files it contains, sorted by name)
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from iter_library(sorted(os.path.join(path, entry) for entry in os.listdir(path)), format, bounds, constraints)
+        else:
+            yield from iter_instances(path, format, bounds, constraints)
+
+def load_instances(source : str|TextIO, format : None|str = None, bounds : dict[str:dict] = {}, constraints : Iterable = []) -> list[Instance]:
+    """
+    Read all the instances of a file (see iter_instances)
+    """
+    return list(iter_instances(source, format, bounds, constraints))
+
+if __name__ == "__main__":
+    # loaders testing on small instances in both formats, with published values and format errors
+    import io
+    import tempfile
+    from .Constraints import constraints
+    testconstraints = [constraints['fits_inside_bin'], constraints['no_overlap']]
+    thpack = io.StringIO("2\n1 2502\n10 4 4\n2\n1 5 0 2 1 2 1 3\n2 4 0 4 1 2 1 1\n\n2 7\n6 6 6\n1\n1 3 1 3 1 3 1 8\n")
+    testinstances = list(iter_instances(thpack, "thpack", {"thpack-1": {"best": Decimal(75), "lower_bound": None}}, testconstraints, "thpack"))
+    assert [instance.name for instance in testinstances] == ["thpack-1", "thpack-2"] and testinstances[0].objective == "utilization"
+    assert tuple(testinstances[0].model.dimensions) == (4, 4, 10) and len(testinstances[0].items) == 4 and testinstances[1].best is None
+    assert [tuple(item.size) for item in testinstances[0].to_items()][2:] == [(2,2,5), (4,2,4)], [str(item) for item in testinstances[0].to_items()]
+    packer = testinstances[0].packer()
+    packer.pack()
+    value = testinstances[0].evaluate(packer.current_configuration)
+    assert value == 100*Decimal(3*20+32)/160 and testinstances[0].gap(value) == (75-value)/75, value
+    bpp = io.StringIO("3 10 10 10\n1 5 5 5\n2 10 10 6\n3 5 5 5\n2 4 4 4\n4 4 4\n4 4 4\n")
+    testinstances = list(iter_instances(bpp, "bpp", constraints=testconstraints, name="test"))
+    assert [(instance.name, len(instance.items), instance.continuous_bound()) for instance in testinstances] == [("test-1", 3, 1), ("test-2", 2, 2)]
+    assert testinstances[0].reference() == 1 and testinstances[0].items.item(1).max_load is None
+    packer = testinstances[0].packer()
+    packer.pack()
+    assert testinstances[0].evaluate(packer.current_configuration) == 2 and testinstances[0].gap(2) == 1
+    try:
+        load_instances(io.StringIO("2 10 10 10\n1 2\n"), "bpp")
+        raise AssertionError("missing values accepted")
+    except InstanceFormatError:
+        pass
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+        file.write("name,best,lower_bound\ntest-1,2,\n")
+    assert load_bounds(file.name) == {"test-1": {"best": 2, "lower_bound": None}}
+    os.remove(file.name)
@@ -1,12 +1,149 @@
+import random as _random
+from array import array
 from decimal import Decimal
-from random import random,randint,gauss
+from itertools import accumulate
+from typing import Iterator
 from .Item import Item
-from .Space import Vector3, Volume
+from .ItemArray import ItemArray, NO_LIMIT
 
-def item_generator(width : tuple[Decimal,Decimal] , height : tuple[Decimal,Decimal], depth : tuple[Decimal,Decimal], weight : tuple[Decimal,Decimal], priority_range : tuple[int,int] = (0,0), batch_size : int = 1, use_gaussian_distrib : bool = False, decimals : int = 3) -> Item|list[Item]:
+CHUNK_SIZE = 65536
+DISTRIBUTIONS = ("uniform", "gaussian", "lognormal")
+
+def _make_rng(seed : None|int = None, rng : None|_random.Random = None):
+    """
+    The random generator to use: rng if given, a new one seeded with seed, or the random module itself
+    (its functions share the global generator, so unseeded calls follow random.seed)
+    """
+    if rng is not None:
+        return rng
+    if seed is not None:
+        return _random.Random(seed)
+    return _random
+
+def _fixed_sampler(rng : _random.Random, params : tuple[Decimal,Decimal], distribution : str, decimals : int):
+    """
+    A function without arguments returning fixed point samples of the distribution
+
+    :param params: min-max range (uniform), mu-sigma (gaussian) or mu-sigma of the logarithm (lognormal)
+    :type params: tuple[Decimal, Decimal]
+    """
+    scale = 10**decimals
+    a, b = float(params[0]), float(params[1])
+    if distribution == "uniform":
+        uniform, span = rng.random, b-a
+        return lambda: round(abs(a+uniform()*span)*scale)
+    if distribution == "gaussian":
+        gauss = rng.gauss
+        return lambda: round(abs(gauss(a,b))*scale)
+    if distribution == "lognormal":
+        lognormvariate = rng.lognormvariate
+        return lambda: round(lognormvariate(a,b)*scale)
+    raise ValueError(f"unknown distribution '{distribution}', use one of {DISTRIBUTIONS}")
+
+def item_array_generator(width : tuple[Decimal,Decimal], height : tuple[Decimal,Decimal], depth : tuple[Decimal,Decimal], weight : tuple[Decimal,Decimal], priority_range : tuple[int,int] = (0,0), batch_size : int = 1, distribution : str = "uniform", decimals : int = 3, seed : None|int = None, rng : None|_random.Random = None, first_name : int = 0) -> ItemArray:
+    """
+    Generate a batch of items as fixed point columns, no Item object is built
+
+    Items are drawn one at a time (width, height, depth, weight, priority), so a seed produces the same items of item_generator.
+
+    :param width: Width min-max range or distribution params
+    :type width: tuple[Decimal, Decimal]
+    :param height: Height min-max range or distribution params
+    :type height: tuple[Decimal, Decimal]
+    :param depth: Depth min-max range or distribution params
+    :type depth: tuple[Decimal, Decimal]
+    :param weight: Weight min-max range or distribution params
+    :type weight: tuple[Decimal, Decimal]
+    :param priority_range: Priority min-max range
+    :type priority_range: tuple[int, int]
+    :param batch_size: Number of items to generate
+    :type batch_size: int
+    :param distribution: "uniform" (params are min and max), "gaussian" (mu and sigma) or "lognormal" (mu and sigma of the logarithm)
+    :type distribution: str
+    :param decimals: Number of decimals of sizes and weights
+    :type decimals: int
+    :param seed: Seed of a private random generator
+    :type seed: None | int
+    :param rng: Random generator to use (overrides seed), None for the global one if seed is None too
+    :type rng: None | random.Random
+    :param first_name: Items are named with consecutive numbers starting from first_name
+    :type first_name: int
+    """
+    rng = _make_rng(seed, rng)
+    samplers = [_fixed_sampler(rng, params, distribution, decimals) for params in (width, height, depth, weight)]
+    randint = rng.randint
+    low, high = priority_range
+    columns = {column: array('q', bytes(8*batch_size)) for column in ItemArray.COLUMNS}
+    sample_width, sample_height, sample_depth, sample_weight = samplers
+    widths, heights, depths, weights, priorities = (columns[column] for column in ItemArray.COLUMNS[:5])
+    columns["max_load"] = array('q', [NO_LIMIT])*batch_size
+    for idx in range(batch_size):
+        widths[idx] = sample_width()
+        heights[idx] = sample_height()
+        depths[idx] = sample_depth()
+        weights[idx] = sample_weight()
+        priorities[idx] = randint(low, high)
+    return ItemArray(decimals, columns, [str(idx) for idx in range(first_name, first_name+batch_size)])
+
+def iter_item_arrays(width : tuple[Decimal,Decimal], height : tuple[Decimal,Decimal], depth : tuple[Decimal,Decimal], weight : tuple[Decimal,Decimal], priority_range : tuple[int,int] = (0,0), total : int = 1, chunk_size : int = CHUNK_SIZE, distribution : str = "uniform", decimals : int = 3, seed : None|int = None, rng : None|_random.Random = None) -> Iterator[ItemArray]:
+    """
+    Lazily generate a large batch of items in chunks of at most chunk_size items (see item_array_generator for the parameters)
+
+    :param total: Number of items to generate
+    :type total: int
+    :param chunk_size: Maximum number of items per chunk
+    :type chunk_size: int
+    """
+    rng = _make_rng(seed, rng)
+    for start in range(0, total, chunk_size):
+        yield item_array_generator(width, height, depth, weight, priority_range, min(chunk_size, total-start), distribution, decimals, rng=rng, first_name=start)
+
+def iter_items(width : tuple[Decimal,Decimal], height : tuple[Decimal,Decimal], depth : tuple[Decimal,Decimal], weight : tuple[Decimal,Decimal], priority_range : tuple[int,int] = (0,0), total : int = 1, distribution : str = "uniform", decimals : int = 3, seed : None|int = None, rng : None|_random.Random = None) -> Iterator[Item]:
+    """
+    Lazily generate Item objects, one at a time (see item_array_generator for the parameters)
+
+    :param total: Number of items to generate
+    :type total: int
+    """
+    for chunk in iter_item_arrays(width, height, depth, weight, priority_range, total, CHUNK_SIZE, distribution, decimals, seed, rng):
+        yield from chunk
+
+def catalog_generator(catalog : list[Item]|ItemArray, batch_size : int = 1, popularity : None|list[float] = None, zipf_exponent : float = 1.0, decimals : int = 3, seed : None|int = None, rng : None|_random.Random = None) -> ItemArray:
+    """
+    Generate an order book drawing SKUs from a catalog, so that identical items repeat as in real orders
+
+    Items keep the name of their SKU.
+
+    :param catalog: The SKUs (their sizes, weight, priority and name are copied)
+    :type catalog: list[Item] | ItemArray
+    :param batch_size: Number of items to generate
+    :type batch_size: int
+    :param popularity: Relative frequency of each SKU, None for a Zipf law on the catalog order (first SKU is the most popular)
+    :type popularity: None | list[float]
+    :param zipf_exponent: Exponent of the Zipf law used when popularity is None
+    :type zipf_exponent: float
+    :param decimals: Number of decimals of sizes and weights
+    :type decimals: int
+    :param seed: Seed of a private random generator
+    :type seed: None | int
+    :param rng: Random generator to use (overrides seed)
+    :type rng: None | random.Random
+    """
+    rng = _make_rng(seed, rng)
+    if not isinstance(catalog, ItemArray) or catalog.decimals != decimals:
+        catalog = ItemArray.from_items(catalog, decimals)
+    if popularity is None:
+        popularity = [1/(rank**zipf_exponent) for rank in range(1, len(catalog)+1)]
+    if len(popularity) != len(catalog):
+        raise ValueError("popularity must have an entry for each SKU of the catalog")
+    picks = rng.choices(range(len(catalog)), cum_weights=list(accumulate(popularity)), k=batch_size)
+    columns = {column: array('q', (values[pick] for pick in picks)) for column, values in catalog.columns.items()}
+    return ItemArray(decimals, columns, [catalog.names[pick] for pick in picks])
+
+def item_generator(width : tuple[Decimal,Decimal] , height : tuple[Decimal,Decimal], depth : tuple[Decimal,Decimal], weight : tuple[Decimal,Decimal], priority_range : tuple[int,int] = (0,0), batch_size : int = 1, use_gaussian_distrib : bool = False, decimals : int = 3, seed : None|int = None, rng : None|_random.Random = None) -> Item|list[Item]:
     """
     Generate Item objects with the given specifics
-    
+
     :param width: Width min-max range or mu-sigma params
     :type width: tuple[Decimal, Decimal]
     :param height: Height min-max range or mu-sigma params
@@ -21,40 +158,31 @@ def item_generator(width : tuple[Decimal,Decimal] , height : tuple[Decimal,Decim
     :type batch_size: int
     :param use_gaussian_distrib: if True size and weight are gaussian varibles and width,height,depth and weight are the mu-sigma params associated, if False size and weight are simple random variables and width,height,depth and weight are the minimum and maximum values
     :type use_gaussian_distrib: bool
+    :param seed: Seed of a private random generator, None to use the global one of the random module
+    :type seed: None | int
+    :param rng: Random generator to use (overrides seed)
+    :type rng: None | random.Random
     """
-    
-    randf = (lambda mu,sigma: abs(gauss(mu,sigma))) if use_gaussian_distrib else (lambda min,max: abs(min+random()*(max-min)))
-    
+    items = item_array_generator(
+        width, height, depth, weight, priority_range, batch_size,
+        "gaussian" if use_gaussian_distrib else "uniform", decimals, seed, rng
+    )
     if batch_size == 1:
-        ret = Item(
-            name    = None,
-            volume  = Volume(
-                size = Vector3(
-                    x=Decimal(randf(width[0],width[1])),
-                    y=Decimal(randf(height[0],height[1])),
-                    z=Decimal(randf(depth[0],depth[1]))
-                )
-            ),
-            weight  = Decimal(randf(weight[0],weight[1])),
-            priority= (randint(priority_range[0],priority_range[1]))
-        )
-        ret.format_numbers(decimals)
+        ret = items.item(0)
+        ret.name = None
         return ret
-    else:
-        items = []
-        for i in range(0,batch_size):
-            item = Item(
-                name    = str(i),
-                volume  = Volume(
-                    size = Vector3(
-                        x=Decimal(randf(width[0],width[1])),
-                        y=Decimal(randf(height[0],height[1])),
-                        z=Decimal(randf(depth[0],depth[1]))
-                    )
-                ),
-                weight  = Decimal(randf(weight[0],weight[1])),
-                priority= (randint(priority_range[0],priority_range[1]))
-            )
-            item.format_numbers(decimals)
-            items.append(item)
-        return items
\ No newline at end of file
+    return items.to_items()
+
+if __name__ == "__main__":
+    # seeding testing: the same seed gives the same items, unseeded calls follow random.seed
+    params = ((1,5),(1,5),(1,5),(1,10),(0,3))
+    describe = lambda items: [(item.name, tuple(item.size), item.weight, item.priority) for item in items]
+    assert describe(item_generator(*params,batch_size=20,seed=7)) == describe(item_generator(*params,batch_size=20,seed=7))
+    assert describe(item_array_generator(*params,batch_size=20,seed=7)) == describe(item_generator(*params,batch_size=20,seed=7))
+    _random.seed(3)
+    first = describe(item_generator(*params,batch_size=20))
+    _random.seed(3)
+    assert describe(item_generator(*params,batch_size=20)) == first
+    assert describe(iter_items(*params,total=20,seed=7)) == describe(item_generator(*params,batch_size=20,seed=7))
+    catalog = item_generator(*params,batch_size=5,seed=1)
+    assert describe(catalog_generator(catalog,10,seed=2)) == describe(catalog_generator(catalog,10,seed=2))
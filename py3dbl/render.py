@@ -1,12 +1,31 @@
 import plotly.graph_objects as go
+from typing import Iterable
 from .Bin import Bin
 from .Item import Item
 from .Space import Volume
+from .PackingResult import PackingResult
 
 COLORS = ["cyan","red","yellow","blue","green","brown","magenta"]
 BORDER_WIDTH = 1
 BORDER_COLOR = "black"
 TRANSPARENCY = .5
+# above this number of items the edge overlay only outlines the biggest ones (level of detail)
+EDGE_LIMIT = 300
+
+# triangles (vertex indices) and edges of a box with the vertices in the order used by render_volume_interactive
+_BOX_TRIANGLES = (
+    (0,1,2), (0,2,3), (4,5,6), (4,6,7), (0,1,5), (0,5,4),
+    (3,2,6), (3,6,7), (0,3,7), (0,7,4), (1,2,6), (1,6,5)
+)
+_BOX_EDGES = ((0,1), (1,2), (2,3), (3,0), (4,5), (5,6), (6,7), (7,4), (0,4), (1,5), (2,6), (3,7))
+
+def _box_vertices(volume : Volume) -> list[tuple[float,float,float]]:
+    """
+    Vertices of a volume in plot coordinates (the height of the volume is the vertical z axis of the plot)
+    """
+    x, y, z = [float(value) for value in volume.position]
+    w, h, d = [float(value) for value in volume.size]
+    return [(x,z,y), (x+w,z,y), (x+w,z,y+h), (x,z,y+h), (x,z+d,y), (x+w,z+d,y), (x+w,z+d,y+h), (x,z+d,y+h)]
 
 def render_volume_interactive(volume : Volume, fig : go.Figure, color : str, name : str = "", show_border : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR, transparency : float = TRANSPARENCY):   
     """
@@ -46,7 +65,143 @@ def render_volume_interactive(volume : Volume, fig : go.Figure, color : str, nam
 def render_item_interactive(item : Item, fig : go.Figure, color : str, show_border : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR, transparency : float = TRANSPARENCY):
     render_volume_interactive(item,fig,color,item.name,show_border,border_width,border_color,transparency)
 
-def render_bin_interactive(bin : Bin, colors : list[str] = COLORS, render_bin : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR, transparency : float = TRANSPARENCY):
+def render_volumes_merged(volumes : Iterable[Volume], fig : go.Figure, colors : list[str] = COLORS, names : None|list[str] = None, name : str = "",
+                          transparency : float = TRANSPARENCY, show_edges : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR,
+                          edge_limit : None|int = EDGE_LIMIT, row : None|int = None, col : None|int = None):
+    """
+    An interactive 3D rendering of many volumes as a single mesh trace (and a single trace for the edges),
+    so the figure stays light whatever the number of volumes
+
+    :param volumes: Target volumes
+    :type volumes: Iterable[Volume]
+    :param fig: A go figure as rendering target
+    :type fig: go.Figure
+    :param colors: Colors of the volumes, used in cycle
+    :type colors: list[str]
+    :param names: Names shown when hovering each volume (None for no names)
+    :type names: None | list[str]
+    :param name: Name of the traces
+    :type name: str
+    :param transparency: Transparency of the volumes
+    :type transparency: float
+    :param show_edges: Draw the edges of the volumes
+    :type show_edges: bool
+    :param border_width: Width of the edges
+    :type border_width: float
+    :param border_color: Color of the edges
+    :type border_color: str
+    :param edge_limit: Maximum number of volumes outlined, the biggest ones are chosen (None for no limit)
+    :type edge_limit: None | int
+    :param row: Row of the subplot to draw in (for figures made with make_subplots)
+    :type row: None | int
+    :param col: Column of the subplot to draw in
+    :type col: None | int
+    """
+    volumes = list(volumes)
+    if not volumes:
+        return
+    x, y, z, i, j, k, facecolor, hovertext = [], [], [], [], [], [], [], []
+    for idx, volume in enumerate(volumes):
+        base = len(x)
+        for vx, vy, vz in _box_vertices(volume):
+            x.append(vx)
+            y.append(vy)
+            z.append(vz)
+        color = colors[idx%len(colors)]
+        for a, b, c in _BOX_TRIANGLES:
+            i.append(base+a)
+            j.append(base+b)
+            k.append(base+c)
+            facecolor.append(color)
+        if names is not None:
+            hovertext.extend([str(names[idx])]*8)
+    fig.add_trace(go.Mesh3d(
+            x=x, y=y, z=z, i=i, j=j, k=k,
+            facecolor=facecolor,
+            flatshading=True,
+            opacity=(1.0 - transparency),
+            name=name,
+            hovertext=hovertext if names is not None else None,
+            hoverinfo="text+name" if names is not None else "name",
+            showscale=False
+        ), row=row, col=col)
+
+    if not show_edges:
+        return
+    outlined = volumes
+    if edge_limit is not None and len(volumes) > edge_limit:
+        outlined = sorted(volumes, key=lambda volume: volume.volume(), reverse=True)[:edge_limit]
+    ex, ey, ez = [], [], []
+    for volume in outlined:
+        vertices = _box_vertices(volume)
+        for a, b in _BOX_EDGES:
+            ex.extend((vertices[a][0], vertices[b][0], None))
+            ey.extend((vertices[a][1], vertices[b][1], None))
+            ez.extend((vertices[a][2], vertices[b][2], None))
+    fig.add_trace(go.Scatter3d(
+            x=ex, y=ey, z=ez,
+            mode="lines",
+            line=dict(color=border_color, width=border_width),
+            name=name + " edges",
+            hoverinfo="skip",
+            showlegend=False
+        ), row=row, col=col)
+
+def _scene_layout() -> dict:
+    return dict(
+        xaxis=dict(title='Width'),
+        zaxis=dict(title='Height'),
+        yaxis=dict(title='Depth'),
+        aspectmode='data'
+    )
+
+def bin_figure(bin : Bin, colors : list[str] = COLORS, render_bin : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR,
+               transparency : float = TRANSPARENCY, show_edges : bool = True, edge_limit : None|int = EDGE_LIMIT, fig : None|go.Figure = None,
+               row : None|int = None, col : None|int = None) -> go.Figure:
+    """
+    Build the figure of a bin with merged traces: one mesh for the items, one for the dead volumes and one for the bin
+
+    :param bin: Target bin
+    :type bin: Bin
+    :param colors: Colors of the items, used in cycle
+    :type colors: list[str]
+    :param render_bin: Draw the bin itself
+    :type render_bin: bool
+    :param show_edges: Draw the edges of the items
+    :type show_edges: bool
+    :param edge_limit: Maximum number of items outlined (see render_volumes_merged)
+    :type edge_limit: None | int
+    :param fig: Figure to draw in (None for a new one)
+    :type fig: None | go.Figure
+    :param row: Row of the subplot to draw in (for figures made with make_subplots)
+    :type row: None | int
+    :param col: Column of the subplot to draw in
+    :type col: None | int
+    :return: The figure
+    :rtype: go.Figure
+    """
+    if fig is None:
+        fig = go.Figure()
+        fig.update_layout(scene=_scene_layout(), title=f"3D Packing Visualization - {bin}")
+    bin_render_params = {"colors": ["lightgrey"], "show_edges": False, "row": row, "col": col}
+    render_volumes_merged(bin._model.dead_volumes, fig, name="Dead volumes", transparency=.1, **bin_render_params)
+    render_volumes_merged(bin.items, fig, colors, [item.name for item in bin.items], f"Bin {bin.id}",
+                          transparency, show_edges, border_width, border_color, edge_limit, row, col)
+    if render_bin:
+        render_volumes_merged([Volume(bin.dimensions)], fig, name="Bin", transparency=.9, **bin_render_params)
+    return fig
+
+def render_bin_interactive(bin : Bin, colors : list[str] = COLORS, render_bin : bool = True, border_width : float = BORDER_WIDTH, border_color : str = BORDER_COLOR, transparency : float = TRANSPARENCY,
+                           merged : bool = True, show_edges : bool = True, edge_limit : None|int = EDGE_LIMIT):
+    """
+    Show an interactive 3D rendering of a bin
+
+    :param merged: Draw all the items as a single mesh (see bin_figure), False for a trace per item
+    :type merged: bool
+    """
+    if merged:
+        bin_figure(bin, colors, render_bin, border_width, border_color, transparency, show_edges, edge_limit).show()
+        return
 
     fig = go.Figure()
 
@@ -66,13 +221,135 @@ def render_bin_interactive(bin : Bin, colors : list[str] = COLORS, render_bin :
         render_volume_interactive(Volume(bin.dimensions),fig=fig,transparency=.9,**bin_render_params)
 
     fig.update_layout(
-        scene=dict(
-            xaxis=dict(title='Width'),
-            zaxis=dict(title='Height'),
-            yaxis=dict(title='Depth'),
-            aspectmode='data'
-        ),
+        scene=_scene_layout(),
         title=f"3D Packing Visualization - {bin}"
     )
 
-    fig.show()
\ No newline at end of file
+    fig.show()
+
+def fleet_figure(configuration : list[Bin]|PackingResult, layout : str = "selector", columns : int = 2, colors : list[str] = COLORS, render_bin : bool = True,
+                 show_edges : bool = True, edge_limit : None|int = EDGE_LIMIT, title : None|str = None) -> go.Figure:
+    """
+    Build a single figure with all the bins of a configuration
+
+    :param configuration: The bins to draw (e.g. Packer.current_configuration or Packer.result)
+    :type configuration: list[Bin] | PackingResult
+    :param layout: "selector" for one scene with a menu choosing the bin, "grid" for a scene per bin
+    :type layout: str
+    :param columns: Number of scenes per row of the grid
+    :type columns: int
+    :param colors: Colors of the items, used in cycle
+    :type colors: list[str]
+    :param render_bin: Draw the bins themselves
+    :type render_bin: bool
+    :param show_edges: Draw the edges of the items
+    :type show_edges: bool
+    :param edge_limit: Maximum number of items outlined per bin (see render_volumes_merged)
+    :type edge_limit: None | int
+    :param title: Title of the figure (None for a summary of the configuration)
+    :type title: None | str
+    :return: The figure
+    :rtype: go.Figure
+    """
+    if isinstance(configuration, PackingResult):
+        configuration = configuration.to_configuration()
+    if title is None:
+        title = f"3D Packing Visualization - {len(configuration)} bins, {sum(len(bin.items) for bin in configuration)} items"
+    options = dict(colors=colors, render_bin=render_bin, show_edges=show_edges, edge_limit=edge_limit)
+
+    if layout == "grid":
+        from plotly.subplots import make_subplots
+        rows = max(1, -(-len(configuration)//columns))
+        fig = make_subplots(rows=rows, cols=columns, specs=[[{"type": "scene"}]*columns for _ in range(rows)],
+                            subplot_titles=[str(bin) for bin in configuration])
+        for idx, bin in enumerate(configuration):
+            bin_figure(bin, fig=fig, row=idx//columns+1, col=idx%columns+1, **options)
+        fig.update_scenes(**_scene_layout())
+        fig.update_layout(title=title, height=500*rows)
+        return fig
+
+    if layout != "selector":
+        raise ValueError(f"unknown layout '{layout}', use 'selector' or 'grid'")
+    fig = go.Figure()
+    ranges = []
+    for bin in configuration:
+        first = len(fig.data)
+        bin_figure(bin, fig=fig, **options)
+        ranges.append((first, len(fig.data)))
+    buttons = []
+    for idx, (bin, (first, last)) in enumerate(zip(configuration, ranges)):
+        visible = [first <= trace < last for trace in range(len(fig.data))]
+        buttons.append(dict(label=str(bin.id), method="update", args=[{"visible": visible}, {"title": f"{title} - {bin}"}]))
+    if ranges:
+        first, last = ranges[0]
+        for trace, data in enumerate(fig.data):
+            data.visible = first <= trace < last
+    fig.update_layout(
+        scene=_scene_layout(),
+        title=f"{title} - {configuration[0]}" if configuration else title,
+        updatemenus=[dict(buttons=buttons, direction="down", x=0, xanchor="left", y=1.1, yanchor="top")] if buttons else []
+    )
+    return fig
+
+def render_fleet_interactive(configuration : list[Bin]|PackingResult, layout : str = "selector", **options):
+    """
+    Show all the bins of a configuration in a single interactive figure (see fleet_figure for the options)
+    """
+    fleet_figure(configuration, layout, **options).show()
+
+def write_figure(fig : go.Figure, path : str, include_plotlyjs : bool|str = True) -> str:
+    """
+    Write a figure to a file: a standalone HTML document for ".html" paths, a static image otherwise
+    (png, svg, pdf... static images require the kaleido package)
+
+    :param include_plotlyjs: For HTML, True to embed plotly.js (works offline), "cdn" to load it from the network
+    :type include_plotlyjs: bool | str
+    :return: The path written
+    :rtype: str
+    """
+    if path.lower().endswith((".html", ".htm")):
+        fig.write_html(path, include_plotlyjs=include_plotlyjs)
+    else:
+        fig.write_image(path)
+    return path
+
+def write_fleet(configuration : list[Bin]|PackingResult, path : str, layout : str = "selector", include_plotlyjs : bool|str = True, **options) -> str:
+    """
+    Write all the bins of a configuration to a single file, without displaying anything (see fleet_figure and write_figure)
+
+    :return: The path written
+    :rtype: str
+    """
+    return write_figure(fleet_figure(configuration, layout, **options), path, include_plotlyjs)
+
+def _write_route(configuration : list[Bin]|PackingResult, path : str, layout : str, include_plotlyjs : bool|str, options : dict) -> str:
+    return write_fleet(configuration, path, layout, include_plotlyjs, **options)
+
+def export_fleets(routes : dict[str:list[Bin]|PackingResult], directory : str = ".", format : str = "html", layout : str = "selector",
+                  include_plotlyjs : bool|str = "cdn", max_workers : None|int = None, **options) -> dict[str:str]:
+    """
+    Headless export of many configurations (e.g. the routes of a depot), a file per configuration written on a process pool
+
+    :param routes: Name of the file (without extension) to the configuration to draw, results (see PackingResult) are the cheapest to send to the workers
+    :type routes: dict[str:list[Bin] | PackingResult]
+    :param directory: Directory of the files, created if missing
+    :type directory: str
+    :param format: Extension of the files ("html", or an image format such as "png" or "pdf")
+    :type format: str
+    :param include_plotlyjs: For HTML, True to embed plotly.js in every file, "cdn" to load it from the network
+    :type include_plotlyjs: bool | str
+    :param max_workers: Number of worker processes (None for the number of CPUs, 0 to export in this process)
+    :type max_workers: None | int
+    :param options: Options of fleet_figure
+    :return: Name of the route to the path written
+    :rtype: dict[str:str]
+    """
+    import os
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, f"{name}.{format}") for name in routes}
+    if max_workers == 0:
+        return {name: _write_route(routes[name], path, layout, include_plotlyjs, options) for name, path in paths.items()}
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers) as executor:
+        futures = {name: executor.submit(_write_route, routes[name], path, layout, include_plotlyjs, options) for name, path in paths.items()}
+        return {name: future.result() for name, future in futures.items()}
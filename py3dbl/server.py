@@ -0,0 +1,369 @@
+"""
+Local packing server: accepts JSON packing jobs over HTTP (TCP or Unix socket) and
+dispatches them to a pool of pre-warmed worker processes
+
+A job references registered algorithms, constraints and bin models by name:
+
+    {
+        "id": "route-1",
+        "algorithm": "all_lay",
+        "parameters": {"allow_full_rotation": true},
+        "constraints": ["is_supported"],
+        "default_bin": "Delivery",
+        "fleet": [{"id": "S0", "model": "Delivery"}],
+        "items": [{"name": "a", "size": [0.3, 0.2, 0.1], "weight": 2.5, "priority": 0, "max_load": 10}]
+    }
+
+Custom constraints, algorithms and models are made available with setup modules that
+register them on import (see register_model), e.g. python -m py3dbl.server --setup my_fleet
+"""
+
+import argparse
+import importlib
+import json
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+from .Bin import Bin, models
+from .Item import Item
+from .Space import Volume
+from .Constraints import constraints
+from .Algorithms import algorithms
+from .Packer import Packer
+from .PackingResult import PackingResult
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_QUEUE = 64
+
+class JobError(Exception):
+    """
+    A job that can not be executed as requested (malformed or referencing unknown names)
+    """
+    pass
+
+def _lookup(registry : dict, name : str, kind : str):
+    try:
+        return registry[name]
+    except KeyError:
+        raise JobError(f"unknown {kind} '{name}'") from None
+
+def job_from_dict(job : dict) -> tuple[Packer,list,dict]:
+    """
+    Build the packer, the additional constraints and the algorithm parameters described by a JSON job
+
+    :param job: The decoded JSON job
+    :type job: dict
+    :return: A tuple (packer, constraints, parameters)
+    :rtype: tuple[Packer, list[Constraint], dict]
+    """
+    try:
+        items = [
+            Item(
+                name     = entry.get("name", str(idx)),
+                volume   = Volume([Decimal(str(value)) for value in entry["size"]]),
+                weight   = Decimal(str(entry.get("weight", 0))),
+                priority = int(entry.get("priority", 0)),
+                max_load = Decimal(str(entry["max_load"])) if entry.get("max_load") is not None else None
+            )
+            for idx, entry in enumerate(job["items"])
+        ]
+        fleet = [Bin(entry.get("id"), _lookup(models, entry["model"], "model")) for entry in job.get("fleet", [])]
+        default_bin = job.get("default_bin")
+        if default_bin is not None:
+            default_bin = _lookup(models, default_bin, "model")
+        algorithm = _lookup(algorithms, job.get("algorithm", "base_packer"), "algorithm")
+        job_constraints = [_lookup(constraints, name, "constraint") for name in job.get("constraints", [])]
+        parameters = dict(job.get("parameters", {}))
+    except (KeyError, TypeError, ValueError, ArithmeticError) as error:
+        raise JobError(f"malformed job: {error!r}") from None
+    return Packer(algorithm=algorithm, default_bin=default_bin, fleet=fleet, items=items), job_constraints, parameters
+
+def configuration_to_dict(configuration : list[Bin]|PackingResult) -> list[dict]:
+    """
+    JSON friendly representation of a packing configuration
+
+    :param configuration: A packing configuration, or its snapshot (read straight from its columns)
+    :type configuration: list[Bin] | PackingResult
+    :rtype: list[dict]
+    """
+    if isinstance(configuration, PackingResult):
+        result = configuration
+        scale = 10**result.decimals
+        names = result.items.names
+        item_column = result.column("item")
+        positions = [result.column(axis) for axis in ("x","y","z")]
+        return [
+            {
+                "id": bin_id,
+                "model": model.name,
+                "weight": sum(result.column("weight", bin_idx))/scale,
+                "items": [
+                    {
+                        "name": names[item_column[row]],
+                        "position": [column[row]/scale for column in positions],
+                        "size": [value/scale for value in result.placed_size(row)],
+                    }
+                    for row in result.rows(bin_idx)
+                ]
+            }
+            for bin_idx, (bin_id, model) in enumerate(zip(result.bin_ids, result.models))
+        ]
+    return [
+        {
+            "id": bin.id,
+            "model": bin._model.name,
+            "weight": float(bin.weight),
+            "items": [
+                {
+                    "name": item.name,
+                    "position": [float(value) for value in item.position],
+                    "size": [float(value) for value in item.size],
+                }
+                for item in bin.items
+            ]
+        }
+        for bin in configuration
+    ]
+
+def _init_worker(setup : tuple[str], registered_models : dict) -> None:
+    # executed once per worker process: load custom definitions and the models
+    for module in setup:
+        importlib.import_module(module)
+    models.update(registered_models)
+
+def _warm_up() -> int:
+    return os.getpid()
+
+def execute_job(job : dict) -> dict:
+    """
+    Run a JSON job in the current process
+
+    :param job: The decoded JSON job
+    :type job: dict
+    :return: The JSON response with a status code, {"status": int, ...}
+    :rtype: dict
+    """
+    try:
+        packer, job_constraints, parameters = job_from_dict(job)
+    except JobError as error:
+        return {"status": 400, "id": job.get("id"), "error": str(error)}
+    try:
+        start = time.perf_counter()
+        packer.pack(constraints=job_constraints, **parameters)
+        elapsed = time.perf_counter() - start
+    except Exception as error:
+        return {"status": 500, "id": job.get("id"), "error": repr(error)}
+    return {
+        "status": 200,
+        "id": job.get("id"),
+        "elapsed": elapsed,
+        "bins": configuration_to_dict(packer.result)
+    }
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "py3dbl"
+
+    def _reply(self, status : int, body : dict) -> None:
+        # values echoed from the job (e.g. a numeric id, decoded as Decimal) are sent back as strings
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # client_address is a plain path on Unix sockets
+        return str(self.client_address[0]) if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.packing_server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        packing_server = self.server.packing_server
+        if self.path == "/health":
+            self._reply(200, {"status": "ok", "workers": packing_server.workers, "queued": packing_server.queued})
+        elif self.path == "/registry":
+            self._reply(200, {
+                "algorithms": sorted(algorithms),
+                "constraints": sorted(constraints),
+                "models": sorted(models)
+            })
+        else:
+            self._reply(404, {"error": f"no such endpoint {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/pack":
+            self._reply(404, {"error": f"no such endpoint {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length), parse_float=Decimal)
+            if not isinstance(job, dict):
+                raise ValueError("a job must be a JSON object")
+        except ValueError as error:
+            self._reply(400, {"error": f"invalid JSON job: {error}"})
+            return
+        response = self.server.packing_server.submit(job)
+        self._reply(response.pop("status"), response)
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        self.server_name, self.server_port = "localhost", 0
+
+class PackingServer:
+    """
+    HTTP front-end that queues packing jobs on a pool of pre-warmed worker processes
+    """
+    def __init__(self, host : str = DEFAULT_HOST, port : int = DEFAULT_PORT, unix_socket : None|str = None,
+                 workers : None|int = None, setup : Iterable[str] = [], max_queue : int = MAX_QUEUE, quiet : bool = False
+                ):
+        """
+        :param host: Address to listen on (ignored if unix_socket is given)
+        :type host: str
+        :param port: TCP port to listen on (ignored if unix_socket is given)
+        :type port: int
+        :param unix_socket: Path of a Unix socket to listen on instead of TCP
+        :type unix_socket: None | str
+        :param workers: Number of worker processes (None for the number of CPUs)
+        :type workers: None | int
+        :param setup: Modules to import in every process, they should register custom models, constraints and algorithms
+        :type setup: Iterable[str]
+        :param max_queue: Maximum number of queued and running jobs, further jobs are refused with status 503
+        :type max_queue: int
+        :param quiet: True to disable request logging
+        :type quiet: bool
+        """
+        setup = tuple(setup)
+        _init_worker(setup, {})
+        self.workers = workers or os.cpu_count() or 1
+        self.quiet = quiet
+        self.queued = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(setup, dict(models)))
+        # start every worker now, so that the first jobs do not pay the start-up
+        for future in [self._executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+        if unix_socket is not None:
+            self._httpd = _UnixHTTPServer(unix_socket, _RequestHandler)
+        else:
+            self._httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.packing_server = self
+
+    @property
+    def address(self):
+        return self._httpd.server_address
+
+    def submit(self, job : dict) -> dict:
+        """
+        Queue a JSON job and wait for its response
+
+        :param job: The decoded JSON job
+        :type job: dict
+        :return: The JSON response with a status code, {"status": int, ...}
+        :rtype: dict
+        """
+        if not self._slots.acquire(blocking=False):
+            return {"status": 503, "id": job.get("id"), "error": "job queue is full"}
+        with self._lock:
+            self.queued += 1
+        try:
+            return self._executor.submit(execute_job, job).result()
+        except Exception as error:
+            return {"status": 500, "id": job.get("id"), "error": repr(error)}
+        finally:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        """
+        Stop serving (from another thread) and release the workers
+        """
+        self._httpd.shutdown()
+        self.close()
+
+    def close(self) -> None:
+        self._httpd.server_close()
+        self._executor.shutdown(cancel_futures=True)
+        if isinstance(self._httpd, _UnixHTTPServer) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+def main(argv : None|list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m py3dbl.server", description="Local 3D bin packing server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    parser.add_argument("--setup", action="append", default=[], metavar="MODULE", help="module registering custom models, constraints and algorithms (repeatable)")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--self-test", action="store_true", help="run the self-test on an ephemeral port and exit")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        _self_test()
+        return
+
+    server = PackingServer(args.host, args.port, args.unix, args.workers, args.setup, args.max_queue, args.quiet)
+    print(f"py3dbl server listening on {server.address} with {server.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+def _self_test() -> None:
+    # imported from the package, so that the worker processes and the registry share the definitions
+    from http.client import HTTPConnection
+    from py3dbl.Bin import BinModel, register_model
+    from py3dbl.server import PackingServer
+
+    register_model(BinModel("selftest", (2,2,2), 100))
+    server = PackingServer(port=0, workers=1, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    def post(body) -> tuple[int,dict]:
+        connection = HTTPConnection(*server.address)
+        connection.request("POST", "/pack", body if isinstance(body, str) else json.dumps(body))
+        response = connection.getresponse()
+        reply = response.status, json.loads(response.read())
+        connection.close()
+        return reply
+    try:
+        job = {"id": 1.5, "algorithm": "base_packer", "constraints": ["fits_inside_bin", "no_overlap"], "default_bin": "selftest",
+               "items": [{"name": "a", "size": [1, 1.5, 1], "weight": 2.5}, {"name": "b", "size": [1, 1, 1]}]}
+        status, reply = post(job)
+        assert status == 200 and reply["id"] == "1.5", (status, reply)
+        assert sorted(item["name"] for bin in reply["bins"] for item in bin["items"]) == ["a", "b"], reply
+        assert [1.0, 1.5, 1.0] in [item["size"] for bin in reply["bins"] for item in bin["items"]], reply
+        # malformed jobs and unknown names
+        for body in ("{not json", "[]", {**job, "algorithm": "nope"}, {**job, "items": [{"name": "a"}]}):
+            status, reply = post(body)
+            assert status == 400 and "error" in reply, (body, status, reply)
+        # a full queue refuses the job
+        while server._slots.acquire(blocking=False):
+            pass
+        status, reply = post({**job, "id": "full"})
+        assert (status, reply) == (503, {"id": "full", "error": "job queue is full"}), (status, reply)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
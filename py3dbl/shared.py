@@ -0,0 +1,281 @@
+"""
+Shared memory instances for process pools: items and placements live in multiprocessing.shared_memory blocks
+of fixed point int64 columns, workers attach to them instead of receiving pickled Item objects.
+
+A SharedItemArray or SharedPlacementArray pickles as the name of its block, so passing one to a worker
+(e.g. with ProcessPoolExecutor.submit) copies a few bytes whatever the number of items.
+The block is owned by the process that created it, which has to close it when done.
+"""
+import time
+from array import array
+from decimal import Decimal
+from multiprocessing import shared_memory
+from typing import Iterable
+from .Item import Item
+from .ItemArray import ItemArray, to_fixed, from_fixed
+from .Bin import Bin, BinModel
+from .Space import Vector3
+from .Constraints import Constraint
+from .PackingResult import ORIENTATIONS, orientation_code
+from .Algorithms import PackingAlgorithm, algorithms
+from .Packer import Packer
+
+# columns of a placement: bin index in the configuration, item index in the instance, position and size (as rotated)
+PLACEMENT_COLUMNS = ("bin", "item", "x", "y", "z", "width", "height", "depth")
+
+class _SharedColumns:
+    """
+    A shared memory block holding an optional count followed by int64 columns of the same length
+    """
+    def __init__(self, columns : tuple[str], length : int, name : None|str = None, counted : bool = False):
+        self.length = length
+        self.counted = counted
+        size = 8*(int(counted) + len(columns)*length)
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 8))
+        view = self.memory.buf[:max(size, 8)].cast('q')
+        self._views = [view]
+        start = int(counted)
+        self.count_view = view[0:1] if counted else None
+        self.columns = dict()
+        for column in columns:
+            self.columns[column] = view[start:start+length]
+            start += length
+        self._views.extend(self.columns.values())
+        if counted:
+            self._views.append(self.count_view)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self) -> None:
+        """
+        Release the views and detach from the block, the owner also frees it
+        """
+        if self.memory is None:
+            return
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+        self.memory = None
+
+class SharedItemArray(ItemArray):
+    """
+    An ItemArray whose columns are views on a shared memory block
+
+    Names are not shared: in the attached copies the items are named by their index in the array.
+    """
+    def __init__(self, decimals : int, block : _SharedColumns, names : None|list = None):
+        """
+        Use create or attach to build a shared array
+        """
+        super().__init__(decimals, block.columns, names if names is not None else range(block.length))
+        self._block = block
+
+    @classmethod
+    def create(cls, items : Iterable[Item]|ItemArray, decimals : int = 3):
+        """
+        Copy items in a new shared memory block owned by the current process
+
+        :param items: Items to share
+        :type items: Iterable[Item] | ItemArray
+        :param decimals: Number of decimals kept (sizes and weights must not have more, see to_fixed)
+        :type decimals: int
+        """
+        if not isinstance(items, ItemArray) or items.decimals != decimals:
+            items = ItemArray.from_items(items, decimals)
+        block = _SharedColumns(cls.COLUMNS, len(items))
+        for column in cls.COLUMNS:
+            block.columns[column][:] = array('q', items.columns[column])
+        return cls(decimals, block, items.names)
+
+    @classmethod
+    def attach(cls, name : str, length : int, decimals : int):
+        """
+        Attach to a block created by another process (the items are named by their index)
+        """
+        return cls(decimals, _SharedColumns(cls.COLUMNS, length, name))
+
+    def __reduce__(self):
+        return (SharedItemArray.attach, (self._block.name, len(self), self.decimals))
+
+    @property
+    def name(self) -> str:
+        return self._block.name
+
+    def close(self) -> None:
+        self._block.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+class SharedPlacementArray:
+    """
+    Placements (see PLACEMENT_COLUMNS) written by a worker in a shared memory block with room for capacity rows
+    """
+    def __init__(self, decimals : int, block : _SharedColumns):
+        """
+        Use create or attach to build a shared placement array
+        """
+        self.decimals = decimals
+        self._block = block
+        self.columns = block.columns
+        self.capacity = block.length
+
+    @classmethod
+    def create(cls, capacity : int, decimals : int = 3):
+        """
+        Allocate an empty placement array owned by the current process
+
+        :param capacity: Maximum number of placements (the number of items of the instance)
+        :type capacity: int
+        """
+        block = _SharedColumns(PLACEMENT_COLUMNS, capacity, counted=True)
+        block.count_view[0] = 0
+        return cls(decimals, block)
+
+    @classmethod
+    def attach(cls, name : str, capacity : int, decimals : int):
+        return cls(decimals, _SharedColumns(PLACEMENT_COLUMNS, capacity, name, counted=True))
+
+    def __reduce__(self):
+        return (SharedPlacementArray.attach, (self._block.name, self.capacity, self.decimals))
+
+    def __len__(self):
+        return self._block.count_view[0]
+
+    def write(self, configuration : list[Bin]) -> None:
+        """
+        Store the placements of a configuration whose items are named by their index (as in an attached SharedItemArray)
+        """
+        columns = self.columns
+        row = 0
+        for bin_idx, bin in enumerate(configuration):
+            for item in bin.items:
+                if row == self.capacity:
+                    raise ValueError("more placements than the capacity of the array")
+                columns["bin"][row] = bin_idx
+                columns["item"][row] = item.name
+                for column, value in zip(PLACEMENT_COLUMNS[2:], (*item.position, *item.size)):
+                    columns[column][row] = to_fixed(value, self.decimals)
+                row += 1
+        self._block.count_view[0] = row
+
+    def apply(self, items : list[Item], configuration : list[Bin]) -> list[Bin]:
+        """
+        Put the items in the bins of the configuration as described by the placements, without checking constraints
+
+        Items keep their own sizes, only rotated as placed (the sizes of the array are theirs, see to_fixed).
+
+        :param items: The items of the instance, in the order of the shared item array
+        :type items: list[Item]
+        :param configuration: The bins, in the order of the placements
+        :type configuration: list[Bin]
+        :return: The configuration
+        :rtype: list[Bin]
+        """
+        columns = self.columns
+        for row in range(len(self)):
+            item = items[columns["item"][row]]
+            size = tuple(item.size)
+            code = orientation_code(tuple(to_fixed(value, self.decimals) for value in size), tuple(columns[axis][row] for axis in ("width","height","depth")))
+            item.position = Vector3(*(from_fixed(columns[axis][row], self.decimals) for axis in ("x","y","z")))
+            item.size = Vector3(*(size[axis] for axis in ORIENTATIONS[code]))
+            configuration[columns["bin"][row]].place_item(item)
+        return configuration
+
+    @property
+    def name(self) -> str:
+        return self._block.name
+
+    def close(self) -> None:
+        self._block.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def run_shared(items : SharedItemArray, placements : SharedPlacementArray, fleet : list[Bin] = [], default_bin : None|BinModel = None,
+               algorithm : None|str|PackingAlgorithm = None, constraints : list[Constraint] = [], parameters : dict = {}) -> tuple[list,float]:
+    """
+    Pack a shared instance in the current process (usually a worker) and write the placements in the shared array
+
+    :return: For each bin of the configuration its index in the fleet (or None for a new bin of the default model, then its id), and the elapsed time
+    :rtype: tuple[list, float]
+    """
+    try:
+        if algorithm is None:
+            algorithm = algorithms['base_packer']
+        elif isinstance(algorithm, str):
+            algorithm = algorithms[algorithm]
+        fleet_index = {id(bin): idx for idx, bin in enumerate(fleet)}
+        packer = Packer(algorithm=algorithm, default_bin=default_bin, fleet=fleet, items=items.to_items())
+        start = time.perf_counter()
+        packer.pack(constraints=list(constraints), **parameters)
+        elapsed = time.perf_counter() - start
+        placements.write(packer.current_configuration)
+        bins = [(fleet_index.get(id(bin)), bin.id) for bin in packer.current_configuration]
+        return bins, elapsed
+    finally:
+        items.close()
+        placements.close()
+
+def rebuild_configuration(items : list[Item], placements : SharedPlacementArray, bins : list, fleet : list[Bin], default_bin : None|BinModel) -> list[Bin]:
+    """
+    Rebuild in the calling process the configuration found by run_shared, using the original items and fleet
+    """
+    configuration = []
+    for fleet_idx, bin_id in bins:
+        if fleet_idx is None:
+            configuration.append(Bin(bin_id, default_bin))
+        else:
+            bin = fleet[fleet_idx]
+            bin.reset()
+            configuration.append(bin)
+    return placements.apply(items, configuration)
+
+if __name__ == "__main__":
+    # shared memory testing: attached copies see the same columns, placements come back on the original items
+    import pickle
+    from .Space import Volume
+    from .Constraints import constraints
+    from .batch import PackingJob, pack_batch
+    testmodel1 = BinModel("test",(2,2,2),10,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap']])
+    testitems = [Item(f"item{idx}",Volume((1,Decimal("0.5"),Decimal("1.25"))),Decimal("0.75"),idx%3) for idx in range(10)]
+    testitems[0].max_load = 0
+    with SharedItemArray.create(testitems) as shared_items, SharedPlacementArray.create(len(testitems)) as shared_placements:
+        attached = pickle.loads(pickle.dumps(shared_items))
+        assert [(tuple(item.size), item.weight, item.priority, item.max_load) for item in attached] \
+            == [(tuple(item.size), item.weight, item.priority, item.max_load) for item in testitems]
+        attached.close()
+        bins, elapsed = run_shared(pickle.loads(pickle.dumps(shared_items)), pickle.loads(pickle.dumps(shared_placements)), default_bin=testmodel1)
+        assert len(shared_placements) == len(testitems), len(shared_placements)
+        configuration = rebuild_configuration(testitems, shared_placements, bins, [], testmodel1)
+    assert sorted(id(item) for bin in configuration for item in bin.items) == sorted(map(id, testitems))
+    for bin in configuration:
+        check = Bin(None,testmodel1)
+        assert all(check.put_item(item) for item in bin.items), [str(item) for item in bin.items]
+    # the same through a process pool
+    testfleet = [Bin("fleet",testmodel1)]
+    result = next(pack_batch([PackingJob(0,testitems,testfleet,testmodel1)],max_workers=1,shared_memory=True))
+    assert result.ok and result.configuration[0] is testfleet[0], result
+    assert sorted(id(item) for bin in result.configuration for item in bin.items) == sorted(map(id, testitems))
+    # values with more decimals than the shared ones are refused instead of rounded
+    try:
+        SharedItemArray.create([Item("fine",Volume((Decimal("0.0005"),1,1)),1,0)], decimals=3)
+        raise AssertionError("size rounded to the shared decimals")
+    except ValueError:
+        pass
+    result = next(pack_batch([PackingJob(0,[Item("fine",Volume((1,1,1)),Decimal("0.0005"),0)],[],testmodel1)],max_workers=1,shared_memory=True))
+    assert not result.ok and isinstance(result.error, ValueError), result
@@ -0,0 +1,457 @@
+"""
+Compact binary storage of packing instances and configurations
+
+File layout (little endian):
+    magic (8 bytes) | header length (uint32) | JSON header | chunks...
+every chunk is:
+    tag (4 bytes) | count (uint32) | names length (uint32) | JSON names | padding | int64 columns
+Chunks are 8 bytes aligned, so their columns can be used straight from a memory mapped file.
+Sizes, positions and weights are stored as fixed point integers with the number of decimals of the header,
+values with more decimals are refused with ValueError (see ItemArray.to_fixed).
+The header lists the item columns.
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from typing import Iterable, Iterator
+from .Bin import Bin, BinModel
+from .Item import Item
+from .Space import Volume, Vector3
+from .Constraints import Constraint, constraints
+from .ItemArray import ItemArray, to_fixed, from_fixed
+from .PackingResult import PackingResult
+
+MAGIC = b"PY3DBL\x00\x01"
+ITEMS = b"ITEM"
+PLACEMENTS = b"PLAC"
+PLACEMENT_COLUMNS = ("bin", "item", "x", "y", "z")
+CHUNK_SIZE = 65536
+
+_LENGTH = struct.Struct("<I")
+_CHUNK_HEAD = struct.Struct("<4sII")
+_COLUMNS = {ITEMS: ItemArray.COLUMNS, PLACEMENTS: PLACEMENT_COLUMNS}
+
+def _padding(offset : int) -> int:
+    return -offset % 8
+
+def _encode_value(value):
+    return {"decimal": str(value)} if isinstance(value, Decimal) else value
+
+def _decode_value(value):
+    return Decimal(value["decimal"]) if isinstance(value, dict) and "decimal" in value else value
+
+def constraint_to_dict(constraint : Constraint) -> dict:
+    return {
+        "name": constraint.func.__name__,
+        "weight": constraint.weight,
+        "parameters": {name: _encode_value(value) for name, value in constraint.kwargs.items()}
+    }
+
+def constraint_from_dict(data : dict) -> Constraint:
+    """
+    Build a constraint from its description, the function is looked up in the constraints registry
+
+    The constraint is a new object, so its parameters do not alter the registered one.
+    """
+    try:
+        func = constraints[data["name"]].func
+    except KeyError:
+        raise ValueError(f"unknown constraint '{data['name']}', register it before loading") from None
+    constraint = Constraint(func, data["weight"])
+    for name, value in data["parameters"].items():
+        constraint.set_parameter(name, _decode_value(value))
+    return constraint
+
+def model_to_dict(model : BinModel) -> dict:
+    return {
+        "name": model.name,
+        "size": [str(value) for value in model.dimensions],
+        "max_weight": str(model.max_weight),
+        "constraints": [constraint_to_dict(constraint) for constraint in model.constraints],
+        "dead_volumes": [
+            {"size": [str(value) for value in volume.size], "position": [str(value) for value in volume.position]}
+            for volume in model.dead_volumes
+        ]
+    }
+
+def model_from_dict(data : dict) -> BinModel:
+    return BinModel(
+        name         = data["name"],
+        size         = [Decimal(value) for value in data["size"]],
+        max_weight   = Decimal(data["max_weight"]),
+        constraints  = [constraint_from_dict(constraint) for constraint in data["constraints"]],
+        dead_volumes = [
+            Volume([Decimal(value) for value in volume["size"]], [Decimal(value) for value in volume["position"]])
+            for volume in data["dead_volumes"]
+        ]
+    )
+
+class Writer:
+    """
+    Streaming writer: the header is written on creation, then items and placements are appended in chunks
+    """
+    def __init__(self, path : str, header : dict = {}, decimals : int = 3, chunk_size : int = CHUNK_SIZE):
+        """
+        :param path: Destination file
+        :type path: str
+        :param header: JSON serializable metadata (models, fleet, constraints, ...)
+        :type header: dict
+        :param decimals: Number of decimals kept by the fixed point columns
+        :type decimals: int
+        :param chunk_size: Maximum number of rows per chunk
+        :type chunk_size: int
+        """
+        self.decimals = decimals
+        self.chunk_size = chunk_size
+        self._file = open(path, "wb")
+        data = json.dumps({**header, "decimals": decimals, "item_columns": list(ItemArray.COLUMNS)}).encode()
+        self._file.write(MAGIC + _LENGTH.pack(len(data)) + data)
+        self._offset = len(MAGIC) + _LENGTH.size + len(data)
+        self._pad()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _pad(self) -> None:
+        padding = _padding(self._offset)
+        self._file.write(b"\x00"*padding)
+        self._offset += padding
+
+    def _write_chunk(self, tag : bytes, columns : dict, names : None|list = None) -> None:
+        count = len(columns[_COLUMNS[tag][0]])
+        data = json.dumps(names).encode() if names is not None else b""
+        self._file.write(_CHUNK_HEAD.pack(tag, count, len(data)) + data)
+        self._offset += _CHUNK_HEAD.size + len(data)
+        self._pad()
+        for name in _COLUMNS[tag]:
+            column = columns[name]
+            if not isinstance(column, array) or column.typecode != 'q':
+                column = array('q', column)
+            if sys.byteorder == "big":
+                column = array('q', column)
+                column.byteswap()
+            self._file.write(column.tobytes())
+            self._offset += 8*count
+
+    def write_items(self, items : Iterable[Item]|ItemArray) -> int:
+        """
+        Append items, split in chunks of at most chunk_size
+
+        :param items: Items (or an ItemArray with the same number of decimals) to write
+        :type items: Iterable[Item] | ItemArray
+        :return: Number of items written
+        :rtype: int
+        """
+        if isinstance(items, ItemArray) and items.decimals == self.decimals:
+            for start in range(0, len(items), self.chunk_size):
+                end = start + self.chunk_size
+                self._write_chunk(ITEMS, {name: column[start:end] for name, column in items.columns.items()}, items.names[start:end])
+            return len(items)
+        written = 0
+        chunk = ItemArray(self.decimals)
+        for item in items:
+            chunk.append(item)
+            if len(chunk) == self.chunk_size:
+                written += len(chunk)
+                self._write_chunk(ITEMS, chunk.columns, chunk.names)
+                chunk = ItemArray(self.decimals)
+        if len(chunk):
+            written += len(chunk)
+            self._write_chunk(ITEMS, chunk.columns, chunk.names)
+        return written
+
+    def write_placements(self, columns : dict) -> None:
+        """
+        Append placements: columns bin index, item index and x, y, z fixed point position
+
+        :param columns: Column name (see PLACEMENT_COLUMNS) to integer sequence
+        :type columns: dict
+        """
+        count = len(columns[PLACEMENT_COLUMNS[0]])
+        for start in range(0, count, self.chunk_size):
+            end = start + self.chunk_size
+            self._write_chunk(PLACEMENTS, {name: columns[name][start:end] for name in PLACEMENT_COLUMNS})
+
+class Reader:
+    """
+    Streaming reader, with use_mmap the columns are zero copy views on the mapped file
+    """
+    def __init__(self, path : str, use_mmap : bool = True):
+        """
+        :param path: Source file
+        :type path: str
+        :param use_mmap: True to map the file in memory, False to read it chunk by chunk
+        :type use_mmap: bool
+        """
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a py3dbl file")
+        length, = _LENGTH.unpack(self._file.read(_LENGTH.size))
+        self.header = json.loads(self._file.read(length))
+        if "item_columns" not in self.header:
+            self._file.close()
+            raise ValueError(f"{path} does not list its item columns")
+        self.decimals = self.header["decimals"]
+        self._columns = {ITEMS: tuple(self.header["item_columns"]), PLACEMENTS: PLACEMENT_COLUMNS}
+        self._start = len(MAGIC) + _LENGTH.size + length
+        self._start += _padding(self._start)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap and sys.byteorder == "little" else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """
+        Close the file, the mapping stays alive as long as views on its columns are referenced
+        """
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass # columns still in use, the mapping is released with them
+        self._file.close()
+
+    def chunks(self) -> Iterator[tuple[bytes,dict,None|list]]:
+        """
+        Iterate over the chunks of the file
+
+        :return: An iterator of tuples (tag, columns, names)
+        :rtype: Iterator[tuple[bytes, dict, None | list]]
+        """
+        offset = self._start
+        self._file.seek(offset)
+        while True:
+            head = self._file.read(_CHUNK_HEAD.size)
+            if len(head) < _CHUNK_HEAD.size:
+                return
+            tag, count, length = _CHUNK_HEAD.unpack(head)
+            names = json.loads(self._file.read(length)) if length else None
+            offset += _CHUNK_HEAD.size + length
+            offset += _padding(offset)
+            columns = dict()
+            for name in self._columns[tag]:
+                if self._map is not None:
+                    columns[name] = memoryview(self._map)[offset:offset+8*count].cast('q')
+                else:
+                    self._file.seek(offset)
+                    column = array('q')
+                    column.frombytes(self._file.read(8*count))
+                    if sys.byteorder == "big":
+                        column.byteswap()
+                    columns[name] = column
+                offset += 8*count
+            self._file.seek(offset)
+            yield tag, columns, names
+
+    def item_arrays(self) -> Iterator[ItemArray]:
+        """
+        Iterate over the item chunks as ItemArray objects (no Item object is built)
+        """
+        for tag, columns, names in self.chunks():
+            if tag == ITEMS:
+                yield ItemArray(self.decimals, columns, names)
+
+    def items(self) -> Iterator[Item]:
+        """
+        Iterate over the stored items, building them one at a time
+        """
+        for item_array in self.item_arrays():
+            yield from item_array
+
+    def placements(self) -> Iterator[dict]:
+        """
+        Iterate over the placement chunks (see PLACEMENT_COLUMNS)
+        """
+        for tag, columns, _ in self.chunks():
+            if tag == PLACEMENTS:
+                yield columns
+
+def _models_header(models : Iterable[BinModel]) -> tuple[list[dict],dict[int:int]]:
+    # models are told apart by identity (different models may share a name, e.g. None), bins refer to them by index
+    unique = dict()
+    for model in models:
+        unique.setdefault(id(model), model)
+    return [model_to_dict(model) for model in unique.values()], {key: idx for idx, key in enumerate(unique)}
+
+def _models_lookup(header : dict):
+    models = [model_from_dict(data) for data in header["models"]]
+    return lambda reference: models[reference]
+
+def save_problem(path : str, items : Iterable[Item]|ItemArray, fleet : list[Bin] = [], default_bin : None|BinModel = None,
+                 constraints : list[Constraint] = [], decimals : int = 3
+                ) -> None:
+    """
+    Save a packing instance
+
+    :param path: Destination file
+    :type path: str
+    :param items: Items to pack (can be a generator, they are written in chunks)
+    :type items: Iterable[Item] | ItemArray
+    :param fleet: Fleet of bins
+    :type fleet: list[Bin]
+    :param default_bin: A default bin model
+    :type default_bin: None | BinModel
+    :param constraints: Additional constraints
+    :type constraints: list[Constraint]
+    :param decimals: Number of decimals kept for item sizes and weights
+    :type decimals: int
+    """
+    models, model_index = _models_header([*[bin._model for bin in fleet], *([default_bin] if default_bin is not None else [])])
+    header = {
+        "type": "problem",
+        "models": models,
+        "fleet": [{"id": bin.id, "model": model_index[id(bin._model)]} for bin in fleet],
+        "default_bin": model_index[id(default_bin)] if default_bin is not None else None,
+        "constraints": [constraint_to_dict(constraint) for constraint in constraints]
+    }
+    with Writer(path, header, decimals) as writer:
+        writer.write_items(items)
+
+def load_problem(path : str) -> dict:
+    """
+    Load a packing instance saved with save_problem
+
+    :param path: Source file
+    :type path: str
+    :return: A dictionary with keys items, fleet, default_bin and constraints
+    :rtype: dict
+    """
+    with Reader(path, use_mmap=False) as reader:
+        header = reader.header
+        model = _models_lookup(header)
+        return {
+            "items": list(reader.items()),
+            "fleet": [Bin(bin["id"], model(bin["model"])) for bin in header["fleet"]],
+            "default_bin": model(header["default_bin"]) if header["default_bin"] is not None else None,
+            "constraints": [constraint_from_dict(constraint) for constraint in header["constraints"]]
+        }
+
+def save_configuration(path : str, configuration : list[Bin]|PackingResult, decimals : int = 3) -> None:
+    """
+    Save a packing configuration (the bins with their loaded items and placements)
+
+    :param path: Destination file
+    :type path: str
+    :param configuration: A packing configuration, or its snapshot (see PackingResult)
+    :type configuration: list[Bin] | PackingResult
+    :param decimals: Number of decimals kept for sizes, positions and weights
+    :type decimals: int
+    """
+    if isinstance(configuration, PackingResult):
+        return _save_result(path, configuration, decimals)
+    models, model_index = _models_header(bin._model for bin in configuration)
+    header = {
+        "type": "configuration",
+        "models": models,
+        "bins": [{"id": bin.id, "model": model_index[id(bin._model)]} for bin in configuration]
+    }
+    placements = {name: array('q') for name in PLACEMENT_COLUMNS}
+    for bin_idx, bin in enumerate(configuration):
+        for item in bin.items:
+            placements["bin"].append(bin_idx)
+            placements["item"].append(len(placements["item"]))
+            placements["x"].append(to_fixed(item.position.x, decimals))
+            placements["y"].append(to_fixed(item.position.y, decimals))
+            placements["z"].append(to_fixed(item.position.z, decimals))
+    with Writer(path, header, decimals) as writer:
+        writer.write_items(item for bin in configuration for item in bin.items)
+        writer.write_placements(placements)
+
+def _save_result(path : str, result : PackingResult, decimals : int) -> None:
+    models, model_index = _models_header(result.models)
+    header = {
+        "type": "configuration",
+        "models": models,
+        "bins": [{"id": bin_id, "model": model_index[id(model)]} for bin_id, model in zip(result.bin_ids, result.models)]
+    }
+    placements = {name: array('q') for name in PLACEMENT_COLUMNS}
+    for bin_idx in range(len(result)):
+        rows = result.rows(bin_idx)
+        placements["bin"].extend([bin_idx]*len(rows))
+        placements["item"].extend(rows)
+    for axis in ("x","y","z"):
+        column = result.column(axis)
+        if result.decimals == decimals:
+            placements[axis].extend(column)
+        else:
+            placements[axis].extend(to_fixed(from_fixed(value, result.decimals), decimals) for value in column)
+    with Writer(path, header, decimals) as writer:
+        writer.write_items(result.placed_items())
+        writer.write_placements(placements)
+
+def load_configuration(path : str) -> list[Bin]:
+    """
+    Load a packing configuration saved with save_configuration, items are put back without checking constraints
+
+    :param path: Source file
+    :type path: str
+    :rtype: list[Bin]
+    """
+    with Reader(path, use_mmap=False) as reader:
+        header = reader.header
+        model = _models_lookup(header)
+        configuration = [Bin(bin["id"], model(bin["model"])) for bin in header["bins"]]
+        items = list(reader.items())
+        for columns in reader.placements():
+            for row in range(len(columns["bin"])):
+                item = items[columns["item"][row]]
+                item.position = Vector3(*(from_fixed(columns[axis][row], reader.decimals) for axis in ("x","y","z")))
+                configuration[columns["bin"][row]].place_item(item)
+    return configuration
+
+if __name__ == "__main__":
+    # round trip testing, with two different models sharing the name None
+    import os
+    import tempfile
+    describe = lambda item: (item.name, tuple(item.size), tuple(item.position), item.weight, item.priority, item.max_load)
+    testmodel1 = BinModel(None,(2,2,2),10,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap']])
+    testmodel2 = BinModel(None,(3,1,Decimal("1.5")),20,[constraints['fits_inside_bin']],[Volume((1,1,1))])
+    testitems = [Item(f"item{idx}",Volume((1,Decimal("0.5"),Decimal("1.25"))),Decimal("1.5"),idx) for idx in range(4)]
+    testitems[0].max_load = 0
+    testitems[1].max_load = Decimal("2.5")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "problem.py3dbl")
+        save_problem(path, testitems, [Bin(0,testmodel1), Bin(1,testmodel2)], testmodel2, [constraints['no_overlap']])
+        problem = load_problem(path)
+        assert [tuple(bin.dimensions) for bin in problem["fleet"]] == [(2,2,2),(3,1,Decimal("1.5"))], [str(bin._model) for bin in problem["fleet"]]
+        assert problem["default_bin"] is problem["fleet"][1]._model and problem["fleet"][1]._model.volume() == Decimal("3.5")
+        assert list(map(describe, problem["items"])) == list(map(describe, testitems)), [str(item) for item in problem["items"]]
+        assert [constraint.func.__name__ for constraint in problem["constraints"]] == ["no_overlap"]
+
+        testbins = [Bin(0,testmodel1), Bin(1,testmodel2)]
+        testitems[1].position = Vector3(1,0,0)
+        testitems[2].size = Vector3(Decimal("1.25"),Decimal("0.5"),1)
+        for bin, item in zip([0,0,1], testitems[:3]):
+            assert testbins[bin].put_item(item), item
+        for configuration in (testbins, PackingResult.from_configuration(testbins, testitems)):
+            save_configuration(path, configuration)
+            loaded = load_configuration(path)
+            assert [bin._model.volume() for bin in loaded] == [8, Decimal("3.5")], [str(bin._model) for bin in loaded]
+            assert [list(map(describe, bin.items)) for bin in loaded] == [list(map(describe, bin.items)) for bin in testbins], \
+                [[str(item) for item in bin.items] for bin in loaded]
+
+        # a header without its item columns is refused
+        header = json.dumps({"decimals": 3}).encode()
+        with open(path, "wb") as file:
+            file.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        try:
+            Reader(path)
+            raise AssertionError("header without item_columns read")
+        except ValueError:
+            pass
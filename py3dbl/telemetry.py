@@ -0,0 +1,199 @@
+"""
+Telemetry of packing runs: a structured record of every Packer.pack call appended to a local metrics sink
+
+Sinks are enabled per packer (Packer(telemetry=sink) or Packer.set_telemetry) or for the whole process with the
+PY3DBL_TELEMETRY environment variable, whose value is the sink file: OpenMetrics text for ".prom" files,
+JSON lines otherwise.
+"""
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+
+TELEMETRY_ENV = "PY3DBL_TELEMETRY"
+
+def lower_bound(packer) -> int:
+    """
+    Continuous lower bound of the bins needed: total volume of the items over the volume of the biggest bin available
+
+    :param packer: A packer
+    :type packer: Packer
+    :return: The bound (0 if there are no items or no bins)
+    :rtype: int
+    """
+    volumes = [bin.volume() for bin in packer.bins]
+    if packer.default_bin is not None:
+        volumes.append(packer.default_bin.volume())
+    if not volumes or max(volumes) <= 0:
+        return 0
+    return math.ceil(sum((item.volume() for item in packer.items), Decimal(0))/max(volumes))
+
+def pack_record(packer, algorithm, parameters : dict, elapsed : float, monitor = None) -> dict:
+    """
+    Build the telemetry record of a packing run
+
+    :param packer: The packer after the run
+    :type packer: Packer
+    :param algorithm: The algorithm used
+    :type algorithm: PackingAlgorithm
+    :param parameters: Parameters of the run (the ones set on the algorithm are added)
+    :type parameters: dict
+    :param elapsed: Wall time of the run in seconds
+    :type elapsed: float
+    :param monitor: The monitor that observed the run, for probes and rejections
+    :type monitor: None | RejectionMonitor
+    :rtype: dict
+    """
+    statistics = packer.calculate_statistics()
+    bound = lower_bound(packer)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "algorithm": algorithm.func.__name__,
+        "parameters": {name: value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+                       for name, value in {**algorithm.kwargs, **parameters}.items()},
+        "items": len(packer.items),
+        "fleet": len(packer.bins),
+        "wall_time": elapsed,
+        "probes": monitor.probes if monitor is not None else None,
+        "rejections": monitor.rejections() if monitor is not None else None,
+        "bins_used": statistics["bins_used"],
+        "items_loaded": statistics["items_loaded"],
+        "fill_rate": float(statistics["average_volume"]),
+        "lower_bound": bound,
+        "gap": (statistics["bins_used"]-bound)/bound if bound else None,
+    }
+
+class JsonLinesSink:
+    """
+    Append each record as a line of JSON
+    """
+    def __init__(self, path : str):
+        """
+        :param path: File to append to
+        :type path: str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record : dict) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, mode="a") as file:
+            file.write(line)
+
+class OpenMetricsSink:
+    """
+    Keep counters of the runs of this process and rewrite them to an OpenMetrics text file after each run
+    (e.g. for the textfile collector of the Prometheus node exporter)
+
+    Counters restart from zero with the process, as OpenMetrics counters do.
+    """
+    PREFIX = "py3dbl_pack"
+
+    def __init__(self, path : str):
+        """
+        :param path: File to rewrite
+        :type path: str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # algorithm to counters
+        self.counters : dict[str:dict] = dict()
+        # (algorithm, constraint) to rejections
+        self.rejections : dict[tuple[str,str]:int] = dict()
+        # algorithm to the gauges of its last run
+        self.last : dict[str:dict] = dict()
+
+    def write(self, record : dict) -> None:
+        algorithm = record["algorithm"]
+        with self._lock:
+            counters = self.counters.setdefault(algorithm, {"runs": 0, "seconds": 0.0, "items": 0, "probes": 0, "bins": 0})
+            counters["runs"] += 1
+            counters["seconds"] += record["wall_time"]
+            counters["items"] += record["items"]
+            counters["probes"] += record["probes"] or 0
+            counters["bins"] += record["bins_used"]
+            for constraint, rejections in (record["rejections"] or {}).items():
+                self.rejections[algorithm, constraint] = self.rejections.get((algorithm, constraint), 0) + rejections
+            self.last[algorithm] = {"fill_rate": record["fill_rate"], "gap": record["gap"], "wall_time": record["wall_time"]}
+            text = self.render()
+            temporary = self.path + ".tmp"
+            with open(temporary, mode="w") as file:
+                file.write(text)
+            os.replace(temporary, self.path)
+
+    def render(self) -> str:
+        """
+        :return: The OpenMetrics exposition of the counters
+        :rtype: str
+        """
+        lines = []
+        def family(name : str, kind : str, help : str, samples : list[tuple[str,dict,float]]) -> None:
+            lines.append(f"# TYPE {self.PREFIX}_{name} {kind}")
+            lines.append(f"# HELP {self.PREFIX}_{name} {help}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"{self.PREFIX}_{name}{suffix}{{{label_text}}} {value}")
+        family("runs", "counter", "Packing runs.", [("_total", {"algorithm": a}, c["runs"]) for a, c in self.counters.items()])
+        family("seconds", "counter", "Wall time of the packing runs.", [("_total", {"algorithm": a}, c["seconds"]) for a, c in self.counters.items()])
+        family("items", "counter", "Items to pack.", [("_total", {"algorithm": a}, c["items"]) for a, c in self.counters.items()])
+        family("probes", "counter", "Placement attempts.", [("_total", {"algorithm": a}, c["probes"]) for a, c in self.counters.items()])
+        family("bins", "counter", "Bins used.", [("_total", {"algorithm": a}, c["bins"]) for a, c in self.counters.items()])
+        family("rejections", "counter", "Placements rejected by each constraint.",
+               [("_total", {"algorithm": a, "constraint": c}, n) for (a, c), n in self.rejections.items()])
+        for gauge, help in (("fill_rate", "Loaded volume over the volume of the bins used, last run."),
+                            ("gap", "Relative gap of the bins used from the continuous lower bound, last run."),
+                            ("wall_time", "Wall time of the last run in seconds.")):
+            family("last_" + gauge, "gauge", help, [("", {"algorithm": a}, last[gauge]) for a, last in self.last.items() if last[gauge] is not None])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+def open_sink(path : str) -> JsonLinesSink|OpenMetricsSink:
+    """
+    Sink for a file: OpenMetrics for ".prom" files, JSON lines otherwise
+    """
+    return OpenMetricsSink(path) if path.endswith(".prom") else JsonLinesSink(path)
+
+_environment_sinks : dict[str:object] = dict()
+
+def sink_from_environment() -> None|JsonLinesSink|OpenMetricsSink:
+    """
+    The sink named by the PY3DBL_TELEMETRY environment variable (None if it is not set), shared by the whole process
+    """
+    path = os.environ.get(TELEMETRY_ENV)
+    if not path:
+        return None
+    sink = _environment_sinks.get(path)
+    if sink is None:
+        sink = _environment_sinks.setdefault(path, open_sink(path))
+    return sink
+
+if __name__ == "__main__":
+    # telemetry testing: a record per run in JSON lines, counters in OpenMetrics, the environment variable enables a shared sink
+    import tempfile
+    from .Space import Volume
+    from .Item import Item
+    from .Bin import BinModel
+    from .Constraints import constraints
+    from .Algorithms import algorithms
+    from .Packer import Packer
+    testmodel1 = BinModel("test",(2,2,2),100,[constraints['weight_within_limit'],constraints['fits_inside_bin'],constraints['no_overlap']])
+    testpacker = lambda telemetry = None: Packer(algorithms['base_packer'],testmodel1,items=[Item(str(idx),Volume((1,1,1)),1,0) for idx in range(10)],telemetry=telemetry)
+    with tempfile.TemporaryDirectory() as directory:
+        sink = JsonLinesSink(os.path.join(directory, "runs.jsonl"))
+        for _ in range(2):
+            testpacker(sink).pack()
+        records = [json.loads(line) for line in open(sink.path)]
+        assert len(records) == 2 and all(record["algorithm"] == "base_packer" for record in records), records
+        assert (records[0]["items_loaded"], records[0]["bins_used"], records[0]["lower_bound"], records[0]["gap"]) == (10, 2, 2, 0), records[0]
+        assert records[0]["probes"] > 0 and records[0]["rejections"]["no_overlap"] > 0, records[0]
+        path = os.path.join(directory, "runs.prom")
+        os.environ[TELEMETRY_ENV] = path
+        try:
+            for _ in range(2):
+                testpacker().pack()
+        finally:
+            del os.environ[TELEMETRY_ENV]
+        text = open(path).read()
+        assert 'py3dbl_pack_runs_total{algorithm="base_packer"} 2' in text and text.endswith("# EOF\n"), text
@@ -0,0 +1,213 @@
+import py3dbl
+import argparse
+import json
+import math
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from benchmarking import system_information, generate_instance, ITEM_PARAMS, SEED
+from datetime import datetime
+
+SIZES = (100, 200, 500, 1000, 2000, 5000, 10000)
+ALGORITHMS = ("base_packer", "all_stand", "all_lay", "big_lay_small_stand")
+TIME_BUDGET = 600.0
+CONSTRAINTS = ("weight_within_limit", "fits_inside_bin", "no_overlap")
+
+# fleet compositions: a list of (model size, max weight, number of bins) and the default model (size, max weight)
+FLEETS = {
+    "cubes": {"fleet": [], "default_bin": ([2,2,2], 100)},
+    "vans": {"fleet": [], "default_bin": ([1.87,1.932,3.12], 2500)},
+    "mixed": {"fleet": [([.79,.75,.71], 60, 4), ([1.87,1.932,3.12], 2500, 2)], "default_bin": ([2,2,4], 3000)},
+}
+
+class ProbeCounter(py3dbl.PackingMonitor):
+    """
+    Count the placement attempts made while packing
+    """
+    def __init__(self):
+        super().__init__()
+        self.probes = 0
+
+    def on_probe(self, bin, item, placed):
+        self.probes += 1
+
+def build_fleet(composition : dict, constraints : list[py3dbl.Constraint]) -> tuple[list[py3dbl.Bin],py3dbl.BinModel]:
+    """
+    :param composition: A fleet composition (see FLEETS)
+    :type composition: dict
+    :return: The fleet and the default model
+    :rtype: tuple[list[Bin], BinModel]
+    """
+    fleet = []
+    for idx, (size, max_weight, count) in enumerate(composition["fleet"]):
+        model = py3dbl.BinModel(f"model{idx}",size,max_weight,constraints)
+        fleet.extend(py3dbl.Bin(f"{idx}-{n}",model) for n in range(count))
+    size, max_weight = composition["default_bin"]
+    return fleet, py3dbl.BinModel("default",size,max_weight,constraints)
+
+def run_cell(algorithm : str, fleet_name : str, size : int, seed : int = SEED, memory : str = "rss") -> dict:
+    """
+    Pack one seeded instance and measure it, meant to run in a fresh process
+
+    :param algorithm: Name of a registered algorithm
+    :type algorithm: str
+    :param fleet_name: Name of a fleet composition in FLEETS
+    :type fleet_name: str
+    :param size: Number of items
+    :type size: int
+    :param memory: "rss" for the peak resident set size of the process, "tracemalloc" for the peak of Python allocations (slower)
+    :type memory: str
+    :return: Wall time, peak memory, probes per item and bins used
+    :rtype: dict
+    """
+    constraints = [py3dbl.constraints[name] for name in CONSTRAINTS]
+    fleet, default_bin = build_fleet(FLEETS[fleet_name],constraints)
+    items = generate_instance(size,seed,ITEM_PARAMS)
+    packer = py3dbl.Packer(algorithm=py3dbl.algorithms[algorithm],default_bin=default_bin,fleet=fleet,items=items)
+    counter = ProbeCounter()
+    if memory == "tracemalloc":
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    begin = time.perf_counter()
+    with counter:
+        packer.pack()
+    elapsed = time.perf_counter() - begin
+    if memory == "tracemalloc":
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        unit = 1 if sys.platform == "darwin" else 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*unit
+        rss_before *= unit
+    return {
+        "time": elapsed,
+        "peak_memory": peak,
+        "baseline_memory": rss_before if memory == "rss" else 0,
+        "probes": counter.probes,
+        "probes_per_item": counter.probes/size,
+        "bins": len(packer.current_configuration),
+        "items_loaded": sum(len(bin.items) for bin in packer.current_configuration)
+    }
+
+def _cell_process(queue, *args) -> None:
+    try:
+        queue.put(run_cell(*args))
+    except Exception as error:
+        queue.put({"error": repr(error)})
+
+def run_cell_isolated(algorithm : str, fleet_name : str, size : int, seed : int = SEED, memory : str = "rss", timeout : float = TIME_BUDGET) -> dict:
+    """
+    Run a cell in a fresh process (so peak memory is not polluted by previous cells), killing it after timeout seconds
+
+    :return: The cell measures (see run_cell), {"timeout": timeout} or {"error": message}
+    :rtype: dict
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_cell_process, args=(queue,algorithm,fleet_name,size,seed,memory))
+    process.start()
+    try:
+        return queue.get(timeout=timeout)
+    except Exception: # queue.Empty
+        return {"timeout": timeout}
+    finally:
+        process.terminate()
+        process.join()
+
+def fit_power_law(sizes : list[int], values : list[float]) -> None|dict[str:float]:
+    """
+    Least squares fit of values = coefficient * size^exponent on the log-log scale
+
+    :return: The exponent, the coefficient and the coefficient of determination (None with less than 2 points)
+    :rtype: None | dict[str:float]
+    """
+    points = [(math.log(size),math.log(value)) for size, value in zip(sizes,values) if value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x,_ in points)/len(points)
+    mean_y = sum(y for _,y in points)/len(points)
+    sxx = sum((x-mean_x)**2 for x,_ in points)
+    sxy = sum((x-mean_x)*(y-mean_y) for x,y in points)
+    exponent = sxy/sxx
+    intercept = mean_y - exponent*mean_x
+    ss_tot = sum((y-mean_y)**2 for _,y in points)
+    ss_res = sum((y-intercept-exponent*x)**2 for x,y in points)
+    return {"exponent": exponent, "coefficient": math.exp(intercept), "r2": 1-ss_res/ss_tot if ss_tot else 1.0}
+
+def scaling_benchmarker(algorithms : tuple[str] = ALGORITHMS, fleets : tuple[str] = tuple(FLEETS), sizes : tuple[int] = SIZES, seed : int = SEED,
+                        memory : str = "rss", time_budget : float = TIME_BUDGET, output_file : None|str = "scaling_benchmarking_result.json", log = print) -> dict:
+    """
+    Sweep the instance size for each algorithm and fleet composition, recording time, peak memory, probes per item and bins used
+
+    Once a cell exceeds the time budget (or fails) the bigger sizes of the same algorithm and fleet are skipped,
+    the size where that happens is reported as the breaking point. Time and memory growth are fitted with power laws.
+
+    :param algorithms: Names of registered algorithms
+    :type algorithms: tuple[str]
+    :param fleets: Names of fleet compositions in FLEETS
+    :type fleets: tuple[str]
+    :param sizes: Numbers of items, in increasing order
+    :type sizes: tuple[int]
+    :param seed: Seed of the generated instances
+    :type seed: int
+    :param memory: Memory measure, "rss" or "tracemalloc"
+    :type memory: str
+    :param time_budget: Seconds allowed to a single cell
+    :type time_budget: float
+    :param output_file: JSON file to write the results to (None to skip), it is rewritten after each cell
+    :type output_file: None | str
+    :param log: Called with a progress line after each cell (None for silence)
+    :return: The results, as written to output_file
+    :rtype: dict
+    """
+    results = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "system": system_information(),
+        "parameters": {"algorithms": list(algorithms), "fleets": {name: FLEETS[name] for name in fleets}, "sizes": list(sizes),
+                       "seed": seed, "memory": memory, "time_budget": time_budget, "item_params": ITEM_PARAMS},
+        "results": dict()
+    }
+    for fleet_name in fleets:
+        for algorithm in algorithms:
+            cells = dict()
+            entry = results["results"].setdefault(fleet_name,dict())[algorithm] = {"cells": cells, "breaks_at": None}
+            for size in sizes:
+                cell = cells[str(size)] = run_cell_isolated(algorithm,fleet_name,size,seed+size,memory,time_budget)
+                if log is not None:
+                    log(f"{fleet_name:<8} {algorithm:<20} {size:>6} " + (
+                        f"time {cell['time']:.2f}s peak {cell['peak_memory']/2**20:.1f}MiB probes/item {cell['probes_per_item']:.1f} bins {cell['bins']}"
+                        if "time" in cell else str(cell)))
+                if "time" not in cell:
+                    entry["breaks_at"] = size
+                    break
+            measured = [(int(size),cell) for size, cell in cells.items() if "time" in cell]
+            entry["time_fit"] = fit_power_law([size for size,_ in measured],[cell["time"] for _,cell in measured])
+            entry["memory_fit"] = fit_power_law([size for size,_ in measured],[cell["peak_memory"]-cell["baseline_memory"] for _,cell in measured])
+            if output_file is not None:
+                with open(output_file,mode="w") as file:
+                    json.dump(results,file,indent=1)
+    return results
+
+def main(argv : None|list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="py3dbl scaling benchmark")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS))
+    parser.add_argument("--fleets", nargs="+", default=list(FLEETS), choices=list(FLEETS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--memory", choices=["rss","tracemalloc"], default="rss")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET)
+    parser.add_argument("--output", default="scaling_benchmarking_result.json")
+    args = parser.parse_args(argv)
+    results = scaling_benchmarker(tuple(args.algorithms),tuple(args.fleets),tuple(args.sizes),args.seed,args.memory,args.time_budget,args.output)
+    for fleet_name, algorithms in results["results"].items():
+        for algorithm, entry in algorithms.items():
+            fit = entry["time_fit"]
+            growth = f"time ~ n^{fit['exponent']:.2f} (r2 {fit['r2']:.3f})" if fit else "time growth not available"
+            print(f"{fleet_name:<8} {algorithm:<20} {growth}" + (f", breaks at {entry['breaks_at']} items" if entry["breaks_at"] else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())